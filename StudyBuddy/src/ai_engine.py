@@ -4,20 +4,31 @@
 #                                                                                       #
 # ===================================================================================== #
 
+import contextlib
+from collections import Counter
+from functools import lru_cache
+import numpy as np
 import torch
 from torch import nn
 import torch.nn.functional as F     # functional versions of operations like: activations, loss functions, etc.
 import re       # regular expression module - for splitting text into tokens like words
 import sentencepiece as spm
 
+from sampling import TokenBuffer, sample_next
+from speculative import SpeculativeDecoder
+
 # ================================== #
 #       SentencePiece Tokenizer      #
 # ================================== #
 class SentencePieceTokenizer:
-    def __init__(self, model_path="models/studybuddy_sp.model"):
+    def __init__(self, model_path="models/studybuddy_sp.model", turn_cache_size=1024):
         self.sp = spm.SentencePieceProcessor()
         self.sp.load(model_path)
 
+        # Conversation turns repeat in every later prompt (the memory window) - encode each one once
+        self._encode_turn = lru_cache(maxsize=turn_cache_size)(lambda turn: tuple(self.sp.encode(turn, out_type=int)))
+        self.split_turns = self._turns_split_cleanly()
+
     def encode(self, text, max_len=None):
         ids = self.sp.encode(text, out_type=int)
 
@@ -35,6 +46,59 @@ class SentencePieceTokenizer:
         ids = [i for i in ids if i != 0]
         return self.sp.decode(ids)
 
+    # === Batched === #
+    def encode_batch(self, texts, max_len=None, pad_id=0, num_threads=-1, keep="start", return_tensors="np"):
+        """
+        Encodes every text in one SentencePiece call (spread over num_threads C++ threads, -1 = all cores).
+        Returns (ids, lengths): ids is (batch, L) padded with pad_id, L = max_len or the longest text.
+        Texts over max_len are cut - keep="start" keeps the beginning, keep="end" the most recent tokens
+        (what a prompt wants). return_tensors: "np" or "pt".
+        """
+        batch = self.sp.encode(list(texts), out_type=int, num_threads=num_threads)
+        if max_len:
+            batch = [ids[:max_len] if keep == "start" else ids[-max_len:] for ids in batch]
+
+        lengths = np.fromiter((len(ids) for ids in batch), dtype=np.int64, count=len(batch))
+        width = max_len or (int(lengths.max()) if len(batch) else 0)
+        out = np.full((len(batch), width), pad_id, dtype=np.int64)
+        for row, ids in zip(out, batch):
+            row[:len(ids)] = ids
+
+        if return_tensors == "pt":
+            return torch.from_numpy(out), torch.from_numpy(lengths)
+        return out, lengths
+
+    def decode_batch(self, ids, num_threads=-1):
+        """(batch, L) IDs (array, tensor or lists) -> list of strings, padding (0) dropped, one SentencePiece call"""
+        if isinstance(ids, torch.Tensor):
+            ids = ids.tolist()
+        elif isinstance(ids, np.ndarray):
+            ids = ids.tolist()
+        return self.sp.decode([[i for i in row if i != 0] for row in ids], num_threads=num_threads)
+
+    # === Conversation Prompts === #
+    def encode_turns(self, turns):
+        """IDs of the turns joined by spaces - each turn comes from an LRU cache after its first encode"""
+        ids = []
+        for turn in turns:
+            ids.extend(self._encode_turn(turn))
+        return ids
+
+    def encode_prompt(self, memory, prompt):
+        """
+        IDs of format_prompt(memory, prompt). SentencePiece splits on whitespace before segmenting, so no
+        piece spans the space between two turns and the turns can be encoded one at a time (each from the
+        LRU cache) - the same IDs as encoding the whole prompt. A tokenizer where that check fails at load
+        (split_turns False) gets the whole prompt encoded instead.
+        """
+        if not self.split_turns:
+            return self.encode(format_prompt(memory, prompt))
+        return self.encode_turns([*memory, f"User: {prompt}", "Bot:"])
+
+    def _turns_split_cleanly(self):
+        turns = ["User: What is a stack frame?", "Bot: It holds a call's locals, 2 + 2 = 4.", "User: ok...", "Bot:"]
+        return self.encode(" ".join(turns)) == [i for turn in turns for i in self.sp.encode(turn, out_type=int)]
+
     @property
     def vocab_size(self):
         return self.sp.get_piece_size()
@@ -125,6 +189,12 @@ class SimpleTokenizer:
 # ================================ #
 #       GPT Model Neural Net       #
 # ================================ #
+# Layer sizes, the vocab size comes from the tokenizer and max_seq_len from training
+MODEL_SIZES = {
+    "base":  {"embed_dim": 128, "n_heads": 4, "hidden_dim": 256},
+    "draft": {"embed_dim": 32, "n_heads": 2, "hidden_dim": 64},      # speculative decoding draft (TinyTransformer's sizes)
+}
+
 class TinyGPT(nn.Module):
     def __init__(self, vocab_size,
                  embed_dim=128,
@@ -185,11 +255,370 @@ class TinyGPT(nn.Module):
         # Causal mask so token i can only see token <= i
         mask = self._causal_mask(seq_len=seq_len, device=x.device)      # (seq, seq)
 
-        h = self.transformer(h, mask=mask)  # (batch, seq, vocab_size)
+        # int8 dynamic-quantized Linear layers can't go through nn.TransformerEncoder's fused path
+        if isinstance(self.fc, nn.Linear):
+            h = self.transformer(h, mask=mask)  # (batch, seq, vocab_size)
+        else:
+            for layer in self.transformer.layers:
+                q, k, v = self._project_qkv(layer, h)
+                h = self._finish_layer(layer, h, F.scaled_dot_product_attention(q, k, v, attn_mask=mask))
 
         logits = self.fc(h)
         return logits
 
+    # ============================== #
+    #       Incremental Decoding     #
+    # ============================== #
+    def new_cache(self, batch_size=1, device=None, dtype=None):
+        """Allocate an empty key/value cache that holds up to max_seq_len tokens per layer"""
+        attn = self.transformer.layers[0].self_attn
+        return KVCache(n_layers=len(self.transformer.layers),
+                       batch_size=batch_size,
+                       n_heads=attn.num_heads,
+                       head_dim=attn.embed_dim // attn.num_heads,
+                       max_len=self.max_seq_len,
+                       device=device or self.token_emb.weight.device,
+                       dtype=dtype)
+
+    def forward_cached(self, x, cache):
+        """
+        x: (batch, new_len) token IDs that come right after the tokens already in `cache`
+        returns: logits (batch, new_len, vocab_size)
+        Inference only (no dropout) - call model.eval() first.
+        """
+        batch_size, new_len = x.shape
+        start = cache.length
+        end = start + new_len
+
+        if end > cache.max_len:
+            raise ValueError(f"KV cache overflow: {start} cached + {new_len} new > {cache.max_len}")
+
+        # New tokens continue the positions of the cached ones
+        positions = torch.arange(start, end, device=x.device).unsqueeze(0)     # (1, new)
+        h = self.token_emb(x) + self.pos_emb(positions)                         # (batch, new, emb_dim)
+
+        # New token i sees every cached token plus new tokens <= i (single token sees everything)
+        mask = None
+        if new_len > 1:
+            mask = torch.ones(new_len, end, dtype=torch.bool, device=x.device).tril(diagonal=start)
+
+        for i, layer in enumerate(self.transformer.layers):
+            h = self._cached_layer(layer, h, cache, i, start, mask)
+
+        cache.length = end
+        return self.fc(h)
+
+    def _cached_layer(self, layer, h, cache, i, start, mask):
+        # Same math as nn.TransformerEncoderLayer (post-norm), but keys/values go through the cache
+        q, k, v = self._project_qkv(layer, h)      # (batch, heads, new, head_dim)
+        end = start + h.shape[1]
+
+        # Write into the preallocated buffers, then attend over everything seen so far
+        cache.keys[i][:, :, start:end] = k
+        cache.values[i][:, :, start:end] = v
+        a = F.scaled_dot_product_attention(q, cache.keys[i][:, :, :end], cache.values[i][:, :, :end], attn_mask=mask)
+
+        return self._finish_layer(layer, h, a)
+
+    def _project_qkv(self, layer, h):
+        # Project tokens with the layer's packed in_proj -> 3 x (batch, heads, seq, head_dim)
+        attn = layer.self_attn
+        batch_size, seq_len, embed_dim = h.shape
+        head_dim = embed_dim // attn.num_heads
+        qkv = F.linear(h, attn.in_proj_weight, attn.in_proj_bias)
+        qkv = qkv.view(batch_size, seq_len, 3, attn.num_heads, head_dim).permute(2, 0, 3, 1, 4)
+        return qkv[0], qkv[1], qkv[2]
+
+    def _finish_layer(self, layer, h, a):
+        # Merge heads, output projection, then post-norm residual + feed forward
+        batch_size, seq_len, embed_dim = h.shape
+        a = layer.self_attn.out_proj(a.transpose(1, 2).reshape(batch_size, seq_len, embed_dim))
+        h = layer.norm1(h + a)
+        h = layer.norm2(h + layer.linear2(layer.activation(layer.linear1(h))))
+        return h
+
+    def forward_rows(self, x, cache, rows, positions):
+        """
+        Batched decode step where every sequence sits at its own position (continuous batching)
+        x:         (n,) newest token ID of each active sequence
+        rows:      (n,) which cache row each sequence lives in
+        positions: (n,) position of the new token = tokens already cached for that row
+        returns: logits (n, vocab_size)
+        """
+        h = self.token_emb(x) + self.pos_emb(positions)     # (n, emb_dim)
+        h = h.unsqueeze(1)                                  # (n, 1, emb_dim)
+
+        # Each row only sees its own filled positions, the rest of the buffer is padding
+        # Attention only spans up to the longest row, not the whole max_len buffer
+        end = int(positions.max()) + 1
+        slots = torch.arange(end, device=x.device)
+        mask = (slots.unsqueeze(0) <= positions.unsqueeze(1))[:, None, None, :]    # (n, 1, 1, end)
+
+        for i, layer in enumerate(self.transformer.layers):
+            q, k, v = self._project_qkv(layer, h)
+            cache.keys[i][rows, :, positions] = k[:, :, 0]
+            cache.values[i][rows, :, positions] = v[:, :, 0]
+            a = F.scaled_dot_product_attention(q, cache.keys[i][rows, :, :end], cache.values[i][rows, :, :end], attn_mask=mask)
+            h = self._finish_layer(layer, h, a)
+
+        return self.fc(h[:, 0])
+
+    def decode_step(self, ids, cache, window_stride=1):
+        """
+        ids: (batch, seq_len) running sequence, already clamped to max_seq_len.
+             Everything except the last token must already be in `cache` (or the cache is empty).
+        returns: logits (batch, vocab_size) for the last position
+
+        Positions are absolute inside the window, so once the window is full and slides every
+        cached key/value is stale. Then the cache is rebuilt from the last
+        (max_seq_len - window_stride + 1) tokens, which leaves room for window_stride - 1 cheap steps.
+        window_stride=1 rebuilds on every step past the window and matches forward() exactly.
+        """
+        if cache.length == 0:
+            window = ids
+        elif cache.length + 1 > cache.max_len:
+            cache.reset()
+            window = ids[:, -(cache.max_len - window_stride + 1):]
+        else:
+            window = ids[:, -1:]
+
+        return self.forward_cached(window, cache)[:, -1]
+
+# ====================== #
+#       KV Cache         #
+# ====================== #
+class KVCache:
+    """Preallocated per-layer keys/values, shape (batch, heads, max_len, head_dim)"""
+    def __init__(self, n_layers, batch_size, n_heads, head_dim, max_len, device=None, dtype=None):
+        shape = (batch_size, n_heads, max_len, head_dim)
+        self.keys = [torch.zeros(shape, device=device, dtype=dtype) for _ in range(n_layers)]
+        self.values = [torch.zeros(shape, device=device, dtype=dtype) for _ in range(n_layers)]
+        self.max_len = max_len
+        self.length = 0     # number of positions filled
+
+    def reset(self):
+        self.length = 0
+
+    def row(self, r):
+        """Single-row view sharing this cache's buffers (prefill one sequence of a batch)"""
+        view = KVCache.__new__(KVCache)
+        view.keys = [k[r:r + 1] for k in self.keys]
+        view.values = [v[r:r + 1] for v in self.values]
+        view.max_len = self.max_len
+        view.length = 0
+        return view
+
+# ============================== #
+#       Conversation Cache       #
+# ============================== #
+class ConversationCache:
+    """
+    KV cache of a running conversation plus the token IDs it holds, kept from one chat turn to the next.
+    Every prompt starts with the turns of the previous one, so only the tokens after the longest common
+    prefix go through the model.
+    Positions are absolute inside the window, so when the history slides (oldest memory turn dropped, or
+    the prompt clamped to max_seq_len from a later token) the prompt no longer starts where the cache does.
+    rebase() then lines the prompt up with the cache instead: the context starts at the cached tokens and
+    continues with the prompt from where they end - like decode_step's window_stride rebuild, the model
+    may see a little more or less old history than format_prompt(memory) has, never more than max_seq_len.
+    """
+    def __init__(self, model, dtype=None, ngram=4):
+        self.model = model
+        self.cache = model.new_cache(dtype=dtype)
+        self.ids = []           # token IDs in cache positions 0 .. cache.length-1
+        self.reused = 0         # prompt tokens the last prefill didn't have to run
+        self.ngram = ngram      # tokens in a row that have to match to line the prompt up with the cache
+
+    def rebase(self, prompt_ids):
+        """
+        prompt_ids: the whole prompt (not clamped)
+        returns: the IDs to generate from - the cached tokens C[:r] + prompt[e:], where C[:r] lines up with
+        the prompt ending at e, for the longest r that fits in max_seq_len.
+        The prompt unchanged if it already starts with cached tokens, or if nothing lines up.
+        """
+        cached, n = self.ids[:self.cache.length], self.ngram
+        window = prompt_ids[-self.cache.max_len:]
+        if len(cached) < n or len(prompt_ids) < n or window[:n] == cached[:n]:
+            return prompt_ids
+
+        # Every n-gram of the cache found in the prompt votes for an offset (prompt index - cache index)
+        where = {}
+        for i in range(len(prompt_ids) - n + 1):
+            where.setdefault(tuple(prompt_ids[i:i + n]), []).append(i)
+        votes = Counter()
+        for i in range(len(cached) - n + 1):
+            for j in where.get(tuple(cached[i:i + n]), ()):
+                votes[j - i] += 1
+
+        best, best_r = prompt_ids, 0
+        for delta, _ in votes.most_common(4):
+            # C[:r] stays at its cached positions and the prompt continues after it -> len(prompt) - delta tokens
+            if len(prompt_ids) - delta > self.cache.max_len:
+                continue
+            # The overlap has to match from its start: before it, one side has history the other doesn't
+            start = r = max(0, -delta)
+            while r < len(cached) and r + delta < len(prompt_ids) and cached[r] == prompt_ids[r + delta]:
+                r += 1
+            if r - start >= n and r > best_r:
+                best, best_r = cached[:r] + prompt_ids[r + delta:], r
+        return best
+
+    def prefill(self, window, window_stride=1):
+        """
+        window: (1, seq_len) prompt, already clamped to max_seq_len
+        returns: logits (1, vocab_size) for the last position
+        A full window that reuses nothing is rebuilt like decode_step does: from window_stride - 1 tokens
+        later, so the next steps (and the next turn's rebase) have room left in the cache.
+        """
+        ids = window[0].tolist()
+
+        # At least one token has to run to get logits
+        limit = min(len(self.ids), self.cache.length, len(ids) - 1)
+        reused = 0
+        while reused < limit and self.ids[reused] == ids[reused]:
+            reused += 1
+
+        if reused == 0 and len(ids) == self.cache.max_len and window_stride > 1:
+            window, ids = window[:, window_stride - 1:], ids[window_stride - 1:]
+
+        self.cache.length = reused
+        self.ids = ids[:reused]
+        self.reused = reused
+        return self.model.forward_cached(window[:, reused:], self.cache)[:, -1]
+
+    def sync(self, window):
+        """window: the last input given to decode_step/prefill - the cache holds its last cache.length tokens"""
+        self.ids = window[0, window.shape[1] - self.cache.length:].tolist()
+
+    def reset(self):
+        self.cache.reset()
+        self.ids = []
+
+# ================================= #
+#       Inference Precision         #
+# ================================= #
+PRECISIONS = ("fp32", "int8", "bf16")
+
+def prepare_for_inference(model, precision="fp32"):
+    """
+    fp32: model as-is
+    int8: dynamic int8 quantization of the nn.Linear layers (feed forward in every block + fc head).
+          The attention projections stay fp32 - PyTorch doesn't dynamically quantize them.
+    bf16: weights stay fp32, run the model under precision_context() (bf16 autocast)
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+
+    model.eval()
+    if precision == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+def precision_context(precision="fp32"):
+    """Context manager to run forward passes in - bf16 autocast on CPU, otherwise a no-op"""
+    if precision == "bf16":
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+def cache_dtype(precision="fp32"):
+    # bf16 keeps the KV cache in bf16 too (half the memory)
+    return torch.bfloat16 if precision == "bf16" else None
+
+# ========================== #
+#       Model Loading        #
+# ========================== #
+def load_tinygpt(model_path, vocab_size, model_size="base", max_seq_len=192):
+    """
+    TinyGPT from inference weights (train/export_model.py), a training checkpoint or a raw state_dict.
+    The last two don't store their layer sizes, they're built with MODEL_SIZES[model_size].
+    """
+    # Memory-mapped: tensor data stays in the page cache (shared by every process that maps the file)
+    # and is only read when touched, so the optimizer state in a checkpoint is never loaded
+    ckpt = torch.load(model_path, map_location="cpu", mmap=True)
+
+    # Case 1: Inference weights from train/export_model.py (config + model weights only)
+    if isinstance(ckpt, dict) and "config" in ckpt:
+        print("Detected inference weights — mapping them in place.")
+        if ckpt["config"]["vocab_size"] != vocab_size:
+            raise ValueError(f"Model vocab ({ckpt['config']['vocab_size']}) doesn't match tokenizer ({vocab_size})")
+
+        # assign=True points the parameters at the mapped tensors instead of copying into them
+        model = TinyGPT(**ckpt["config"])
+        model.load_state_dict(ckpt["model"], assign=True)
+        return model
+
+    # recreate model with correct vocab size
+    model = TinyGPT(vocab_size=vocab_size, max_seq_len=max_seq_len, **MODEL_SIZES[model_size])
+
+    # Case 2: It's loading a checkpoint (contains 'model' key)
+    if isinstance(ckpt, dict) and "model" in ckpt:
+        print("Detected checkpoint file — loading state_dict from 'model' key.")
+        model.load_state_dict(ckpt["model"])
+
+    # Case 3: Loading final model .pt (pure state_dict)
+    else:
+        print("Detected raw model state_dict — loading directly.")
+        model.load_state_dict(ckpt)
+    return model
+
+# ================== #
+#       Prompt       #
+# ================== #
+def format_prompt(memory, prompt):
+    """Joins the saved conversation turns and the new user message into the model prompt"""
+    history = " ".join(memory)                  # Create sentence of memory contents
+    return f"{history} User: {prompt} Bot:"
+
+def extract_reply(text):
+    """Reply part of the generated text: whatever follows the last "Bot:" the model wrote itself, stripped"""
+    return text.split("Bot:")[-1].strip()
+
+# =================================== #
+#       Incremental Detokenizer       #
+# =================================== #
+class StreamDetokenizer:
+    """
+    Turns a stream of SentencePiece IDs into text pieces without splitting words.
+    A piece starting with the word marker begins a new word, so the pending IDs before it
+    form a complete word (byte-fallback pieces of one character stay together too).
+    """
+    WORD_MARK = "\u2581"    # SentencePiece "▁"
+
+    def __init__(self, tokenizer):
+        self.sp = tokenizer.sp
+        self.pending = []       # IDs of the word being built
+        self.started = False    # anything emitted yet
+
+    def push(self, token_id):
+        """Adds one ID, returns the text that's now complete ("" if the word isn't finished)"""
+        text = ""
+        if self.pending and self.sp.id_to_piece(token_id).startswith(self.WORD_MARK):
+            text = self._emit()
+        self.pending.append(token_id)
+        return text
+
+    def flush(self):
+        """Returns whatever is still pending (end of generation)"""
+        return self._emit() if self.pending else ""
+
+    def peek(self):
+        """Text of the word still being built, without emitting it"""
+        return self._pending_text() if self.pending else ""
+
+    def _emit(self):
+        text = self._pending_text()
+        self.pending = []
+        if text:
+            self.started = True
+        return text
+
+    def _pending_text(self):
+        # sp.decode drops the leading space of a word, put it back between words
+        text = self.sp.decode(self.pending)
+        if self.started and self.sp.id_to_piece(self.pending[0]).startswith(self.WORD_MARK):
+            text = " " + text
+        return text
+
 # ========================= #
 #       ChatBot Class       #
 # ========================= #
@@ -201,110 +630,143 @@ class LocalChatBot:
         self.memory = []
 
         self.model = None
+        self.precision = "fp32"
 
-    # === Generates Response === #
-    def generate(self, prompt, max_len=200, k=8, temperature=0.7):
-
-        # Build full prompt
-        history = " ".join(self.memory)                         # Create sentence of memory contents
-        full_prompt = f"{history} User: {prompt} Bot:"          # Given to model to respond to
-
-        # Converts input text to list of ints and wraps in a batch dimension
-        encoded = torch.tensor([self.tokenizer.encode(full_prompt)], dtype=torch.long)   # outputs shape (1, seq_len)
-
-        unk_id = self.tokenizer.sp.unk_id()
-        pad_id = 0
-
-        # at each step, predicts a new word and appends it
-        for _ in range(max_len):
-            # clamp sequence length
-            if encoded.shape[1] > self.model.max_seq_len:
-                encoded = encoded[:, -self.model.max_seq_len:]
-
-            # Forward pass
-            logits = self.model(encoded)
-
-            # Extract last token's first
-            last_logits = logits[0, -1].detach().clone()
-
-            # Stops PAD/UNK token
-            last_logits[pad_id] = -1e10
-            last_logits[unk_id] = -1e10
-
-            # repetition penalty
-            last_token = encoded[0].tolist()[-20:]
-            for prev_id in last_token:
-                last_logits[prev_id] *= 0.7 # lower probability of repeating outputs
-
-            # Temperature scaling for softer probability distribution
-            scaled_logits = last_logits / temperature
-
-            # Convert to probabilities for REAL probability distribution
-            probs = F.softmax(scaled_logits, dim=0)
-
-            # Top K filtering to restrict samples to best 'k' tokens
-            topk_probs, topk_idx = torch.topk(probs, k)
+        # KV cache of the conversation so far, the next turn only runs what's new (see ConversationCache)
+        self.conversation = None
 
-            # Normalize top K probabilities
-            topk_probs /= torch.sum(topk_probs)
+        # Set by load_draft_model() -> replies are sampled with speculative decoding
+        self.speculative = None
 
-            # Sample from top-k distribution, chooses a random token, weighted by probability
-            next_id = torch.multinomial(topk_probs, 1).item()
+        # Tokens sampled for the last reply (generate / stream)
+        self.reply_tokens = 0
 
-            # Map back to original vocab index
-            next_id = topk_idx[next_id].item()
+    # === Generates Response === #
+    def generate(self, prompt, max_len=200, k=8, temperature=0.7, use_cache=True, window_stride=1, reuse_prefix=True):
 
-            # STOP condition, if PAD/UNK
-            if next_id in (pad_id, unk_id):
-                continue
+        # Build full prompt (format_prompt), memory turns come from the tokenizer's cache
+        prompt_ids = self.tokenizer.encode_prompt(self.memory, prompt)      # Given to model to respond to
 
-            # Appends next token + sequence grows by word each iteration
-            encoded = torch.cat([encoded, torch.tensor([[next_id]])], dim=1)
+        # Runs every sampling step, keeps the sampled token IDs (max_len=0 -> empty reply)
+        reply_ids = [next_id for next_id, _ in self._sample_steps(prompt_ids, max_len, k, temperature, use_cache,
+                                                                  window_stride, reuse_prefix)]
+        self.reply_tokens = len(reply_ids)
 
+        # Turns multiple token IDs -> human readable sentence, same clean-up as stream()
+        reply = extract_reply(self.tokenizer.decode(reply_ids))
 
-        # Converts tensor -> Python list
-        # Turns multiple token IDs -> human readable sentence
-        ids = encoded[0].tolist()
-        full_text = self.tokenizer.decode(ids)
+        self._remember(prompt, reply)
+        return reply
 
-        if "Bot:" in full_text:
-            reply = full_text.split("Bot:")[-1].strip()
-        else:
-            reply = full_text
+    # === Streams Response === #
+    def stream(self, prompt, max_len=200, k=8, temperature=0.7, use_cache=True, window_stride=1, reuse_prefix=True):
+        """Same sampling as generate(), but yields decoded text pieces (whole words) as they're sampled"""
+        prompt_ids = self.tokenizer.encode_prompt(self.memory, prompt)
+        detok = StreamDetokenizer(self.tokenizer)
+        pieces = []
+        self.reply_tokens = 0
+
+        for next_id, _ in self._sample_steps(prompt_ids, max_len, k, temperature, use_cache, window_stride, reuse_prefix):
+            self.reply_tokens += 1
+            piece = detok.push(next_id)
+            if piece:
+                pieces.append(piece)
+                yield piece
+
+        piece = detok.flush()
+        if piece:
+            pieces.append(piece)
+            yield piece
+
+        # The pieces were shown as they came, memory gets the same reply generate() would return
+        self._remember(prompt, extract_reply("".join(pieces)))
+
+    def _sample_steps(self, prompt_ids, max_len, k, temperature, use_cache, window_stride, reuse_prefix=True):
+        """Yields (next_id, window) once per step, window is the model's context after appending next_id"""
+        unk_id = self.tokenizer.sp.unk_id()
+        pad_id = 0
 
+        # Draft model loaded: the draft proposes, the model verifies several tokens per forward pass
+        if self.speculative is not None and use_cache:
+            yield from self.speculative.steps(prompt_ids, max_len, temperature=temperature, top_k=k,
+                                              banned_ids=(pad_id, unk_id), window_stride=window_stride,
+                                              context=lambda: precision_context(self.precision))
+            return
+
+        # KV cache -> each step only runs the newest token through the model
+        # reuse_prefix keeps it across turns, so the prompt only runs from where it differs from the last turn
+        cache, conversation = None, None
+        if use_cache and reuse_prefix:
+            if self.conversation is None or self.conversation.model is not self.model:
+                self.conversation = ConversationCache(self.model, dtype=cache_dtype(self.precision))
+            conversation = self.conversation
+            cache = conversation.cache
+            # History slid since the last turn -> start from the cached tokens where they still line up
+            prompt_ids = conversation.rebase(prompt_ids)
+        elif use_cache:
+            cache = self.model.new_cache(dtype=cache_dtype(self.precision))
+
+        # Prompt + room for every generated token, preallocated once
+        tokens = TokenBuffer(prompt_ids, capacity=len(prompt_ids) + max_len)
+
+        fed = None          # last window that went through the model
+        try:
+            # at each step, predicts a new word and appends it
+            for _ in range(max_len):
+                # clamp sequence length (view of the last max_seq_len tokens)
+                window = tokens.window(self.model.max_seq_len)
+
+                with torch.no_grad(), precision_context(self.precision):
+                    # Forward pass
+                    if cache is None:
+                        next_logits = self.model(window)[:, -1]
+                    elif conversation is not None and fed is None:
+                        next_logits = conversation.prefill(window, window_stride=window_stride)
+                    else:
+                        next_logits = self.model.decode_step(window, cache, window_stride=window_stride)
+                    fed = window
+
+                    # Repetition penalty + temperature + top-k sampling, all on tensors (PAD/UNK never sampled)
+                    next_ids = sample_next(next_logits, tokens.recent(20), temperature=temperature, top_k=k,
+                                           banned_ids=(pad_id, unk_id))
+
+                # Appends next token into the preallocated buffer
+                tokens.append(next_ids)
+                yield next_ids.item(), tokens.window(self.model.max_seq_len)
+        finally:
+            # Also when a stream is closed early - record what the cache holds for the next turn
+            if conversation is not None and fed is not None:
+                conversation.sync(fed)
+
+    def _remember(self, prompt, reply):
         # Save User message + Bot reply to memory,
         self.memory.append(f"User: {prompt}")
         self.memory.append(f"Bot: {reply}")
         self.memory = self.memory[-8:]   # saves only 10 most recent messages
 
-        return reply
-
     # === Loads Model into ChatBot === #
-    def load_model(self, model_path="models/tinyGPT_checkpoint.pt", sp_model="models/studybuddy_sp.model"):
+    def load_model(self, model_path="models/tinyGPT_checkpoint.pt", sp_model="models/studybuddy_sp.model", precision="fp32"):
         self.tokenizer = SentencePieceTokenizer(sp_model)
 
-        vocab_size = self.tokenizer.vocab_size
-
-        # recreate model with correct vocab size
-        self.model = TinyGPT(vocab_size=vocab_size,
-                             embed_dim=128,
-                             n_heads=4,
-                             hidden_dim=256,
-                             max_seq_len=192)
+        self.model = load_tinygpt(model_path, self.tokenizer.vocab_size)
 
-        ckpt = torch.load(model_path, map_location="cpu")
+        # fp32 / int8 (dynamic quantized) / bf16 (autocast)
+        self.model = prepare_for_inference(self.model, precision)
+        self.precision = precision
+        self.conversation = None
+        self.speculative = None         # a draft has to be loaded again for the new model
 
-        # Case 1: It's loading a checkpoint (contains 'model' key)
-        if isinstance(ckpt, dict) and "model" in ckpt:
-            print("Detected checkpoint file — loading state_dict from 'model' key.")
-            self.model.load_state_dict(ckpt["model"])
-
-        # Case 2: Loading final model .pt (pure state_dict)
-        else:
-            print("Detected raw model state_dict — loading directly.")
-            self.model.load_state_dict(ckpt)
+        print(f"Model Successfully loaded and ready ({precision})")
 
-        self.model.eval()
-
-        print("Model Successfully loaded and ready")
+    # === Loads the Draft Model for Speculative Decoding === #
+    def load_draft_model(self, model_path="models/draft/tinyGPT.pt", draft_tokens=4):
+        """
+        A much smaller TinyGPT (MODEL_SIZES["draft"], train with train_model.py --model-size draft) that
+        proposes draft_tokens tokens per step for the main model to verify - same reply distribution, fewer big passes.
+        """
+        if self.model is None:
+            raise RuntimeError("Load the main model before the draft model")
+        draft = prepare_for_inference(load_tinygpt(model_path, self.tokenizer.vocab_size, "draft"), self.precision)
+        self.speculative = SpeculativeDecoder(self.model, draft, draft_tokens, cache_dtype=cache_dtype(self.precision))
+        print(f"Draft model loaded - speculative decoding with {draft_tokens} draft tokens")
 
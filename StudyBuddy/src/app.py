@@ -1,9 +1,10 @@
+import os
 import tkinter as tk
 from pomodoro import Pomodoro
 from ocr import grab_text, extract_keywords
 from voice_mode import listen_to_voice, speak_text
 import threading
-from ai_engine import LocalChatBot
+from chat_client import RemoteChatBot
 
 class App(tk.Tk):
     # Initializes the GUI with Tkinter
@@ -12,14 +13,25 @@ class App(tk.Tk):
         
         self.last_checked_keywords = []
         self.last_user_input = ""
+        self.replying = False       # one reply at a time, the bot's memory + KV cache aren't thread safe
         self.title("StudyBuddy - Hello")
         self.geometry("850x400")
         # Creates text object and pads vertically by 20 pixels
         tk.Label(self, text="StudyBuddy 1.2", font=("Segoe UI", 16)).pack(pady=20)
         
         # === Chatbot ===
-        self.bot = LocalChatBot()
-        self.bot.load_model("models/tinyGPT_checkpoint.pt", "models/studybuddy_sp.model")
+        # STUDYBUDDY_SERVER=http://127.0.0.1:8765 -> thin client of src/inference_server.py (no model in this process)
+        server_url = os.environ.get("STUDYBUDDY_SERVER")
+        if server_url:
+            self.bot = RemoteChatBot(server_url)
+        else:
+            from ai_engine import LocalChatBot      # only the in-process bot needs torch
+            self.bot = LocalChatBot()
+            # Prefer the exported inference weights (fast, memory-mapped) when they exist
+            model_path = "models/tinyGPT_inference.pt"
+            if not os.path.exists(model_path):
+                model_path = "models/tinyGPT_checkpoint.pt"
+            self.bot.load_model(model_path, "models/studybuddy_sp.model")
         
         # ==== Layout ==== 
         main_frame = tk.Frame(self)
@@ -85,8 +97,8 @@ class App(tk.Tk):
         scan_btn = tk.Button(entry_frame, text="Scan", command=self.scan_screen)
         scan_btn.pack(side="right", padx=(5, 0), pady=8)
         
-        send_btn = tk.Button(entry_frame, text="Send", command=self.send_message)
-        send_btn.pack(side="right")
+        self.send_btn = tk.Button(entry_frame, text="Send", command=self.send_message)
+        self.send_btn.pack(side="right")
     
     # launches the voice interaction in a separate background thread
     # .voice_interaction() -> records voice, speech-to-text, showing text in chat
@@ -164,15 +176,41 @@ class App(tk.Tk):
     def send_message(self, event=None):
         # Gets text from chat box and converts to list
         last_user_input = self.chat_entry.get().strip()
-        if not last_user_input:
+        # Enter still fires while the Send button is disabled
+        if not last_user_input or self.replying:
             return None
         self.display_message("You", last_user_input)
         # Clears the text entry box
         self.chat_entry.delete(0, tk.END)
         
-        # Generates and displays an AI response
-        ai_reply = self.bot.generate(last_user_input)
-        self.display_message("StudyBuddy", ai_reply)
+        # Generates the AI response in the background and streams it into the chat box
+        self.set_replying(True)
+        threading.Thread(target=self.stream_reply, args=(last_user_input,), daemon=True).start()
+    
+    # Runs on a worker thread, hands each text piece to the Tk thread as soon as it's sampled
+    def stream_reply(self, user_input):
+        self.after(0, self.chat_display_append, "StudyBuddy: ")
+        try:
+            for piece in self.bot.stream(user_input):
+                self.after(0, self.chat_display_append, piece)
+        except (RuntimeError, ValueError, OSError) as e:
+            # Model errors (ValueError: KV cache overflow), server busy/failed (RuntimeError), unreachable (OSError)
+            self.after(0, self.chat_display_append, f"[{e}]")
+        finally:
+            self.after(0, self.chat_display_append, "\n\n")
+            self.after(0, self.set_replying, False)
+
+    # Blocks sending while a reply is streaming (runs on the Tk thread)
+    def set_replying(self, replying):
+        self.replying = replying
+        self.send_btn.config(state="disabled" if replying else "normal")
+    
+    # Appends raw text to the end of the chat box
+    def chat_display_append(self, text):
+        self.chat_display.config(state="normal")
+        self.chat_display.insert(tk.END, text)
+        self.chat_display.see(tk.END)
+        self.chat_display.config(state="disabled")
     
     # Displays message to chat box
     def display_message(self, sender, message):
@@ -0,0 +1,77 @@
+# ===================================================================================== #
+#    Batch Tokenize Benchmark - per-text encode/decode loops vs. encode_batch /         #
+#       decode_batch, and chat prompt encoding with vs. without the turn cache          #
+#       run from StudyBuddy/:  python src/benchmarks/bench_batch_tokenize.py [texts]    #
+# ===================================================================================== #
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from ai_engine import SentencePieceTokenizer, format_prompt
+
+SP_MODEL = "models/studybuddy_sp.model"
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def loop_encode(tokenizer, texts, max_len):
+    # What callers did before: one encode() per text, then pad by hand
+    out = np.zeros((len(texts), max_len), dtype=np.int64)
+    for row, text in zip(out, texts):
+        ids = tokenizer.encode(text)[:max_len]
+        row[:len(ids)] = ids
+    return out
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "data/processed/conversation_data.txt"
+    with open(source, "r", encoding="utf-8") as f:
+        conversations = [c for c in f.read().split("\n\n") if c.strip()]
+    texts = conversations[:4000]
+    tokenizer = SentencePieceTokenizer(SP_MODEL)
+    threads = os.cpu_count() or 1
+
+    print(f"\n{len(texts):,} conversations from {source}, {threads} threads")
+    print(f"{'':<36} {'seconds':>8} {'texts/s':>10}")
+
+    loop_s, loop_ids = timed(lambda: loop_encode(tokenizer, texts, 192))
+    batch_s, (batch_ids, _) = timed(lambda: tokenizer.encode_batch(texts, max_len=192))
+    assert np.array_equal(loop_ids, batch_ids)
+    print(f"{'encode loop + pad':<36} {loop_s:>8.3f} {len(texts) / loop_s:>10,.0f}")
+    print(f"{'encode_batch':<36} {batch_s:>8.3f} {len(texts) / batch_s:>10,.0f}")
+
+    loop_s, loop_text = timed(lambda: [tokenizer.decode(row) for row in batch_ids.tolist()])
+    batch_s, batch_text = timed(lambda: tokenizer.decode_batch(batch_ids))
+    assert loop_text == batch_text
+    print(f"{'decode loop':<36} {loop_s:>8.3f} {len(texts) / loop_s:>10,.0f}")
+    print(f"{'decode_batch':<36} {batch_s:>8.3f} {len(texts) / batch_s:>10,.0f}")
+
+    # Chat: every turn's prompt re-sends the last 8 turns of memory
+    turns = [line.split(": ", 1)[-1] for c in conversations[:300] for line in c.split("\n")]
+
+    def chat(encode):
+        memory, n = [], 0
+        for user, bot in zip(turns[::2], turns[1::2]):
+            n += len(encode(memory, user))
+            memory = (memory + [f"User: {user}", f"Bot: {bot}"])[-8:]
+        return n
+
+    plain_s, plain_n = timed(lambda: chat(lambda memory, prompt: tokenizer.encode(format_prompt(memory, prompt))))
+    tokenizer._encode_turn.cache_clear()
+    cached_s, cached_n = timed(lambda: chat(tokenizer.encode_prompt), repeat=1)
+    assert plain_n == cached_n
+    n_prompts = len(turns) // 2
+    print(f"{'chat prompts, encode(format_prompt)':<36} {plain_s:>8.3f} {n_prompts / plain_s:>10,.0f}")
+    print(f"{'chat prompts, encode_prompt':<36} {cached_s:>8.3f} {n_prompts / cached_s:>10,.0f}   ({tokenizer._encode_turn.cache_info().hits:,} cache hits)")
+
+if __name__ == "__main__":
+    main()
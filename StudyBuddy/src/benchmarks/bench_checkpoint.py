@@ -0,0 +1,80 @@
+# ===================================================================================== #
+#    Checkpoint Benchmark - how long the training loop is paused per checkpoint:        #
+#       synchronous torch.save vs. CheckpointManager (CPU snapshot + background write)  #
+#       run from StudyBuddy/:  python src/benchmarks/bench_checkpoint.py                #
+# ===================================================================================== #
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+import torch
+from torch import nn
+
+from ai_engine import TinyGPT
+from checkpoint_manager import CheckpointManager, list_checkpoints
+from train_model import load_checkpoint, save_checkpoint, train_step
+
+def build(seed=0):
+    # One real step so Adam has its exp_avg / exp_avg_sq buffers (2/3 of a checkpoint)
+    torch.manual_seed(seed)
+    model = TinyGPT(vocab_size=10_000, embed_dim=128, n_heads=4, hidden_dim=256, max_seq_len=192)
+    optimizer = torch.optim.Adam(model.parameters(), lr=5e-4)
+    x = torch.randint(3, 10_000, (4, 193))
+    train_step(model, optimizer, nn.CrossEntropyLoss(), [(x[:, :-1], x[:, 1:])])
+    return model, optimizer
+
+def main(repeats=5, keep_last=3):
+    model, optimizer = build()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Legacy: torch.save straight onto the only checkpoint, on the training thread
+        legacy = []
+        for step in range(repeats):
+            start = time.perf_counter()
+            torch.save({"model": model.state_dict(), "optimizer": optimizer.state_dict(),
+                        "epoch": 0, "global_step": step}, os.path.join(folder, "legacy.pt"))
+            legacy.append(time.perf_counter() - start)
+
+        # save_checkpoint: same, plus temp file + fsync + rename
+        atomic = []
+        for step in range(repeats):
+            start = time.perf_counter()
+            save_checkpoint(model, optimizer, 0, step, folder=folder)
+            atomic.append(time.perf_counter() - start)
+
+        # CheckpointManager: pause = snapshot only, the write overlaps the (simulated) next steps
+        manager = CheckpointManager(folder=folder, keep_last=keep_last, every_steps=1)
+        paused, total = [], []
+        for step in range(1, repeats + 1):
+            start = time.perf_counter()
+            manager.maybe_save(model, optimizer, 0, step)
+            paused.append(time.perf_counter() - start)
+            time.sleep(0.5)         # training continues meanwhile
+        start = time.perf_counter()
+        manager.close()
+        tail = time.perf_counter() - start
+
+        size_mb = os.path.getsize(manager.latest_path) / 2**20
+        kept = list_checkpoints(folder)
+
+        # Resume goes through the newest file
+        fresh_model, fresh_optimizer = build(seed=1)
+        _, _, _, resumed_step = load_checkpoint(fresh_model, fresh_optimizer, folder=folder)
+        same = all(torch.equal(a, b) for a, b in zip(model.state_dict().values(), fresh_model.state_dict().values()))
+
+    ms = lambda xs: f"{1000 * sorted(xs)[len(xs) // 2]:8.1f}"
+    print(f"\ncheckpoint size {size_mb:.1f} MB, median of {repeats}")
+    print(f"{'method':<32} {'loop pause ms':>13}")
+    print(f"{'torch.save (legacy)':<32} {ms(legacy):>13}")
+    print(f"{'save_checkpoint (atomic, sync)':<32} {ms(atomic):>13}")
+    print(f"{'CheckpointManager (async)':<32} {ms(paused):>13}")
+    print(f"\nkept {len(kept)} step files (keep_last={keep_last}), last write finished {1000 * tail:.1f} ms after close()")
+    print(f"resumed at step {resumed_step}, weights identical: {same}")
+
+if __name__ == "__main__":
+    main()
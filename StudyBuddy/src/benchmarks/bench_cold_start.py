@@ -0,0 +1,83 @@
+# ===================================================================================== #
+#    Cold Start Benchmark - torch.load of the checkpoint vs. mmap'd inference file      #
+#       run from StudyBuddy/:  python src/benchmarks/bench_cold_start.py                #
+# ===================================================================================== #
+
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+import torch
+
+from bench_utils import private_mb, rss_mb
+from ai_engine import LocalChatBot, SentencePieceTokenizer, TinyGPT
+from export_model import export_inference_weights
+
+SP_MODEL = "models/studybuddy_sp.model"
+
+# The load path LocalChatBot.load_model used before mmap / inference weights
+def legacy_load(model_path):
+    bot = LocalChatBot()
+    bot.tokenizer = SentencePieceTokenizer(SP_MODEL)
+    bot.model = TinyGPT(vocab_size=bot.tokenizer.vocab_size, embed_dim=128, n_heads=4, hidden_dim=256, max_seq_len=192)
+    ckpt = torch.load(model_path, map_location="cpu")
+    bot.model.load_state_dict(ckpt["model"])
+    bot.model.eval()
+    return bot
+
+def current_load(model_path):
+    bot = LocalChatBot()
+    bot.load_model(model_path, SP_MODEL)
+    return bot
+
+def measure(name, loader, model_path, results):
+    # Fresh process each time: nothing imported-and-warm except the page cache
+    before_rss, before_private = rss_mb(), private_mb()
+    start = time.perf_counter()
+    bot = loader(model_path)
+    with torch.no_grad():
+        bot.model(torch.tensor([[5, 6, 7]]))    # first forward touches every weight page
+    results[name] = ((time.perf_counter() - start) * 1000, rss_mb() - before_rss, private_mb() - before_private)
+
+def make_checkpoint(path):
+    # Same layout as train_model.save_checkpoint, with real Adam state after one step
+    model = TinyGPT(vocab_size=10000, embed_dim=128, n_heads=4, hidden_dim=256, max_seq_len=192)
+    optimizer = torch.optim.Adam(model.parameters(), lr=5e-4)
+    model(torch.randint(0, 10000, (2, 16))).sum().backward()
+    optimizer.step()
+    torch.save({"model": model.state_dict(), "optimizer": optimizer.state_dict(),
+                "epoch": 0, "global_step": 1}, path)
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        ckpt_path = os.environ.get("CKPT", "models/tinyGPT_checkpoint.pt")
+        if not os.path.exists(ckpt_path):
+            ckpt_path = os.path.join(folder, "tinyGPT_checkpoint.pt")
+            make_checkpoint(ckpt_path)
+        infer_path = export_inference_weights(ckpt_path, os.path.join(folder, "tinyGPT_inference.pt"))
+
+        ctx = mp.get_context("spawn")
+        results = ctx.Manager().dict()
+        runs = [
+            ("torch.load checkpoint (old)", legacy_load, ckpt_path),
+            ("mmap checkpoint", current_load, ckpt_path),
+            ("mmap inference weights", current_load, infer_path),
+        ]
+        for name, loader, path in runs:
+            p = ctx.Process(target=measure, args=(name, loader, path, results))
+            p.start()
+            p.join()
+
+        print(f"\ncheckpoint {os.path.getsize(ckpt_path) / 2**20:.1f} MB, "
+              f"inference weights {os.path.getsize(infer_path) / 2**20:.1f} MB")
+        print(f"{'load path':<30} {'ms to first forward':>20} {'+RSS MB':>8} {'+private MB':>12}")
+        for name, _, _ in runs:
+            ms, mb, private = results[name]
+            print(f"{name:<30} {ms:>20.1f} {mb:>8.1f} {private:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# ===================================================================================== #
+#    Dataset Sampling Benchmark - corpus coverage per epoch and loader throughput       #
+#       for each TextDataset sampling mode                                              #
+#       run from StudyBuddy/:  python src/benchmarks/bench_dataset_sampling.py [corpus] #
+# ===================================================================================== #
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+import torch
+from torch.utils.data import DataLoader
+
+from ai_engine import SentencePieceTokenizer
+from token_cache import get_token_ids
+from train_model import TextDataset
+
+SP_MODEL = "models/studybuddy_sp.model"
+
+def throughput(dataset, batch_size=32, n_batches=200):
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=0)
+    start = time.perf_counter()
+    seen = 0
+    for i, (x, _) in enumerate(loader):
+        seen += x.shape[0]
+        if i + 1 == n_batches:
+            break
+    return seen / (time.perf_counter() - start)
+
+def main(seq_len=192, max_samples=500_000):
+    corpus = sys.argv[1] if len(sys.argv) > 1 else "data/processed/final_dataset.txt"
+    torch.manual_seed(0)
+    tokenizer = SentencePieceTokenizer(SP_MODEL)
+    ids = get_token_ids(tokenizer, corpus, SP_MODEL)
+    packed_ids = get_token_ids(tokenizer, corpus, SP_MODEL, doc_sep_id=tokenizer.sp.eos_id())
+
+    modes = [
+        ("sliding", ids, None),
+        ("stride", ids, seq_len // 2),
+        ("stride", ids, None),
+        ("random", ids, None),
+        ("packed", packed_ids, None),
+    ]
+
+    print(f"\ncorpus: {len(ids):,} tokens, seq_len {seq_len}, max_samples {max_samples:,}")
+    print(f"{'mode':<14} {'samples':>9} {'tokens read':>13} {'covered':>13} {'% corpus':>9} {'read/covered':>13} {'samples/s':>10}")
+    for sampling, token_ids, stride in modes:
+        ds = TextDataset(tokenizer, ids=token_ids, seq_len=seq_len, max_samples=max_samples,
+                         sampling=sampling, stride=stride)
+        read = len(ds) * (seq_len + 1)
+        covered = ds.tokens_covered()
+        name = sampling + (f" {ds.stride}" if sampling == "stride" else "")
+        print(f"{name:<14} {len(ds):>9,} {read:>13,} {covered:>13,} {covered / len(token_ids):>8.1%} "
+              f"{read / covered:>13.1f} {throughput(ds):>10.0f}")
+
+if __name__ == "__main__":
+    main()
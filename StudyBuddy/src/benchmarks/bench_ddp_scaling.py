@@ -0,0 +1,94 @@
+# ===================================================================================== #
+#    DDP Scaling Benchmark - training samples/sec at 1, 2, 4 and 8 CPU processes        #
+#       (gloo all-reduce, same per-process batch, random tokens so no corpus is needed) #
+#       run from StudyBuddy/:  python src/benchmarks/bench_ddp_scaling.py               #
+# ===================================================================================== #
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch import nn
+from torch.nn.parallel import DistributedDataParallel as DDP
+from torch.utils.data import DataLoader, DistributedSampler
+
+from ai_engine import TinyGPT
+from train_model import TextDataset, init_distributed, train_step
+
+VOCAB_SIZE = 10_000
+SEQ_LEN = 192
+
+def worker(rank, world_size, batch_size, warmup, steps, results):
+    if world_size > 1:
+        init_distributed(rank, world_size)
+    else:
+        torch.set_num_threads(os.cpu_count() or 1)
+
+    rng = np.random.default_rng(0)
+    ids = rng.integers(3, VOCAB_SIZE, size=2_000_000, dtype=np.uint16)
+    dataset = TextDataset(None, ids=ids, seq_len=SEQ_LEN, sampling="stride")
+    sampler = DistributedSampler(dataset, num_replicas=world_size, rank=rank) if world_size > 1 else None
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=sampler is None, sampler=sampler)
+
+    torch.manual_seed(0)
+    model = TinyGPT(vocab_size=VOCAB_SIZE, embed_dim=128, n_heads=4, hidden_dim=256, max_seq_len=SEQ_LEN)
+    if world_size > 1:
+        model = DDP(model)
+    optimizer = torch.optim.Adam(model.parameters(), lr=5e-4)
+    loss_fn = nn.CrossEntropyLoss()
+    model.train()
+
+    batches = iter(loader)
+    for _ in range(warmup):
+        train_step(model, optimizer, loss_fn, [next(batches)])
+
+    if world_size > 1:
+        dist.barrier()
+    start = time.perf_counter()
+    for _ in range(steps):
+        train_step(model, optimizer, loss_fn, [next(batches)])
+    if world_size > 1:
+        dist.barrier()
+    elapsed = time.perf_counter() - start
+
+    if rank == 0:
+        results.put(elapsed)
+    if world_size > 1:
+        dist.destroy_process_group()
+
+def run(world_size, batch_size, warmup, steps):
+    # Fresh port per run so a socket still in TIME_WAIT from the last run can't block it
+    os.environ["MASTER_PORT"] = str(29500 + world_size)
+    results = mp.get_context("spawn").SimpleQueue()
+    mp.spawn(worker, args=(world_size, batch_size, warmup, steps, results), nprocs=world_size, join=True)
+    return results.get()
+
+def main():
+    parser = argparse.ArgumentParser(description="TinyGPT data-parallel training throughput")
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=32, help="per process")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"\n{os.cpu_count()} CPU cores, per-process batch {args.batch_size}, seq_len {SEQ_LEN}")
+    print(f"{'procs':>5} {'threads/proc':>13} {'step ms':>9} {'samples/s':>10} {'speedup':>8}")
+    base = None
+    for world_size in args.procs:
+        elapsed = run(world_size, args.batch_size, args.warmup, args.steps)
+        samples_per_sec = args.steps * args.batch_size * world_size / elapsed
+        base = base or samples_per_sec
+        threads = max(1, (os.cpu_count() or 1) // world_size)
+        print(f"{world_size:>5} {threads:>13} {elapsed / args.steps * 1000:>9.1f} "
+              f"{samples_per_sec:>10.1f} {samples_per_sec / base:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
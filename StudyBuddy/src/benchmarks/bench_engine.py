@@ -0,0 +1,50 @@
+# ===================================================================================== #
+#    Generation Engine Benchmark - throughput vs. number of concurrent conversations    #
+#       run from StudyBuddy/:  python src/benchmarks/bench_engine.py                    #
+# ===================================================================================== #
+
+import torch
+
+from bench_utils import load_bench_bot, time_it
+from generation_engine import GenerationEngine
+
+PROMPTS = [
+    "What is two's complement?",
+    "How do interrupts get serviced on the Cortex-M0?",
+    "Explain git merge conflicts",
+    "What does malloc return when it fails?",
+    "Write a regex for an email address",
+    "What is the difference between RISC and CISC?",
+    "How do I mock a file in a Python unit test?",
+    "What is a makefile target?",
+]
+
+def run_engine(bot, prompts, batch_size, max_len):
+    engine = GenerationEngine(bot.model, bot.tokenizer, max_batch_size=batch_size)
+    # mixed settings per conversation, like real sessions
+    for i, p in enumerate(prompts):
+        engine.submit(p, max_len=max_len, k=4 + i % 8, temperature=0.5 + 0.1 * (i % 5))
+    return engine.run()
+
+def run_sequential(bot, prompts, max_len):
+    for p in prompts:
+        bot.memory = []
+        bot.generate(p, max_len=max_len)
+
+def main(n_conversations=16, max_len=100):
+    torch.set_num_threads(1)
+    torch.manual_seed(0)
+    bot = load_bench_bot()
+    prompts = (PROMPTS * n_conversations)[:n_conversations]
+    total_steps = n_conversations * max_len
+
+    print(f"\n--- {n_conversations} conversations x {max_len} steps ---")
+    secs, _ = time_it(lambda: run_sequential(bot, prompts, max_len), repeats=1)
+    print(f"{'sequential generate':<22} {total_steps / secs:8.1f} tokens/sec")
+
+    for batch_size in (1, 2, 4, 8, 16):
+        secs, _ = time_it(lambda: run_engine(bot, prompts, batch_size, max_len), repeats=1)
+        print(f"{'engine batch ' + str(batch_size):<22} {total_steps / secs:8.1f} tokens/sec")
+
+if __name__ == "__main__":
+    main()
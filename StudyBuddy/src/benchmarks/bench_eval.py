@@ -0,0 +1,71 @@
+# ===================================================================================== #
+#    Eval Benchmark - held-out perplexity throughput: training-style no_grad pass vs.   #
+#       evaluate() (eval mode + inference_mode, big batches), next to training speed    #
+#       run from StudyBuddy/:  python src/benchmarks/bench_eval.py                      #
+# ===================================================================================== #
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch import nn
+
+from ai_engine import TinyGPT
+from evaluate import evaluate
+from train_model import train_step
+
+SEQ_LEN = 192
+VOCAB_SIZE = 10_000
+
+def naive_eval(model, eval_ids, batch_size=32):
+    # What a first version would do: training mode, no_grad, training batch size
+    model.train()
+    starts = range(0, len(eval_ids) - SEQ_LEN, SEQ_LEN)
+    total, n = 0.0, 0
+    with torch.no_grad():
+        for i in range(0, len(starts), batch_size):
+            batch = torch.from_numpy(np.stack([eval_ids[s:s + SEQ_LEN + 1] for s in starts[i:i + batch_size]]).astype(np.int64))
+            logits = model(batch[:, :-1])
+            total += F.cross_entropy(logits.reshape(-1, VOCAB_SIZE), batch[:, 1:].reshape(-1), reduction="sum").item()
+            n += batch[:, 1:].numel()
+    return total / n
+
+def main(eval_tokens=100_000):
+    torch.manual_seed(0)
+    model = TinyGPT(vocab_size=VOCAB_SIZE, embed_dim=128, n_heads=4, hidden_dim=256, max_seq_len=SEQ_LEN)
+    optimizer = torch.optim.Adam(model.parameters(), lr=5e-4)
+    eval_ids = np.random.default_rng(0).integers(3, VOCAB_SIZE, size=eval_tokens, dtype=np.uint16)
+
+    # Training throughput for reference
+    x = torch.randint(3, VOCAB_SIZE, (32, SEQ_LEN + 1))
+    train_step(model, optimizer, nn.CrossEntropyLoss(), [(x[:, :-1], x[:, 1:])])
+    start = time.perf_counter()
+    for _ in range(3):
+        train_step(model, optimizer, nn.CrossEntropyLoss(), [(x[:, :-1], x[:, 1:])])
+    train_tps = 3 * 32 * SEQ_LEN / (time.perf_counter() - start)
+
+    print(f"\n{eval_tokens:,} held-out tokens, training runs at {train_tps:,.0f} tokens/s")
+    print(f"{'eval pass':<38} {'seconds':>8} {'tokens/s':>9} {'loss':>8}")
+
+    start = time.perf_counter()
+    loss = naive_eval(model, eval_ids)
+    elapsed = time.perf_counter() - start
+    print(f"{'train mode + no_grad, batch 32':<38} {elapsed:>8.2f} {eval_tokens / elapsed:>9,.0f} {loss:>8.4f}")
+
+    for precision, batch_size in (("fp32", 64), ("fp32", 128), ("bf16", 128)):
+        result = evaluate(model, eval_ids, SEQ_LEN, batch_size=batch_size, precision=precision)
+        label = f"evaluate() {precision}, batch {batch_size}"
+        print(f"{label:<38} {result['eval_s']:>8.2f} {result['eval_tokens'] / result['eval_s']:>9,.0f} {result['eval_loss']:>8.4f}")
+
+    budget = evaluate(model, eval_ids, SEQ_LEN, batch_size=128, max_tokens=20_000)
+    label = "evaluate() fp32, 20k token budget"
+    print(f"{label:<38} {budget['eval_s']:>8.2f} {budget['eval_tokens'] / budget['eval_s']:>9,.0f} {budget['eval_loss']:>8.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# ===================================================================================== #
+#    KV Cache Benchmark - full forward every step vs. cached incremental decoding       #
+#       run from StudyBuddy/:  python src/benchmarks/bench_kv_cache.py                  #
+# ===================================================================================== #
+
+import torch
+
+from bench_utils import load_bench_bot, time_it
+
+PROMPT = "Can you explain how a stack frame is set up during a subroutine call?"
+
+def run(bot, use_cache, window_stride, max_len, seed=0):
+    # same seed -> same samples, so both modes must give the same reply
+    torch.manual_seed(seed)
+    bot.memory = []
+    return bot.generate(PROMPT, max_len=max_len, use_cache=use_cache, window_stride=window_stride)
+
+def main(max_len=200):
+    torch.set_num_threads(1)
+    bot = load_bench_bot()
+
+    modes = [
+        ("full forward",         False, 1),
+        ("kv cache (exact)",     True,  1),
+        ("kv cache (stride 32)", True,  32),
+    ]
+
+    print(f"\n--- Generating {max_len} tokens ---")
+    baseline = None
+    for name, use_cache, stride in modes:
+        secs, reply = time_it(lambda: run(bot, use_cache, stride, max_len))
+        if baseline is None:
+            baseline = reply
+        match = "same reply" if reply == baseline else "different reply"
+        print(f"{name:<22} {max_len / secs:8.1f} tokens/sec  ({secs:.2f} s)  {match}")
+
+if __name__ == "__main__":
+    main()
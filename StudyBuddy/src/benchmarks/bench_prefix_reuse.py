@@ -0,0 +1,71 @@
+# ===================================================================================== #
+#    Prefix Reuse Benchmark - time to first token on every turn of a chat, prompt       #
+#       re-run from scratch vs. the conversation's KV cache kept between turns          #
+#       run from StudyBuddy/:  python src/benchmarks/bench_prefix_reuse.py              #
+# ===================================================================================== #
+
+import time
+
+import torch
+
+from bench_utils import load_bench_bot
+
+TURNS = [
+    "Hi, can you help me study for my computer architecture exam?",
+    "What is a stack frame?",
+    "How is it set up during a subroutine call?",
+    "What happens to the link register on a nested call?",
+    "And how does the callee restore it before returning?",
+    "Can you give me a short example in assembly?",
+    "Thanks, what should I review next?",
+    "How do interrupts save the processor state?",
+    "Is that different from an exception?",
+    "What is a vector table?",
+    "How does the processor return from an interrupt handler?",
+    "Ok, last one: what is pipelining?",
+]
+
+def chat(bot, reuse_prefix, max_len, window_stride=1, seed=0):
+    """Runs every turn, returns [(prompt tokens, reused tokens, seconds to first token)]"""
+    torch.manual_seed(seed)
+    bot.memory = []
+    bot.conversation = None
+    results = []
+    for prompt in TURNS:
+        prompt_ids = bot.tokenizer.encode_prompt(bot.memory, prompt)
+        steps = bot._sample_steps(prompt_ids, max_len, k=8, temperature=0.7, use_cache=True,
+                                  window_stride=window_stride, reuse_prefix=reuse_prefix)
+        start = time.perf_counter()
+        reply_ids = [next(steps)[0]]
+        first = time.perf_counter() - start
+
+        reply_ids += [next_id for next_id, _ in steps]
+        reused = bot.conversation.reused if reuse_prefix else 0
+        results.append((min(len(prompt_ids), bot.model.max_seq_len), reused, first))
+        bot._remember(prompt, bot.tokenizer.decode(reply_ids).strip())
+    return results
+
+def best_of(runs):
+    """Fastest time to first token per turn over the runs"""
+    return [min(r) for r in zip(*([t[2] for t in run] for run in runs))]
+
+def main(max_len=200, strides=(1, 32), repeats=2):
+    torch.set_num_threads(1)
+    bot = load_bench_bot()
+
+    # Replies as long as the app's (max_len=200) fill the window and the memory (8 lines) drops turns, so
+    # every prompt starts somewhere new - the cache is only reused where rebase() lines it up again.
+    # With window_stride=1 a full cache has no room for the next turn; a larger stride leaves some.
+    for stride in strides:
+        # Best of a few runs per turn (same seed -> same replies -> same prompts every run)
+        fresh = best_of([chat(bot, False, max_len, window_stride=stride) for _ in range(repeats)])
+        runs = [chat(bot, True, max_len, window_stride=stride) for _ in range(repeats)]
+        reused = best_of(runs)
+
+        print(f"\n--- {len(TURNS)} turns, {max_len}-token replies, memory of 8 lines, window_stride={stride} ---")
+        print(f"{'turn':>4} {'prompt tok':>11} {'reused':>7} {'fresh ms':>9} {'reused ms':>10}")
+        for turn, ((n_prompt, n_reused, _), a, b) in enumerate(zip(runs[-1], fresh, reused), start=1):
+            print(f"{turn:>4} {n_prompt:>11} {n_reused:>7} {a * 1000:>9.2f} {b * 1000:>10.2f}")
+
+if __name__ == "__main__":
+    main()
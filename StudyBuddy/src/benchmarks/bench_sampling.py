@@ -0,0 +1,66 @@
+# ===================================================================================== #
+#    Sampling Benchmark - per-token overhead of the sampling step (model excluded)      #
+#       run from StudyBuddy/:  python src/benchmarks/bench_sampling.py                  #
+# ===================================================================================== #
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import torch
+import torch.nn.functional as F
+
+from sampling import TokenBuffer, sample_next
+
+VOCAB_SIZE = 10000
+
+# The per-step code LocalChatBot.generate used before the sampling module
+def legacy_step(encoded, logits, k=8, temperature=0.7, pad_id=0, unk_id=1):
+    last_logits = logits[0].detach().clone()
+    last_logits[pad_id] = -1e10
+    last_logits[unk_id] = -1e10
+    for prev_id in encoded[0].tolist()[-20:]:
+        last_logits[prev_id] *= 0.7
+    probs = F.softmax(last_logits / temperature, dim=0)
+    topk_probs, topk_idx = torch.topk(probs, k)
+    topk_probs /= torch.sum(topk_probs)
+    next_id = topk_idx[torch.multinomial(topk_probs, 1).item()].item()
+    return torch.cat([encoded, torch.tensor([[next_id]])], dim=1)
+
+def run_legacy(prompt, all_logits):
+    encoded = prompt.clone()
+    for logits in all_logits:
+        encoded = legacy_step(encoded, logits)
+    return encoded
+
+def run_vectorized(prompt, all_logits):
+    tokens = TokenBuffer(prompt, capacity=prompt.shape[1] + len(all_logits))
+    for logits in all_logits:
+        next_ids = sample_next(logits, tokens.recent(20), temperature=0.7, top_k=8)
+        tokens.append(next_ids)
+        next_ids.item()     # generate() needs the Python int for streaming, count that sync too
+    return tokens
+
+def main(steps=200):
+    torch.set_num_threads(1)
+    torch.manual_seed(0)
+    prompt = torch.randint(2, VOCAB_SIZE, (1, 40))
+    all_logits = [torch.randn(1, VOCAB_SIZE) for _ in range(steps)]
+
+    results = {}
+    for name, fn in (("legacy loop", run_legacy), ("sampling module", run_vectorized)):
+        fn(prompt, all_logits)      # warm up
+        start = time.perf_counter()
+        for _ in range(5):
+            fn(prompt, all_logits)
+        results[name] = (time.perf_counter() - start) / (5 * steps)
+
+    print(f"\n--- Sampling overhead per token ({steps} steps, vocab {VOCAB_SIZE}) ---")
+    for name, secs in results.items():
+        print(f"{name:<18} {secs * 1e6:8.1f} us/token")
+    print(f"speedup: {results['legacy loop'] / results['sampling module']:.2f}x")
+
+if __name__ == "__main__":
+    main()
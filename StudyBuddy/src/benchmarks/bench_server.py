@@ -0,0 +1,70 @@
+# ===================================================================================== #
+#    Inference Server Benchmark - N concurrent clients against 1 vs. 2 model workers:   #
+#       replies/sec, first piece + total latency, 503 rejections at a small queue       #
+#       run from StudyBuddy/:  python src/benchmarks/bench_server.py [model.pt]         #
+#                                                                                       #
+# ===================================================================================== #
+
+import sys
+import time
+import threading
+
+import bench_utils      # noqa: F401 - puts src/ on sys.path
+from inference_server import InferenceServer, default_model_path
+from chat_client import RemoteChatBot, ServerBusy
+
+PROMPTS = [
+    "Can you explain how a stack frame is set up during a subroutine call?",
+    "What happens to the link register on a nested subroutine call?",
+    "How was your weekend?",
+    "What should I study first for the exam?",
+]
+
+def start_server(model_path, workers, max_queue):
+    server = InferenceServer(("127.0.0.1", 0), workers=workers, max_queue=max_queue, model_path=model_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    while (RemoteChatBot(url).health() or {}).get("status") != "ok":
+        time.sleep(0.2)
+    return server, url
+
+def run(url, clients, max_len):
+    """Every client sends one prompt at the same time -> (seconds, replies, rejected)"""
+    results = []
+    def client(i):
+        bot = RemoteChatBot(url)
+        try:
+            for _ in bot.stream(PROMPTS[i % len(PROMPTS)], max_len=max_len):
+                pass
+            results.append("ok")
+        except ServerBusy:
+            results.append("busy")
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, results.count("ok"), results.count("busy")
+
+def main(clients=8, max_len=80):
+    model_path = sys.argv[1] if len(sys.argv) > 1 else default_model_path()
+    print(f"\n--- {clients} concurrent clients x {max_len} tokens ---")
+    print(f"{'setup':<22} {'replies/s':>9} {'ok':>4} {'503':>4} {'first p50':>10} {'total p50':>10}")
+
+    for workers, max_queue in ((1, clients), (2, clients), (2, 2)):
+        server, url = start_server(model_path, workers, max_queue)
+        try:
+            run(url, workers, max_len)          # warm-up, one request per worker
+            server.metrics = type(server.metrics)()
+            secs, ok, busy = run(url, clients, max_len)
+            stats = server.metrics_snapshot()
+        finally:
+            server.shutdown()
+            server.server_close()
+        print(f"{f'{workers} worker(s), queue {max_queue}':<22} {ok / secs:>9.2f} {ok:>4} {busy:>4} "
+              f"{stats['first_piece_ms'].get('p50', 0):>8.1f}ms {stats['total_ms'].get('p50', 0):>8.1f}ms")
+
+if __name__ == "__main__":
+    main()
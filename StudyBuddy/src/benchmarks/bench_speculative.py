@@ -0,0 +1,65 @@
+# ===================================================================================== #
+#    Speculative Decoding Benchmark - plain cached decoding vs. a draft model proposing #
+#       k tokens per target pass: tokens/sec, speedup, acceptance rate                  #
+#       run from StudyBuddy/:  python src/benchmarks/bench_speculative.py               #
+#                                  [model.pt] [draft.pt]                                #
+# ===================================================================================== #
+
+import os
+import sys
+import time
+
+import torch
+
+from bench_utils import load_bench_bot
+from ai_engine import MODEL_SIZES, TinyGPT, cache_dtype, prepare_for_inference
+from speculative import SpeculativeDecoder
+
+PROMPTS = [
+    "Can you explain how a stack frame is set up during a subroutine call?",
+    "What happens to the link register on a nested subroutine call?",
+    "How was your weekend?",
+    "What should I study first for the exam?",
+]
+DRAFT_TOKENS = (2, 3, 4, 6)
+
+def run(bot, max_len, seed=0):
+    """Seconds to generate max_len tokens for every prompt (fresh memory each time)"""
+    torch.manual_seed(seed)
+    start = time.perf_counter()
+    for prompt in PROMPTS:
+        bot.memory = []
+        bot.generate(prompt, max_len=max_len, reuse_prefix=False)
+    return time.perf_counter() - start
+
+def main(max_len=120, repeats=3):
+    torch.set_num_threads(1)
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "models/tinyGPT_checkpoint.pt"
+    draft_path = sys.argv[2] if len(sys.argv) > 2 else "models/draft/tinyGPT.pt"
+    bot = load_bench_bot(model_path)
+
+    if os.path.exists(draft_path):
+        bot.load_draft_model(draft_path)
+        draft = bot.speculative.draft
+    else:
+        print(f"No draft at {draft_path} - benchmarking a randomly initialized draft (expect almost no acceptance).")
+        draft = TinyGPT(vocab_size=bot.tokenizer.vocab_size, max_seq_len=bot.model.max_seq_len, **MODEL_SIZES["draft"])
+        draft = prepare_for_inference(draft, bot.precision)
+
+    n_tokens = max_len * len(PROMPTS)
+    print(f"\n--- {len(PROMPTS)} prompts x {max_len} tokens, 1 thread ---")
+    print(f"{'mode':<20} {'tokens/s':>9} {'speedup':>8} {'accept':>7} {'tok/pass':>9}")
+
+    bot.speculative = None
+    plain = min(run(bot, max_len) for _ in range(repeats))
+    print(f"{'plain (kv cache)':<20} {n_tokens / plain:>9.1f} {1.0:>7.2f}x {'':>7} {1.0:>9.2f}")
+
+    for k in DRAFT_TOKENS:
+        bot.speculative = SpeculativeDecoder(bot.model, draft, draft_tokens=k, cache_dtype=cache_dtype(bot.precision))
+        secs = min(run(bot, max_len) for _ in range(repeats))
+        spec = bot.speculative
+        print(f"{f'speculative k={k}':<20} {n_tokens / secs:>9.1f} {plain / secs:>7.2f}x "
+              f"{spec.acceptance_rate:>7.1%} {spec.tokens_per_pass:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# ===================================================================================== #
+#    Streaming Benchmark - time to first text piece vs. waiting for the whole reply     #
+#       run from StudyBuddy/:  python src/benchmarks/bench_streaming.py                 #
+# ===================================================================================== #
+
+import time
+
+import torch
+
+from bench_utils import load_bench_bot
+
+PROMPT = "What happens to the link register on a nested subroutine call?"
+
+def main(max_len=200):
+    torch.set_num_threads(1)
+    bot = load_bench_bot()
+
+    torch.manual_seed(0)
+    bot.memory = []
+    start = time.perf_counter()
+    bot.generate(PROMPT, max_len=max_len)
+    full = time.perf_counter() - start
+
+    torch.manual_seed(0)
+    bot.memory = []
+    start = time.perf_counter()
+    first = None
+    for _ in bot.stream(PROMPT, max_len=max_len):
+        if first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+
+    print(f"\n--- {max_len} steps ---")
+    print(f"generate(): reply after       {full * 1000:8.1f} ms")
+    print(f"stream():   first piece after {first * 1000:7.1f} ms, done after {total * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# ===================================================================================== #
+#    Tokenization Benchmark - whole-string encode vs. streaming chunked pool encode     #
+#       peak RSS and time for growing corpus sizes (Linux/macOS: uses `resource`)       #
+#       run from StudyBuddy/:  python src/benchmarks/bench_tokenize.py [source.txt]     #
+# ===================================================================================== #
+
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+import numpy as np
+import sentencepiece as spm
+
+from token_cache import stream_tokenize
+
+SP_MODEL = "models/studybuddy_sp.model"
+
+def peak_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+# The old path: whole corpus string -> Python list of IDs -> NumPy
+def legacy(corpus_path, out_path, results):
+    start = time.time()
+    sp = spm.SentencePieceProcessor()
+    sp.load(SP_MODEL)
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    ids = np.array(sp.encode(text, out_type=int), dtype=np.int32)
+    ids.astype(np.uint16).tofile(out_path)
+    results["legacy"] = (time.time() - start, peak_mb(), len(ids))
+
+def streaming(corpus_path, out_path, results):
+    start = time.time()
+    n = stream_tokenize(corpus_path, SP_MODEL, out_path, np.uint16, jobs=os.cpu_count())
+    # workers are children of this process, count their peak too
+    child = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    results["streaming"] = (time.time() - start, max(peak_mb(), child), n)
+
+def make_corpus(source, path, size_mb):
+    with open(source, "r", encoding="utf-8") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8") as out:
+        written = 0
+        while written < size_mb * 2**20:
+            out.write(text + "\n\n")
+            written += len(text) + 2
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "data/processed/final_dataset.txt"
+    ctx = mp.get_context("spawn")
+
+    print(f"{'corpus MB':>9} {'mode':<10} {'seconds':>8} {'peak MB':>8} {'tokens':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size_mb in (25, 50, 100):
+            corpus = os.path.join(folder, "corpus.txt")
+            make_corpus(source, corpus, size_mb)
+            results = ctx.Manager().dict()
+            for name, fn in (("legacy", legacy), ("streaming", streaming)):
+                p = ctx.Process(target=fn, args=(corpus, os.path.join(folder, name + ".bin"), results))
+                p.start()
+                p.join()
+                secs, peak, n = results[name]
+                print(f"{size_mb:>9} {name:<10} {secs:>8.1f} {peak:>8.0f} {n:>12,}")
+
+            a = np.fromfile(os.path.join(folder, "legacy.bin"), dtype=np.uint16)
+            b = np.fromfile(os.path.join(folder, "streaming.bin"), dtype=np.uint16)
+            print(f"{'':>9} token count difference: {abs(len(a) - len(b))} ({abs(len(a) - len(b)) / len(a) * 1e6:.1f} per million)")
+
+if __name__ == "__main__":
+    main()
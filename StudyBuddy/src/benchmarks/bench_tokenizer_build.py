@@ -0,0 +1,70 @@
+# ===================================================================================== #
+#    Tokenizer Build Benchmark - SentencePiece training time (all lines vs. sampled)    #
+#       and encode throughput (one call per line vs. one batched call) per vocab size   #
+#       run from StudyBuddy/:  python src/benchmarks/bench_tokenizer_build.py           #
+#                                  [corpus] [sample lines]                              #
+# ===================================================================================== #
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+import sentencepiece as spm
+
+from train_tokenizer import train_tokenizer
+
+VOCAB_SIZES = (4000, 8000, 10000, 16000)
+SAMPLE_SENTENCES = 200_000
+
+def encode_throughput(sp, lines, num_threads):
+    """(single tokens/s, batched tokens/s, tokens per character) over `lines`"""
+    start = time.perf_counter()
+    n_tokens = sum(len(sp.encode(line)) for line in lines)
+    single = n_tokens / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batched_ids = sp.encode(lines, num_threads=num_threads)
+    batched = sum(map(len, batched_ids)) / (time.perf_counter() - start)
+    return single, batched, n_tokens / sum(map(len, lines))
+
+def main():
+    corpus = sys.argv[1] if len(sys.argv) > 1 else "data/processed/final_dataset.txt"
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else SAMPLE_SENTENCES
+    threads = os.cpu_count() or 1
+    with open(corpus, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    eval_lines = lines[:20_000]
+    print(f"\n{corpus}: {os.path.getsize(corpus) / 2**20:.1f} MB, {len(lines):,} lines, {threads} threads")
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Full vs sampled training at the shipped vocab size
+        print(f"\n{'training (vocab 10000)':<30} {'seconds':>8}")
+        for label, size in (("all lines", 0), (f"{sample:,} sampled lines", sample)):
+            meta = train_tokenizer(corpus, os.path.join(folder, f"full{size}"), 10000,
+                                   input_sentence_size=size, num_threads=threads)
+            print(f"{label:<30} {meta['train_seconds']:>8.1f}")
+
+        start = time.perf_counter()
+        train_tokenizer(corpus, os.path.join(folder, f"full{sample}"), 10000,
+                        input_sentence_size=sample, num_threads=threads)
+        print(f"{'unchanged corpus (reused)':<30} {time.perf_counter() - start:>8.1f}")
+
+        # Encode throughput per candidate vocab size
+        print(f"\n{'vocab':>6} {'train s':>8} {'single tok/s':>13} {'batched tok/s':>14} {'tok/char':>9}")
+        for vocab_size in VOCAB_SIZES:
+            prefix = os.path.join(folder, f"vocab{vocab_size}")
+            try:
+                meta = train_tokenizer(corpus, prefix, vocab_size, input_sentence_size=sample, num_threads=threads)
+            except RuntimeError as e:
+                # SentencePiece refuses a vocab bigger than the corpus supports
+                print(f"{vocab_size:>6} skipped: {str(e).splitlines()[0]}")
+                continue
+            sp = spm.SentencePieceProcessor(model_file=prefix + ".model")
+            single, batched, per_char = encode_throughput(sp, eval_lines, threads)
+            print(f"{vocab_size:>6} {meta['train_seconds']:>8.1f} {single:>13,.0f} {batched:>14,.0f} {per_char:>9.3f}")
+
+if __name__ == "__main__":
+    main()
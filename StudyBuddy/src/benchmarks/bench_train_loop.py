@@ -0,0 +1,91 @@
+# ===================================================================================== #
+#    Training Loop Benchmark - tokens/sec and peak memory for every combination of      #
+#       precision (fp32 / bf16 autocast) x torch.compile x gradient accumulation        #
+#       run from StudyBuddy/:  python src/benchmarks/bench_train_loop.py                #
+# ===================================================================================== #
+
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+import torch
+from torch import nn
+
+from bench_utils import rss_mb
+from ai_engine import TinyGPT
+from train_model import train_step
+
+VOCAB_SIZE = 10_000
+SEQ_LEN = 192
+
+def run_combo(precision, compile_model, batch_size, accum_steps, warmup, steps, log_every, results):
+    # Own process per combination: ru_maxrss is a high-water mark and compile caches stick around
+    torch.manual_seed(0)
+    model = TinyGPT(vocab_size=VOCAB_SIZE, embed_dim=128, n_heads=4, hidden_dim=256, max_seq_len=SEQ_LEN)
+    optimizer = torch.optim.Adam(model.parameters(), lr=5e-4)
+    loss_fn = nn.CrossEntropyLoss()
+    model.train()
+    if compile_model:
+        model = torch.compile(model)
+
+    def micro_batches():
+        x = torch.randint(3, VOCAB_SIZE, (accum_steps, batch_size, SEQ_LEN + 1))
+        return [(x[i, :, :-1], x[i, :, 1:]) for i in range(accum_steps)]
+
+    base_rss = rss_mb()
+    compile_start = time.perf_counter()
+    for _ in range(warmup):
+        train_step(model, optimizer, loss_fn, micro_batches(), precision)
+    warmup_sec = time.perf_counter() - compile_start
+
+    running_loss = torch.zeros(())
+    start = time.perf_counter()
+    for step in range(1, steps + 1):
+        running_loss += train_step(model, optimizer, loss_fn, micro_batches(), precision)
+        if step % log_every == 0:
+            running_loss.item()
+    elapsed = time.perf_counter() - start
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    tokens = steps * accum_steps * batch_size * SEQ_LEN
+    results.put((tokens / elapsed, peak_mb, peak_mb - base_rss, warmup_sec))
+
+def main():
+    parser = argparse.ArgumentParser(description="TinyGPT training step throughput / memory")
+    parser.add_argument("--effective-batch", type=int, default=32)
+    parser.add_argument("--accum", type=int, nargs="+", default=[1, 4], help="accumulation steps to try")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--log-every", type=int, default=100, help="optimizer steps between loss read-backs")
+    parser.add_argument("--no-compile", action="store_true", help="skip the torch.compile rows")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    compile_options = [False] if args.no_compile else [False, True]
+
+    print(f"\neffective batch {args.effective_batch} x seq_len {SEQ_LEN}, {torch.get_num_threads()} threads")
+    print(f"{'precision':<9} {'compile':<7} {'micro x accum':>13} {'tokens/s':>9} {'peak MB':>8} {'train MB':>9} {'warmup s':>9}")
+    for precision, compile_model, accum_steps in itertools.product(("fp32", "bf16"), compile_options, args.accum):
+        batch_size = args.effective_batch // accum_steps
+        results = ctx.SimpleQueue()
+        proc = ctx.Process(target=run_combo, args=(precision, compile_model, batch_size, accum_steps,
+                                                   args.warmup, args.steps, args.log_every, results))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0:
+            print(f"{precision:<9} {str(compile_model):<7} {batch_size:>8} x {accum_steps:<2}   failed (exit {proc.exitcode})")
+            continue
+
+        tokens_per_sec, peak_mb, train_mb, warmup_sec = results.get()
+        print(f"{precision:<9} {str(compile_model):<7} {batch_size:>8} x {accum_steps:<2} {tokens_per_sec:>9.0f} "
+              f"{peak_mb:>8.0f} {train_mb:>9.0f} {warmup_sec:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# ===================================================================================== #
+#    Benchmark Utils - contians:                                                        #
+#       Bot Loader -- Timer -- Memory                                                   #
+#                                                                                       #
+# ===================================================================================== #
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import torch
+
+from ai_engine import LocalChatBot, SentencePieceTokenizer, TinyGPT, prepare_for_inference
+
+# ================================ #
+#       Load Bot For Benchmarks    #
+# ================================ #
+def load_bench_bot(model_path="models/tinyGPT_checkpoint.pt", sp_model="models/studybuddy_sp.model", seed=0, precision="fp32"):
+    """Loads the trained checkpoint if there is one, else a randomly initialized TinyGPT (same shapes, same speed)"""
+    bot = LocalChatBot()
+
+    if os.path.exists(model_path):
+        bot.load_model(model_path, sp_model, precision=precision)
+        return bot
+
+    print(f"No checkpoint at {model_path} - benchmarking a randomly initialized model.")
+    torch.manual_seed(seed)
+    bot.tokenizer = SentencePieceTokenizer(sp_model)
+    bot.model = TinyGPT(vocab_size=bot.tokenizer.vocab_size,
+                        embed_dim=128,
+                        n_heads=4,
+                        hidden_dim=256,
+                        max_seq_len=192)
+    bot.model = prepare_for_inference(bot.model, precision)
+    bot.precision = precision
+    return bot
+
+# ================ #
+#       Timer      #
+# ================ #
+def time_it(fn, repeats=3):
+    """Runs fn() `repeats` times, returns (best seconds, last result)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+# ================= #
+#       Memory      #
+# ================= #
+def rss_mb():
+    """Resident memory of this process in MB (psutil if installed, else /proc on Linux)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def private_mb():
+    """Memory private to this process in MB (RssAnon on Linux) - mmap'd file pages shared with other processes don't count"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return rss_mb()
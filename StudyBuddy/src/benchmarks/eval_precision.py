@@ -0,0 +1,95 @@
+# ===================================================================================== #
+#    Precision Evaluation - fp32 vs. int8 (dynamic) vs. bf16 (autocast) on CPU          #
+#       perplexity on a held-out slice of the corpus, latency, resident memory          #
+#       run from StudyBuddy/:  python src/benchmarks/eval_precision.py                  #
+# ===================================================================================== #
+
+import argparse
+import math
+import multiprocessing as mp
+
+import torch
+import torch.nn.functional as F
+
+from bench_utils import load_bench_bot, rss_mb, time_it
+from ai_engine import PRECISIONS, precision_context
+
+PROMPT = "What is the difference between polling and interrupts?"
+
+# ==================================== #
+#       Held-out Perplexity            #
+# ==================================== #
+def held_out_ids(tokenizer, corpus_path, held_out_frac=0.02, max_tokens=50_000):
+    """Encodes the LAST `held_out_frac` of the corpus (the part read last), capped at max_tokens"""
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    tail = text[int(len(text) * (1 - held_out_frac)):]
+    return tokenizer.sp.encode(tail, out_type=int)[:max_tokens]
+
+def perplexity(model, ids, precision, seq_len=192, batch_size=32):
+    # Non-overlapping windows, each predicts its next seq_len tokens
+    n_windows = (len(ids) - 1) // seq_len
+    if n_windows == 0:
+        raise ValueError("Held-out slice is shorter than one sequence")
+    data = torch.tensor(ids[:n_windows * seq_len + 1])
+
+    total_loss, total_tokens = 0.0, 0
+    with torch.no_grad(), precision_context(precision):
+        for start in range(0, n_windows, batch_size):
+            rows = range(start, min(start + batch_size, n_windows))
+            x = torch.stack([data[r * seq_len:(r + 1) * seq_len] for r in rows])
+            y = torch.stack([data[r * seq_len + 1:(r + 1) * seq_len + 1] for r in rows])
+            logits = model(x).float()
+            total_loss += F.cross_entropy(logits.reshape(-1, logits.shape[-1]), y.reshape(-1), reduction="sum").item()
+            total_tokens += y.numel()
+
+    return math.exp(total_loss / total_tokens)
+
+# ============================ #
+#       One Mode (subprocess)  #
+# ============================ #
+def evaluate(precision, corpus_path, held_out_frac, max_len, results):
+    torch.set_num_threads(1)
+    before = rss_mb()
+    bot = load_bench_bot(precision=precision)
+    model_mb = rss_mb() - before
+
+    ids = held_out_ids(bot.tokenizer, corpus_path, held_out_frac)
+    ppl = perplexity(bot.model, ids, precision, seq_len=bot.model.max_seq_len)
+
+    def reply():
+        torch.manual_seed(0)
+        bot.memory = []
+        bot.generate(PROMPT, max_len=max_len)
+    secs, _ = time_it(reply)
+
+    results[precision] = {"ppl": ppl, "ms_per_token": secs / max_len * 1000,
+                          "load_mb": model_mb, "rss_mb": rss_mb()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare TinyGPT inference precisions")
+    parser.add_argument("--corpus", default="data/processed/final_dataset.txt")
+    parser.add_argument("--held-out-frac", type=float, default=0.02)
+    parser.add_argument("--max-len", type=int, default=200)
+    args = parser.parse_args()
+
+    # Each mode in a fresh process so resident memory isn't shared between them
+    ctx = mp.get_context("spawn")
+    results = ctx.Manager().dict()
+    for precision in PRECISIONS:
+        p = ctx.Process(target=evaluate, args=(precision, args.corpus, args.held_out_frac, args.max_len, results))
+        p.start()
+        p.join()
+
+    base = results.get("fp32")
+    print(f"\n{'mode':<6} {'perplexity':>11} {'Δ ppl':>8} {'ms/token':>9} {'model MB':>9} {'RSS MB':>8}")
+    for precision in PRECISIONS:
+        if precision not in results:
+            print(f"{precision:<6} failed")
+            continue
+        r = results[precision]
+        delta = r["ppl"] - base["ppl"] if base else float("nan")
+        print(f"{precision:<6} {r['ppl']:>11.2f} {delta:>+8.2f} {r['ms_per_token']:>9.2f} {r['load_mb']:>9.1f} {r['rss_mb']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# ===================================================================================== #
+#    Chat Client - contians:                                                            #
+#       Thin client for inference_server.py (same generate()/stream() as LocalChatBot)  #
+#                                                                                       #
+# ===================================================================================== #
+
+import json
+import uuid
+import urllib.error
+import urllib.request
+
+SERVER_URL = "http://127.0.0.1:8765"
+
+class ServerBusy(RuntimeError):
+    """The server's queue is full (HTTP 503) - retry after `retry_after` seconds"""
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RemoteChatBot:
+    """
+    Talks to a running inference server instead of loading the model in this process.
+    The conversation memory is kept by the server under this client's session id.
+    """
+    def __init__(self, url=SERVER_URL, session_id=None, timeout=120):
+        self.url = url.rstrip("/")
+        self.session_id = session_id or uuid.uuid4().hex
+        self.timeout = timeout
+
+    # === Generates Response === #
+    def generate(self, prompt, max_len=200, k=8, temperature=0.7):
+        return self._chat(prompt, max_len, k, temperature, stream=False)["reply"]
+
+    # === Streams Response === #
+    def stream(self, prompt, max_len=200, k=8, temperature=0.7):
+        """Yields text pieces as the server samples them"""
+        with self._post_chat(prompt, max_len, k, temperature, stream=True) as response:
+            for line in response:       # one JSON event per line
+                event = json.loads(line)
+                if "error" in event:
+                    raise RuntimeError(f"Server error: {event['error']}")
+                if event.get("done"):
+                    return
+                yield event["piece"]
+
+    def reset(self):
+        """Forgets this session's conversation on the server"""
+        request = urllib.request.Request(f"{self.url}/v1/sessions/{self.session_id}", method="DELETE")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)["reset"]
+
+    def health(self):
+        """Server health dict, None if it can't be reached"""
+        try:
+            with urllib.request.urlopen(f"{self.url}/health", timeout=2) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            return json.load(e)
+        except OSError:
+            return None
+
+    def metrics(self):
+        with urllib.request.urlopen(f"{self.url}/metrics", timeout=self.timeout) as response:
+            return json.load(response)
+
+    # === Internals === #
+    def _chat(self, prompt, max_len, k, temperature, stream):
+        with self._post_chat(prompt, max_len, k, temperature, stream) as response:
+            return json.load(response)
+
+    def _post_chat(self, prompt, max_len, k, temperature, stream):
+        body = json.dumps({"prompt": prompt, "session_id": self.session_id, "stream": stream,
+                           "max_len": max_len, "k": k, "temperature": temperature}).encode("utf-8")
+        request = urllib.request.Request(f"{self.url}/v1/chat", data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            message = json.load(e).get("error", str(e))
+            if e.code == 503:
+                raise ServerBusy(message, float(e.headers.get("Retry-After", 1))) from None
+            raise RuntimeError(f"Server error {e.code}: {message}") from None
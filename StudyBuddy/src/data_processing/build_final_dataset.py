@@ -1,44 +1,219 @@
 import os
+import sys
+import json
+import argparse
+from array import array
 
-def merge_processed_texts(input_folder, output_file):
-    
-    all_text = []
-    
-    # Loop through all files in directory
-    for filename in os.listdir(input_folder):
-        # use only .txt files
-        if not filename.lower().endswith(".txt"):
-            continue
-        
-        # Avoid merging final_dataset.txt into itself if re-run
-        if filename == os.path.basename(output_file):
-            continue
-        
-        file_path = os.path.join(input_folder, filename)
-        print(f"Adding: {filename}")
-        
-        # Read text from file
-        with open(file_path, "r",encoding="utf-8") as f:
-            text = f.read().strip()
-            
-        # Skips empty files
-        if not text:
+import numpy as np
+
+from dedup import Deduplicator
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from file_utils import load_dataset_index      # reader of the index written below, kept importable from here
+
+# ============================= #
+#       Paragraph Splitting     #
+# ============================= #
+def iter_paragraphs(f, chunk_chars=1 << 20, max_chars=1 << 20):
+    """
+    Streams a text file as (sep, text, new_doc, checkable) pieces - joining every sep + text gives back the
+    file with its leading/trailing whitespace trimmed. A blank line ends a paragraph (new_doc=True on the next).
+    A paragraph longer than max_chars comes out in several pieces (checkable=False) so memory stays bounded.
+    """
+    sep = None              # None until the file's first content (leading whitespace is dropped)
+    pieces, size = [], 0
+    pending = ""            # whitespace after the last content, only kept if more content follows
+    new_doc, checkable = True, True
+
+    # readline(limit) caps each read, so even a file with no newlines streams in pieces
+    for line in iter(lambda: f.readline(chunk_chars), ""):
+        if sep is None:
+            line = line.lstrip()
+            if not line:
+                continue            # leading blank lines
+
+        body = line.rstrip()
+        if not body:
+            pending += line
             continue
-        
-        all_text.append(text)
-        
-    # Join every file's content with newlines for separation
-    merged_text = "\n\n".join(all_text)
-    
-    # Save the merged dataset
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(merged_text)
-        
-    print(f"\n  Final dataset daved to -> {output_file}")
-    
+
+        if sep is None:
+            sep = ""
+        elif pending.count("\n") >= 2:
+            # A blank line in between starts a new paragraph / document
+            if pieces:
+                yield sep, "".join(pieces), new_doc, checkable
+            sep, pieces, size, new_doc, checkable = pending, [], 0, True, True
+        elif pending:
+            pieces.append(pending)
+            size += len(pending)
+
+        pieces.append(body)
+        size += len(body)
+        pending = line[len(body):]
+
+        if size >= max_chars:
+            yield sep, "".join(pieces), new_doc, False
+            sep, pieces, size, new_doc, checkable = "", [], 0, False, False
+
+    if pieces:
+        yield sep, "".join(pieces), new_doc, checkable
+
+def _batches(paragraphs, max_chars, max_count=1024):
+    """Groups the paragraph stream so dedup checks many at once (bounded by characters and count)"""
+    batch, size = [], 0
+    for para in paragraphs:
+        batch.append(para)
+        size += len(para[1])
+        if size >= max_chars or len(batch) >= max_count:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+# ========================================= #
+#       Streaming Final Dataset Builder     #
+# ========================================= #
+def build_final_dataset(input_folder, output_file, chunk_chars=1 << 20, dedup=None):
+    """
+    Merges every processed .txt file (sorted by name) into output_file, separated by a blank line.
+    Files are streamed through in bounded reads - memory doesn't grow with the corpus.
+    Each file is trimmed of leading/trailing whitespace and empty files are skipped.
+    dedup: optional Deduplicator - paragraphs it has already seen (exact or near copies) are dropped,
+           the first occurrence in file order is kept.
+
+    Also writes a sidecar index next to the output:
+      <name>.index.json - byte range of every source file in the output (+ bytes dedup removed from it)
+      <name>.docs.bin   - uint64 byte offset of every document start (a file start, or the first line
+                          after a blank line - the same boundaries the packed token cache splits on)
+    """
+    output_path = os.path.abspath(output_file)
+    base = os.path.splitext(output_file)[0]
+    index_path, docs_path = base + ".index.json", base + ".docs.bin"
+
+    # Sorted so the same inputs always build the same bytes
+    filenames = sorted(f for f in os.listdir(input_folder) if f.lower().endswith(".txt"))
+
+    sources = []
+    doc_offsets = array("Q")
+    pos = 0                 # bytes written so far
+
+    tmp_path = output_file + ".tmp"
+    with open(tmp_path, "wb") as out:
+        def write(text):
+            nonlocal pos
+            data = text.encode("utf-8")
+            out.write(data)
+            pos += len(data)
+
+        for filename in filenames:
+            file_path = os.path.join(input_folder, filename)
+
+            # Avoid merging final_dataset.txt into itself if re-run
+            if os.path.abspath(file_path) == output_path:
+                continue
+
+            print(f"Adding: {filename}")
+            start = None        # output offset of this file's first byte, once it has content
+            removed = {"exact": 0, "near": 0}
+
+            with open(file_path, "r", encoding="utf-8") as f:
+                for batch in _batches(iter_paragraphs(f, chunk_chars, chunk_chars), chunk_chars):
+                    # Same verdicts as checking paragraph by paragraph, the hash tables are probed per batch
+                    verdicts = [None] * len(batch)
+                    if dedup is not None:
+                        checked = [i for i, para in enumerate(batch) if para[3]]
+                        for i, verdict in zip(checked, dedup.check_many([batch[i][1] for i in checked])):
+                            verdicts[i] = verdict
+
+                    for (sep, text, new_doc, checkable), verdict in zip(batch, verdicts):
+                        if verdict:
+                            removed[verdict] += len(text.encode("utf-8"))
+                            continue
+
+                        if start is None:
+                            if pos:
+                                write("\n\n")   # separator between files
+                            start = pos
+                            doc_offsets.append(pos)
+                        else:
+                            write(sep)
+                            if new_doc:
+                                doc_offsets.append(pos)
+                        write(text)
+
+            # Skips empty files
+            if start is None:
+                start = pos
+                if not any(removed.values()):
+                    continue
+
+            entry = {"source": filename, "start": start, "end": pos}
+            if dedup is not None:
+                entry["removed_exact"], entry["removed_near"] = removed["exact"], removed["near"]
+            sources.append(entry)
+
+    os.replace(tmp_path, output_file)
+
+    # Sidecar index (written after the data, so it never describes a file that isn't there)
+    with open(docs_path + ".tmp", "wb") as f:
+        np.frombuffer(doc_offsets, dtype=np.uint64).astype("<u8").tofile(f)
+    os.replace(docs_path + ".tmp", docs_path)
+
+    index = {
+        "output": os.path.basename(output_file),
+        "size": pos,
+        "n_docs": len(doc_offsets),
+        "docs_file": os.path.basename(docs_path),
+        "sources": sources,
+    }
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(index_path + ".tmp", index_path)
+
+    print(f"\n  Final dataset saved to -> {output_file} ({pos:,} bytes, {len(sources)} files, {len(doc_offsets):,} documents)")
+    if dedup is not None:
+        print_dedup_report(sources, dedup)
+    return index
+
+def print_dedup_report(sources, dedup):
+    print(f"\n  {'source':<40} {'kept':>12} {'exact dup':>12} {'near dup':>12} {'removed':>8}")
+    totals = [0, 0, 0]
+    for entry in sources:
+        row = [entry["end"] - entry["start"], entry["removed_exact"], entry["removed_near"]]
+        totals = [t + r for t, r in zip(totals, row)]
+        print(f"  {entry['source'][:40]:<40} {row[0]:>12,} {row[1]:>12,} {row[2]:>12,} {(row[1] + row[2]) / max(sum(row), 1):>8.1%}")
+    print(f"  {'total':<40} {totals[0]:>12,} {totals[1]:>12,} {totals[2]:>12,} {(totals[1] + totals[2]) / max(sum(totals), 1):>8.1%}")
+    stats = dedup.stats
+    print(f"  {stats['checked']:,} paragraphs checked, {stats['exact']:,} exact + {stats['near']:,} near duplicates dropped, "
+          f"index memory {dedup.memory_bytes() / 2**20:.1f} MB")
+
+# Old name, kept for existing callers
+merge_processed_texts = build_final_dataset
+
 if __name__ == "__main__":
-    merge_processed_texts(
-        input_folder="data/processed",
-        output_file="data/processed/final_dataset.txt"
-    )
-    
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Merge data/processed/*.txt into the training corpus")
+    parser.add_argument("--input", default="data/processed")
+    parser.add_argument("--output", default="data/processed/final_dataset.txt")
+    parser.add_argument("--dedup", choices=["none", "exact", "near"], default="none",
+                        help="exact: drop repeated paragraphs, near: also MinHash/LSH near-duplicates")
+    parser.add_argument("--threshold", type=float, default=0.8, help="estimated Jaccard similarity that counts as a near-duplicate")
+    parser.add_argument("--num-perm", type=int, default=64, help="MinHash permutations")
+    parser.add_argument("--shingle-size", type=int, default=5, help="words per shingle")
+    parser.add_argument("--min-chars", type=int, default=32, help="shorter paragraphs are always kept")
+    args = parser.parse_args()
+
+    dedup = None
+    if args.dedup != "none":
+        dedup = Deduplicator(near=args.dedup == "near", threshold=args.threshold, num_perm=args.num_perm,
+                             shingle_size=args.shingle_size, min_chars=args.min_chars)
+    try:
+        build_final_dataset(
+            input_folder=args.input,
+            output_file=args.output,
+            dedup=dedup,
+        )
+    finally:
+        if dedup is not None:
+            dedup.close()
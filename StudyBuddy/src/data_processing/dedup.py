@@ -0,0 +1,235 @@
+# ===================================================================================== #
+#    Dedup - contians:                                                                  #
+#       Hash Table -- Exact Paragraph Hashing -- MinHash / LSH Near-duplicates          #
+#                                                                                       #
+# ===================================================================================== #
+
+import re
+import zlib
+import hashlib
+import tempfile
+
+import numpy as np
+
+_WS = re.compile(r"\s+")
+_PRIME = (1 << 32) + 15         # smallest prime above 2^32 - a, b, h < 2^32 so a*h + b fits in uint64
+_MAX_HASH = (1 << 32) - 1
+
+def normalize(text):
+    """Lowercase + collapse whitespace, so re-wrapped / re-cased copies hash the same"""
+    return _WS.sub(" ", text).strip().lower()
+
+def hash64(data):
+    # 0 marks an empty slot in _HashTable
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little") or 1
+
+# ======================= #
+#       Hash Table        #
+# ======================= #
+class _HashTable:
+    """
+    uint64 -> uint32 open-addressing table in two flat numpy arrays (12 bytes a slot, kept at most half full).
+    A Python dict/set costs ~100 bytes an entry, which is what stops millions of paragraphs fitting.
+    Keys are looked up / inserted as arrays: one linear-probing pass for all of them, a numpy step per probe.
+    """
+    def __init__(self, capacity=1 << 16):
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.vals = np.zeros(capacity, dtype=np.uint32)
+        self.mask = np.uint64(capacity - 1)
+        self.size = 0
+
+    def get(self, keys):
+        """(values, found) for an array of keys - values is 0 where found is False"""
+        keys = np.asarray(keys, dtype=np.uint64)
+        slots = self._probe(keys)
+        found = self.keys[slots] == keys
+        return np.where(found, self.vals[slots], 0), found
+
+    def put(self, keys, vals=0):
+        """Inserts every key that isn't there yet (the first value stays)"""
+        keys = np.asarray(keys, dtype=np.uint64)
+        vals = np.broadcast_to(np.asarray(vals, dtype=np.uint32), keys.shape)
+        keys, first = np.unique(keys, return_index=True)
+        vals = vals[first]
+        while (self.size + len(keys)) * 2 > len(self.keys):
+            self._grow()
+
+        while len(keys):
+            slots = self._probe(keys)
+            new = self.keys[slots] == 0
+            keys, vals, slots = keys[new], vals[new], slots[new]
+            # Two new keys can probe to the same empty slot - the first takes it, the rest probe again
+            _, first = np.unique(slots, return_index=True)
+            self.keys[slots[first]] = keys[first]
+            self.vals[slots[first]] = vals[first]
+            self.size += len(first)
+            keys, vals = np.delete(keys, first), np.delete(vals, first)
+
+    def _probe(self, keys):
+        # Slot of each key: where it is, or the empty slot that ends its probe sequence
+        slots = keys & self.mask
+        todo = np.arange(len(keys))
+        while len(todo):
+            k = self.keys[slots[todo]]
+            todo = todo[(k != keys[todo]) & (k != 0)]
+            slots[todo] = (slots[todo] + np.uint64(1)) & self.mask
+        return slots
+
+    def _grow(self):
+        old_keys, old_vals = self.keys, self.vals
+        self.__init__(len(old_keys) * 2)
+        used = np.flatnonzero(old_keys)
+        # In slices, so growing doesn't briefly need a second copy of every entry
+        for i in range(0, len(used), 1 << 16):
+            part = used[i:i + (1 << 16)]
+            self.put(old_keys[part], old_vals[part])
+
+    def nbytes(self):
+        return self.keys.nbytes + self.vals.nbytes
+
+# ====================== #
+#       LSH Params       #
+# ====================== #
+def lsh_params(threshold, num_perm):
+    """
+    (bands, rows) with bands * rows <= num_perm that best separates pairs above / below `threshold`:
+    minimises the false-positive + false-negative area under the LSH S-curve 1 - (1 - s^r)^b
+    """
+    s = np.linspace(0, 1, 1001)
+    best, best_err = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        p = 1 - (1 - s ** rows) ** bands
+        err = p[s < threshold].sum() + (1 - p[s >= threshold]).sum()
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+# =========================== #
+#       Deduplicator          #
+# =========================== #
+class Deduplicator:
+    """
+    Streaming paragraph dedup - first occurrence wins.
+      exact: blake2b of the normalized paragraph
+      near:  MinHash signature over word shingles, LSH banding to find candidates, then the
+             estimated Jaccard similarity against the candidate decides (>= threshold -> duplicate)
+    Memory is the two hash tables (~25 bytes per exact entry, ~25 bytes per band per kept paragraph);
+    text is never held past the paragraph being checked, signatures are spilled to a temp file.
+    Each LSH bucket remembers its first paragraph only, so a chain of slowly drifting copies can slip through.
+    """
+    def __init__(self, exact=True, near=True, threshold=0.8, num_perm=64, shingle_size=5, min_chars=32, seed=1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.exact, self.near = exact, near
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.min_chars = min_chars          # shorter paragraphs (headings, "Page 3") are always kept
+
+        self.exact_table = _HashTable()
+        if near:
+            rng = np.random.RandomState(seed)
+            # Below 2^32 (not p) so a*h + b can't overflow uint64 - the hashes are exact mod p
+            self.perm_a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+            self.perm_b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+            self.bands, self.rows = lsh_params(threshold, num_perm)
+            self.band_table = _HashTable()
+            self.signatures = tempfile.TemporaryFile()
+            self.n_signatures = 0
+            self._row_bytes = num_perm * 4
+
+        self.stats = {"checked": 0, "exact": 0, "near": 0}
+
+    def check(self, text):
+        """None if text is new (and remembers it), else "exact" / "near" for a duplicate"""
+        return self.check_many([text])[0]
+
+    def check_many(self, texts):
+        """
+        check() for a batch of paragraphs, same verdicts as checking them one by one in order.
+        The hash tables are probed once for the whole batch (vectorized), duplicates inside the
+        batch are resolved in order with small per-batch dicts.
+        """
+        verdicts = [None] * len(texts)
+        todo = [i for i, text in enumerate(texts) if len(text) >= self.min_chars]
+        self.stats["checked"] += len(todo)
+        norms = {i: normalize(texts[i]) for i in todo}
+
+        if self.exact and todo:
+            keys = np.array([hash64(norms[i].encode("utf-8")) for i in todo], dtype=np.uint64)
+            _, found = self.exact_table.get(keys)
+            seen = set()
+            for i, key, hit in zip(todo, keys.tolist(), found.tolist()):
+                if hit or key in seen:
+                    verdicts[i] = "exact"
+                    self.stats["exact"] += 1
+                seen.add(key)
+            self.exact_table.put(keys)
+            todo = [i for i in todo if verdicts[i] is None]
+
+        if self.near and todo:
+            sigs = [self.minhash(norms[i]) for i in todo]
+            band_keys = np.array([self._band_keys(sig) for sig in sigs], dtype=np.uint64)    # (n, bands)
+            doc_ids, found = self.band_table.get(band_keys.ravel())
+            doc_ids, found = doc_ids.reshape(band_keys.shape), found.reshape(band_keys.shape)
+
+            batch_buckets = {}          # band key -> signature of the first kept paragraph in this batch
+            new_keys, new_ids = [], []
+            for n, (i, sig) in enumerate(zip(todo, sigs)):
+                # A bucket already in the table wins, else the first paragraph of this batch that filled it
+                stored = [self._read_signature(doc_id) for doc_id in set(doc_ids[n][found[n]].tolist())]
+                batch = [batch_buckets[key] for key in band_keys[n][~found[n]].tolist() if key in batch_buckets]
+                if any(np.mean(sig == other) >= self.threshold for other in stored + batch):
+                    verdicts[i] = "near"
+                    self.stats["near"] += 1
+                    continue
+
+                new_keys.append(band_keys[n])
+                new_ids.append(np.full(self.bands, self._write_signature(sig), dtype=np.uint32))
+                for key in band_keys[n].tolist():
+                    batch_buckets.setdefault(key, sig)
+            if new_keys:
+                self.band_table.put(np.concatenate(new_keys), np.concatenate(new_ids))
+        return verdicts
+
+    # --- MinHash --- #
+    def minhash(self, norm, chunk=2048):
+        words = norm.split(" ")
+        k = min(self.shingle_size, len(words))
+        shingles = np.fromiter((zlib.crc32(" ".join(words[i:i + k]).encode("utf-8"))
+                                for i in range(len(words) - k + 1)), dtype=np.uint64)
+
+        sig = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # (a*h + b) mod p per permutation (exact: every term < 2^32, the sum < 2^64), min over shingles.
+        # The 15 values in [2^32, p) are clipped to fit uint32. In chunks so a long paragraph stays small.
+        for i in range(0, len(shingles), chunk):
+            h = shingles[i:i + chunk, None]
+            perm = np.minimum((h * self.perm_a + self.perm_b) % np.uint64(_PRIME), np.uint64(_MAX_HASH))
+            np.minimum(sig, perm.min(axis=0), out=sig)
+        return sig.astype(np.uint32)
+
+    def _band_keys(self, sig):
+        r = self.rows
+        return [hash64(b.to_bytes(2, "little") + sig[b * r:(b + 1) * r].tobytes()) for b in range(self.bands)]
+
+    # --- Signature spill file --- #
+    def _write_signature(self, sig):
+        self.signatures.seek(self.n_signatures * self._row_bytes)
+        self.signatures.write(sig.tobytes())
+        self.n_signatures += 1
+        return self.n_signatures - 1
+
+    def _read_signature(self, doc_id):
+        self.signatures.seek(doc_id * self._row_bytes)
+        return np.frombuffer(self.signatures.read(self._row_bytes), dtype=np.uint32)
+
+    def memory_bytes(self):
+        total = self.exact_table.nbytes()
+        if self.near:
+            total += self.band_table.nbytes()
+        return total
+
+    def close(self):
+        if self.near:
+            self.signatures.close()
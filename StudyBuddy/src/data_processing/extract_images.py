@@ -1,39 +1,168 @@
 import os               # for listing image files
-from PIL import Image   # for opening images
+import time
+import hashlib
+import threading
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps   # for opening images
 import pytesseract      # for OCR (Optical Character recognition)
 
-def extract_text_from_images(input_folder, output_file):
-    """Extract text from PNG/JPG images in a folder and save to single .txt file"""
-    all_text = []
-    
-    # Loop through images
-    for filename in os.listdir(input_folder):
-        if filename.lower().endswith((".png", ".jpeg", ".jpg")):
-            # Look for images
-            img_path = os.path.join(input_folder, filename)
-            print(f"OCR on {filename}")
-            
-            # Extracts text
-            try:
-                img = Image.open(img_path)              # Opens image for OCR
-                text = pytesseract.image_to_string(img) # Extracts text from image
-                all_text.append(text)                   # appends extracted test to 'all_text'
-            except Exception as e:
+IMAGE_EXTENSIONS = (".png", ".jpeg", ".jpg")
+
+# =========================== #
+#       Preprocessing         #
+# =========================== #
+def preprocess_image(img, grayscale=False, threshold=None, max_width=None):
+    """
+    Optional cleanup that makes tesseract faster (fewer pixels / channels) and often more accurate on scans:
+    grayscale: drop colour, threshold: 0-255 cut to pure black/white (implies grayscale),
+    max_width: downscale (keeping the aspect ratio) so the page is at most this wide - by width
+    because exam scans are long strips, capping the long side would shrink the text to nothing
+    """
+    if max_width and img.width > max_width:
+        img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+    if grayscale or threshold is not None:
+        if img.mode in ("RGBA", "LA", "P"):
+            # Transparent background -> white, not black
+            rgba = img.convert("RGBA")
+            img = Image.alpha_composite(Image.new("RGBA", rgba.size, "white"), rgba)
+        img = ImageOps.grayscale(img)
+    if threshold is not None:
+        img = img.point(lambda p: 255 if p > threshold else 0)
+    return img
+
+# ===================== #
+#       OCR Cache       #
+# ===================== #
+def cache_key(image_bytes, settings):
+    # Same pixels + same preprocessing/tesseract settings -> same text
+    h = hashlib.blake2b(image_bytes, digest_size=16)
+    h.update(repr(sorted(settings.items())).encode())
+    return h.hexdigest()
+
+def ocr_one(img_path, settings, cache_dir):
+    """Runs in a pool thread: (img_path, text or None, error or None, cache_hit)"""
+    try:
+        with open(img_path, "rb") as f:
+            data = f.read()
+        cache_path = os.path.join(cache_dir, cache_key(data, settings) + ".txt") if cache_dir else None
+
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                return img_path, f.read(), None, True
+
+        img = Image.open(img_path)              # Opens image for OCR
+        img = preprocess_image(img, settings["grayscale"], settings["threshold"], settings["max_width"])
+        text = pytesseract.image_to_string(img, lang=settings["lang"]) # Extracts text from image
+
+        if cache_path:
+            tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, cache_path)
+        return img_path, text, None, False
+    except Exception as e:
+        return img_path, None, f"{type(e).__name__}: {e}", False
+
+# ============================== #
+#       Parallel Folder OCR      #
+# ============================== #
+@contextlib.contextmanager
+def tesseract_thread_limit(limit):
+    """
+    OMP_THREAD_LIMIT for the tesseract processes started inside the block (they inherit the environment),
+    restored afterwards. A limit the user already set is left alone, None changes nothing.
+    """
+    if limit is None or "OMP_THREAD_LIMIT" in os.environ:
+        yield
+        return
+    os.environ["OMP_THREAD_LIMIT"] = str(limit)
+    try:
+        yield
+    finally:
+        os.environ.pop("OMP_THREAD_LIMIT", None)
+
+def extract_text_from_images(input_folder, output_file, jobs=None, cache_dir="data/cache/ocr",
+                             grayscale=False, threshold=None, max_width=None, lang="eng"):
+    """
+    Extract text from PNG/JPG images in a folder and save to single .txt file.
+    OCR runs on a bounded pool of `jobs` threads - every pytesseract call is its own tesseract
+    process, the threads only wait on them. Results are cached on disk by image content, so
+    unchanged images are never OCR'd twice.
+    """
+    start = time.time()
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    settings = {"grayscale": grayscale, "threshold": threshold, "max_width": max_width, "lang": lang}
+    img_paths = sorted(os.path.join(input_folder, f) for f in os.listdir(input_folder)
+                       if f.lower().endswith(IMAGE_EXTENSIONS))
+
+    jobs = max(1, jobs or os.cpu_count() or 1)
+
+    hits = misses = failed = 0
+    tmp_path = output_file + ".tmp"
+    # Parallelism comes from the pool - stop every tesseract process also spawning a thread per core,
+    # only while the pool runs (the rest of the process keeps its own OpenMP settings)
+    with tesseract_thread_limit(1 if jobs > 1 else None), open(tmp_path, "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=jobs) as pool:
+        first = True
+        # map keeps the sorted order and only runs `jobs` OCR calls at a time
+        for img_path, text, error, hit in pool.map(lambda p: ocr_one(p, settings, cache_dir), img_paths):
+            filename = os.path.basename(img_path)
+            if error:
                 print(f"Skipping unreadable image: {filename}")
-                print("Reason", e)
+                print("Reason", error)
+                failed += 1
                 continue
 
-    merged_text = "\n\n".join(all_text)
-    
-    # Write all text to a file
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(merged_text)
-        
+            hits += hit
+            misses += not hit
+            print(f"OCR on {filename}" + (" (cached)" if hit else ""))
+
+            if not first:
+                out.write("\n\n")
+            out.write(text)
+            first = False
+    os.replace(tmp_path, output_file)
+
+    elapsed = time.time() - start
+    done = hits + misses
+    stats = {
+        "images": done,
+        "failed": failed,
+        "cache_hits": hits,
+        "hit_rate": hits / done if done else 0.0,
+        "seconds": elapsed,
+        "images_per_sec": done / elapsed if elapsed > 0 else 0.0,
+    }
     print(f"OCR extraction complete -> saved to {output_file}")
+    print(f"{done} images in {elapsed:.1f}s ({stats['images_per_sec']:.2f} images/sec, {jobs} workers), "
+          f"cache hit rate {stats['hit_rate']:.0%}, {failed} failed")
+    return stats
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR lecture images (parallel, cached)")
+    parser.add_argument("--input", default="data/raw_images")
+    parser.add_argument("--output", default="data/processed/notes_from_images.txt")
+    parser.add_argument("--jobs", type=int, default=None, help="concurrent tesseract processes (default: all cores)")
+    parser.add_argument("--cache-dir", default="data/cache/ocr", help="'' disables the cache")
+    parser.add_argument("--grayscale", action="store_true")
+    parser.add_argument("--threshold", type=int, default=None, help="binarize at this 0-255 level")
+    parser.add_argument("--max-width", type=int, default=None, help="downscale pages wider than this many pixels")
+    parser.add_argument("--lang", default="eng")
+    args = parser.parse_args()
+
     extract_text_from_images(
-        input_folder="data/raw_images",
-        output_file="data/processed/notes_from_images.txt"
-    )
\ No newline at end of file
+        input_folder=args.input,
+        output_file=args.output,
+        jobs=args.jobs,
+        cache_dir=args.cache_dir or None,
+        grayscale=args.grayscale,
+        threshold=args.threshold,
+        max_width=args.max_width,
+        lang=args.lang,
+    )
@@ -1,41 +1,154 @@
 import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from PyPDF2 import PdfReader
 
-def extract_text_from_pdfs(input_folder, output_file):
-    """Extract text from all PDF files in a folder and save to a single .txt file"""
-    all_text = []
-    
-    # Loop through all files in the folder
-    for filename in os.listdir(input_folder):
-        # Only process files that end with .pdf
-        if filename.lower().endswith(".pdf"):
-            # Concatenates path names
-            pdf_path = os.path.join(input_folder, filename)
-            print(f"Reading: {filename}")
-            
-            # initialize a reader to read the current files contents
-            reader = PdfReader(pdf_path)
-            
-            # Loop through each page and extract all text
-            for page in reader.pages:
-                # Extract text; if none, use empty string
-                text = page.extract_text() or ""
-                all_text.append(text)
-    
-    # Merge all into one string
-    merged_text = "\n\n".join(all_text)
-    
-    # Write the merged text out to a .txt file
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(merged_text)
-    
-    print(f"Extraction complete -> savied to {output_file}")
-    
-    
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from file_utils import file_hash
+
+# ======================== #
+#       File Manifest      #
+# ======================== #
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_json_atomic(obj, path):
+    # temp file + rename so an interrupted run never leaves half a manifest / cache entry
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp_path, path)
+
+# ============================ #
+#       Per-PDF Extraction     #
+# ============================ #
+def extract_pdf_pages(pdf_path):
+    """Runs in a worker process: (pdf_path, list of page texts or None, error message or None)"""
+    try:
+        # initialize a reader to read the current files contents
+        reader = PdfReader(pdf_path)
+
+        # Extract text from each page; if none, use empty string
+        pages = [page.extract_text() or "" for page in reader.pages]
+        return pdf_path, pages, None
+    except Exception as e:
+        # Corrupt / encrypted PDFs are reported and skipped, the rest of the folder still runs
+        return pdf_path, None, f"{type(e).__name__}: {e}"
+
+# ====================================== #
+#       Incremental Folder Extraction    #
+# ====================================== #
+def extract_text_from_pdfs(input_folder, output_file, jobs=None, cache_dir="data/cache/pdf_text"):
+    """
+    Extract text from all PDF files in a folder and save to a single .txt file.
+    Page text is cached per document (keyed by content hash) and a manifest remembers each file's
+    size / mtime / hash, so a re-run only parses PDFs that are new or changed - across `jobs` processes.
+    """
+    start = time.time()
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    manifest = load_manifest(manifest_path)
+
+    # Sorted so the merged output has a stable order between runs
+    pdf_paths = sorted(os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.lower().endswith(".pdf"))
+
+    new_manifest = {}
+    to_extract = []
+    cached = 0
+    for pdf_path in pdf_paths:
+        stat = os.stat(pdf_path)
+        entry = manifest.get(pdf_path)
+
+        # Unchanged size + mtime: trust the manifest without re-hashing the file
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            if entry.get("error") or os.path.exists(os.path.join(cache_dir, entry["hash"] + ".json")):
+                new_manifest[pdf_path] = entry
+                cached += not entry.get("error")
+                continue
+
+        # New or touched: the content hash decides (a renamed / copied PDF still hits the cache)
+        digest = file_hash(pdf_path)
+        new_manifest[pdf_path] = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": digest}
+        if os.path.exists(os.path.join(cache_dir, digest + ".json")):
+            cached += 1
+        else:
+            to_extract.append(pdf_path)
+
+    # Parse new / changed PDFs across a process pool
+    failed = []
+    if to_extract:
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(to_extract)))
+        print(f"Extracting {len(to_extract)} PDF(s) with {jobs} process(es), {cached} from cache")
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(extract_pdf_pages, path) for path in to_extract]
+            for future in as_completed(futures):
+                pdf_path, pages, error = future.result()
+                entry = new_manifest[pdf_path]
+
+                if error:
+                    print(f"Skipping unreadable PDF: {os.path.basename(pdf_path)} ({error})")
+                    entry["error"] = error
+                    failed.append(pdf_path)
+                    continue
+
+                print(f"Read: {os.path.basename(pdf_path)} ({len(pages)} pages)")
+                write_json_atomic(pages, os.path.join(cache_dir, entry["hash"] + ".json"))
+                entry["pages"] = len(pages)
+
+    # Previously failed files that haven't changed are still reported (not retried)
+    for pdf_path, entry in new_manifest.items():
+        if entry.get("error") and pdf_path not in failed:
+            print(f"Still unreadable (unchanged since last run): {os.path.basename(pdf_path)}")
+
+    changed = bool(to_extract) or new_manifest.keys() != manifest.keys()
+    write_json_atomic(new_manifest, manifest_path)
+
+    if not changed and os.path.exists(output_file):
+        print(f"No new or changed PDFs - {output_file} is up to date ({time.time() - start:.1f}s)")
+        return new_manifest
+
+    # Merge every document's pages (from the cache) into one text file, streamed
+    tmp_path = output_file + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        first = True
+        for pdf_path in pdf_paths:
+            entry = new_manifest[pdf_path]
+            if entry.get("error"):
+                continue
+            with open(os.path.join(cache_dir, entry["hash"] + ".json"), "r", encoding="utf-8") as f:
+                pages = json.load(f)
+            for text in pages:
+                if not first:
+                    out.write("\n\n")
+                out.write(text)
+                first = False
+    os.replace(tmp_path, output_file)
+
+    print(f"Extraction complete -> saved to {output_file} "
+          f"({len(to_extract) - len(failed)} extracted, {cached} cached, {len(failed)} failed, {time.time() - start:.1f}s)")
+    return new_manifest
+
+
 if __name__ == "__main__":
     # When run directly, extracts data from raw_pdfs and into data/processed/notes_from_pdf.txt
+    parser = argparse.ArgumentParser(description="Extract text from lecture PDFs (incremental, parallel)")
+    parser.add_argument("--input", default="data/raw_pdfs")
+    parser.add_argument("--output", default="data/processed/notes_from_pdf.txt")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", default="data/cache/pdf_text")
+    args = parser.parse_args()
+
     extract_text_from_pdfs(
-        input_folder="data/raw_pdfs",
-        output_file="data/processed/notes_from_pdf.txt"
+        input_folder=args.input,
+        output_file=args.output,
+        jobs=args.jobs,
+        cache_dir=args.cache_dir,
     )
-            
\ No newline at end of file
@@ -1,120 +1,301 @@
 import os
+import re
+import sys
+import json
+import mmap
+import time
+import argparse
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-def load_dailydialog(folder):
+import numpy as np
+import sentencepiece as spm
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "train")))
+
+from file_utils import file_hash
+from token_cache import token_dtype
+
+CORNELL_SEP = " +++$+++ "
+CORNELL_SEP_BYTES = CORNELL_SEP.encode()
+# "L1045 +++$+++ u0 +++$+++ m0 +++$+++ BIANCA +++$+++ They do not!" -> (1045, text)
+_CORNELL_LINE = re.compile(rb"^\s*L(\d+) \+\+\+\$\+\+\+ (?:[^\n]*? \+\+\+\$\+\+\+ ){3}([^\n]*)", re.M)
+_UTTERANCE_IDS = re.compile(r"'([^']*)'")
+
+# ======================== #
+#       DailyDialog        #
+# ======================== #
+def dailydialog_conversation(line):
+    """One DailyDialog line -> list of "User: ..." / "Bot: ..." lines (None if under 2 turns)"""
+    parts = line.split("\t")
+    dialogue_text = parts[0]
+
+    utterances = []
+    for part in dialogue_text.split("__eou__"):
+        cleaned = part.strip()
+
+        # Skip empty segments
+        if not cleaned:
+            continue
+
+        # Skip segments that are PURELY numbers and spaces
+        if not any(c.isalpha() for c in cleaned):
+            continue
+
+        # Otherwise its real text
+        utterances.append(cleaned)
+
+    # convert to 'User/Bot' conversation
+    conv_lines = [f"{'User' if turn % 2 == 0 else 'Bot'}: {utt}" for turn, utt in enumerate(utterances)]
+    return conv_lines if len(conv_lines) >= 2 else None
+
+def _file_chunks(path, chunk_bytes):
+    size = os.path.getsize(path)
+    return [(path, start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+def parse_dailydialog_chunk(path, start, end):
+    """Runs in a worker process: conversations of every line that *starts* in [start, end) of the file"""
     conversations = []
-    
-    # iterates through files in the 'folder' directory
-    for filename in os.listdir(folder):
+    with open(path, "rb") as f:
+        if start:
+            # Skip the partial line - it belongs to the previous chunk
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            conv = dailydialog_conversation(line.decode("utf-8"))
+            if conv:
+                conversations.append(conv)
+    return conversations
+
+def iter_dailydialog(folder, jobs=None, chunk_bytes=1 << 20):
+    """
+    Yields DailyDialog conversations (files in sorted order, lines in file order).
+    Files are cut into line-aligned byte ranges parsed across a process pool; at most 2 ranges
+    per worker are in flight, so memory depends on chunk_bytes and jobs, not on the dataset size.
+    """
+    chunks = []
+    for filename in sorted(os.listdir(folder)):
         if filename.lower().endswith(".txt"):
-            path = os.path.join(folder, filename)
             print(f"Loading DailyDialog: {filename}")
-            
-            # Reads the file contents
-            with open(path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                
-            for line in lines:
-                
-                parts = line.split("\t")
-                dialogue_text = parts[0]
-                
-                raw_parts = dialogue_text.split("__eou__")
-                
-                utterances = []
-                for part in raw_parts:
-                    cleaned = part.strip()
-                    
-                    # Skip empty segments
-                    if not cleaned:
-                        continue
-                    
-                    # Skip segments that are PURELY numbers and spaces
-                    if not any(c.isalpha() for c in cleaned):
-                        continue
-                    
-                    # Otherwise its real text
-                    utterances.append(cleaned)
-                
-                
-                conv_lines = []
-                turn = 0
-                
-                # convert to 'User/Bot' conversation
-                for utt in utterances:
-                    if turn % 2 == 0:
-                        conv_lines.append(f"User: {utt}")
-                    else:
-                        conv_lines.append(f"Bot: {utt}")
-                    turn += 1    
-                
-                if len(conv_lines) >= 2:
-                    # append all conversations to 1 location
-                    conversations.append("\n".join(conv_lines))
-            
-    return conversations
-                
-def load_cornell(folder):
+            chunks += _file_chunks(os.path.join(folder, filename), chunk_bytes)
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(chunks)))
+    if jobs == 1:
+        for chunk in chunks:
+            yield from parse_dailydialog_chunk(*chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(parse_dailydialog_chunk, *chunk))
+
+            # Back-pressure: don't parse further ahead than the output is written
+            while len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+# ================================ #
+#       Cornell Movie Dialogs      #
+# ================================ #
+def index_cornell_lines(lines_path):
+    """
+    (mmap of movie_lines.txt, starts, ends): the text of line "L<n>" is mm[starts[n]:ends[n]].
+    Only byte offsets are kept in memory (flat int64 arrays indexed by the line number) - the text
+    itself stays in the memory-mapped file until a conversation needs it.
+    """
+    with open(lines_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b"", array("q"), array("q")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # One regex pass over the mapped file instead of splitting every line in Python
+    ids, text_starts, text_ends = array("q"), array("q"), array("q")
+    for match in _CORNELL_LINE.finditer(mm):
+        # More separators than the 5 fields -> malformed, skipped
+        if CORNELL_SEP_BYTES not in match.group(2):
+            ids.append(int(match.group(1)))
+            text_starts.append(match.start(2))
+            text_ends.append(match.end(2))
+
+    size = max(ids) + 1 if ids else 0
+    starts, ends = array("q", [-1]) * size, array("q", [-1]) * size
+    for n, start, end in zip(ids, text_starts, text_ends):
+        starts[n], ends[n] = start, end
+    return mm, starts, ends
+
+def iter_cornell(folder):
+    """Yields Cornell conversations one at a time, in movie_conversations.txt order"""
     lines_path = os.path.join(folder, "movie_lines.txt")
     conv_path = os.path.join(folder, "movie_conversations.txt")
-    
-    # --- Extract line data ---
+
+    # --- Index line data ---
     print("Loading Cornell movie lines...")
-    
-    id2line = {}  # dictionary with line ID mapped to actually movie line
-    
-    with open(lines_path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            # Extracts useful parts
-            parts = line.split(" +++$+++ ")
-            if len(parts) == 5:
-                line_id = parts[0].strip()      # extract line id
-                text = parts[4].strip()         # extracts text
-                id2line[line_id] = text         # assigns text to line id
-    
-    # --- extract Conversation data ---
+    mm, starts, ends = index_cornell_lines(lines_path)
+
+    def line_text(uid):
+        n = int(uid[1:]) if uid[:1] == "L" and uid[1:].isdigit() else -1
+        if not 0 <= n < len(starts) or starts[n] < 0:
+            return ""
+        return mm[starts[n]:ends[n]].decode("utf-8", errors="ignore").strip()
+
+    # --- Stream conversation data ---
     print("Loading Cornell conversations...")
-    
-    conversations = []
     with open(conv_path, "r", encoding="utf-8", errors="ignore") as f:
         for line in f:
-            parts = line.split(" +++$+++ ")
+            parts = line.split(CORNELL_SEP)
             if len(parts) == 4:
-                utterance_ids = eval(parts[3].strip())    # converts string line to python list
-            
-                conv_lines = []
-                # Numbers the Id's into a dictionary
-                for i, uid in enumerate(utterance_ids):
-                    # Gets text-line from id2line of line-id
-                    text = id2line.get(uid.strip(), "")
-                    # Sorts every other line to be User/Bot
-                    if i % 2 == 0:
-                        conv_lines.append(f"User: {text}")
-                    else:
-                        conv_lines.append(f"Bot: {text}")
-                    
-                conversations.append("\n".join(conv_lines))
-    
-    return conversations
+                # "['L194', 'L195']" -> ids, without eval'ing file contents
+                utterance_ids = _UTTERANCE_IDS.findall(parts[3])
+
+                # Sorts every other line to be User/Bot
+                yield [f"{'User' if i % 2 == 0 else 'Bot'}: {line_text(uid.strip())}"
+                       for i, uid in enumerate(utterance_ids)]
+
+    if isinstance(mm, mmap.mmap):
+        mm.close()
+
+# ============================= #
+#       Streaming Writers       #
+# ============================= #
+class ConversationWriter:
+    """
+    Writes each conversation as it's produced:
+      output_file - text, conversations separated by a blank line (what build_final_dataset merges)
+      jsonl_file  - optional, one {"source": ..., "lines": [...]} object per line
+      bin_file    - optional, SentencePiece token IDs with eos after every conversation, plus a .json
+                    metadata file in the token cache format (train_model.py --corpus <bin_file> trains on it)
+    Use it as a context manager: every file is written under a .tmp name and only renamed into place
+    if the block finishes, an exception removes the .tmp files instead.
+    """
+    def __init__(self, output_file, jsonl_file=None, bin_file=None, sp_model_path=None, encode_batch=1024):
+        if bin_file and not sp_model_path:
+            raise ValueError("bin_file needs sp_model_path to encode the conversations")
+        self.paths = [p for p in (output_file, jsonl_file, bin_file) if p]
+        if bin_file:
+            self.paths.append(os.path.splitext(bin_file)[0] + ".json")     # same layout as the token cache
+        for path in self.paths:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.out = open(output_file + ".tmp", "w", encoding="utf-8")
+        self.jsonl = open(jsonl_file + ".tmp", "w", encoding="utf-8") if jsonl_file else None
+        self.bin = open(bin_file + ".tmp", "wb") if bin_file else None
+        self.counts = {}
+        self.n_tokens = 0
+
+        if self.bin:
+            self.sp = spm.SentencePieceProcessor()
+            self.sp.load(sp_model_path)
+            self.sp_model_path = sp_model_path
+            self.dtype = token_dtype(self.sp.get_piece_size())
+            self.batch = []         # encoded in batches - one encode() call per encode_batch conversations
+            self.encode_batch = encode_batch
+
+    def write(self, source, conv_lines):
+        text = "\n".join(conv_lines)
+        if self.counts:
+            self.out.write("\n\n")
+        self.out.write(text)
+        self.counts[source] = self.counts.get(source, 0) + 1
+
+        if self.jsonl:
+            self.jsonl.write(json.dumps({"source": source, "lines": conv_lines}, ensure_ascii=False) + "\n")
+        if self.bin:
+            self.batch.append(text)
+            if len(self.batch) >= self.encode_batch:
+                self._flush_batch()
+
+    def _flush_batch(self):
+        ids = []
+        for conv_ids in self.sp.encode(self.batch, out_type=int):
+            ids.extend(conv_ids)
+            ids.append(self.sp.eos_id())
+        self.bin.write(np.array(ids, dtype=self.dtype).tobytes())
+        self.n_tokens += len(ids)
+        self.batch = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def close(self):
+        if self.bin and self.batch:
+            self._flush_batch()
+        self._close_files()
+        if self.bin:
+            meta = {
+                "corpus_path": self.paths[0],
+                "sp_model_path": self.sp_model_path,
+                "sp_model_hash": file_hash(self.sp_model_path),
+                "dtype": np.dtype(self.dtype).name,
+                "n_tokens": self.n_tokens,
+                "vocab_size": self.sp.get_piece_size(),
+                "doc_sep_id": self.sp.eos_id(),
+            }
+            with open(self.paths[-1] + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+
+        # Everything is renamed into place only once it's all written
+        for path in self.paths:
+            os.replace(path + ".tmp", path)
+
+    def abort(self):
+        """Closes and deletes the .tmp files, the previous outputs (if any) stay as they were"""
+        self._close_files()
+        for path in self.paths:
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+
+    def _close_files(self):
+        for f in (self.out, self.jsonl, self.bin):
+            if f is not None:
+                f.close()
+
+def prepare_conversational_data(output_file, dailydialog_folder=None, cornell_folder=None, jobs=None,
+                                jsonl_file=None, bin_file=None, sp_model_path=None):
+    """DailyDialog then Cornell, streamed straight into the output(s) - a missing dataset folder is skipped"""
+    start = time.time()
+    with ConversationWriter(output_file, jsonl_file, bin_file, sp_model_path) as writer:
+        for source, folder, conversations in (("dailydialog", dailydialog_folder, lambda: iter_dailydialog(dailydialog_folder, jobs=jobs)),
+                                              ("cornell", cornell_folder, lambda: iter_cornell(cornell_folder))):
+            if not folder or not os.path.isdir(folder):
+                print(f"No {source} folder ({folder}) - skipping")
+                continue
+            for conv in conversations():
+                writer.write(source, conv)
+
+    counts = ", ".join(f"{n:,} {source}" for source, n in writer.counts.items())
+    print(f"Merged conversations dataset saved -> {output_file} ({counts}, {time.time() - start:.1f}s)")
+    return writer.counts
 
-def save_merged(conversations, output_file):
-    merged = "\n\n".join(conversations)
-    
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(merged)
-        
-    print(f"Merged conversations dataset saved -> {output_file}")
-    
 if __name__ == "__main__":
-    dailydialog_folder = "data/raw_conversational/dailydialog"
-    cornell_folder = "data/raw_conversational/cornell"
-    output_file = "data/processed/conversation_data.txt"
-    
-    # Load datasets
-    dd_convs = load_dailydialog(dailydialog_folder)
-    cornell_convs = load_cornell(cornell_folder)
-    
-    # Merge them
-    all_conv = dd_convs + cornell_convs
-    
-    # Save all
-    save_merged(all_conv, output_file)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Convert DailyDialog / Cornell into User/Bot conversations (streamed)")
+    parser.add_argument("--dailydialog", default="data/raw_conversational/dailydialog")
+    parser.add_argument("--cornell", default="data/raw_conversational/cornell")
+    parser.add_argument("--output", default="data/processed/conversation_data.txt")
+    parser.add_argument("--jobs", type=int, default=None, help="DailyDialog worker processes (default: all cores)")
+    parser.add_argument("--jsonl", default=None, help="also write one JSON conversation per line here")
+    parser.add_argument("--bin", default=None, help="also write packed token IDs here (needs --sp-model)")
+    parser.add_argument("--sp-model", default="models/studybuddy_sp.model")
+    args = parser.parse_args()
+
+    prepare_conversational_data(
+        output_file=args.output,
+        dailydialog_folder=args.dailydialog,
+        cornell_folder=args.cornell,
+        jobs=args.jobs,
+        jsonl_file=args.jsonl,
+        bin_file=args.bin,
+        sp_model_path=args.sp_model,
+    )
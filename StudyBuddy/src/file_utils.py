@@ -0,0 +1,34 @@
+# ===================================================================================== #
+#    File Utils - contians:                                                             #
+#       Content Hashing -- Dataset Index Reader                                         #
+#                                                                                       #
+# ===================================================================================== #
+
+import os
+import json
+import hashlib
+
+# ============================ #
+#       Content Hashing        #
+# ============================ #
+def file_hash(path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks so big corpora never sit in memory"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# ============================ #
+#       Dataset Index          #
+# ============================ #
+def load_dataset_index(output_file):
+    """(index dict, memory-mapped uint64 document start offsets) for a dataset built by build_final_dataset.py"""
+    import numpy as np      # only the index readers need it, file_hash stays stdlib-only
+    base = os.path.splitext(output_file)[0]
+    with open(base + ".index.json", "r", encoding="utf-8") as f:
+        index = json.load(f)
+    docs_path = os.path.join(os.path.dirname(output_file), index["docs_file"])
+    if index["n_docs"] == 0:
+        return index, np.zeros(0, dtype="<u8")
+    return index, np.memmap(docs_path, dtype="<u8", mode="r", shape=(index["n_docs"],))
@@ -0,0 +1,218 @@
+# ===================================================================================== #
+#    Generation Engine - contians:                                                      #
+#       Generation Request -- Continuous Batching Engine                                #
+#                                                                                       #
+# ===================================================================================== #
+
+from collections import deque
+from dataclasses import dataclass, field
+
+import torch
+
+from ai_engine import StreamDetokenizer, cache_dtype, precision_context
+from sampling import sample_next
+
+# ================================ #
+#       Generation Request         #
+# ================================ #
+@dataclass
+class GenerationRequest:
+    """One conversation's reply to generate, with its own sampling + stop settings"""
+    prompt: str
+    max_len: int = 200              # sampling steps, same meaning as LocalChatBot.generate
+    k: int = 8                      # top-k
+    temperature: float = 0.7
+    top_p: float = 1.0              # 1.0 = off
+    stop: tuple = ()                # reply ends at the first of these strings
+    session_id: str = None
+
+    # Filled in by the engine
+    ids: list = field(default_factory=list)         # running sequence (clamped to max_seq_len)
+    output_ids: list = field(default_factory=list)  # generated tokens only
+    steps: int = 0
+    reply: str = None
+    done: bool = False
+    finish_reason: str = None       # "length" or "stop"
+
+    # Incremental stop-string check, only used when stop is set
+    detok: StreamDetokenizer = field(default=None, repr=False)
+    tail: str = ""                  # end of the text already checked
+
+# =========================================== #
+#       Continuous Batching Generation        #
+# =========================================== #
+class GenerationEngine:
+    """
+    Runs many conversations through one TinyGPT together.
+    Every active sequence owns one row of a shared KV cache; each step samples a token for
+    all of them and runs a single batched forward. Finished sequences free their row right
+    away and queued requests are prefilled into it between steps.
+    """
+    def __init__(self, model, tokenizer, max_batch_size=8, window_stride=1, precision="fp32"):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.window_stride = window_stride
+        self.precision = precision      # model must already be prepared with prepare_for_inference()
+
+        self.cache = model.new_cache(batch_size=max_batch_size, dtype=cache_dtype(precision))
+        self.slots = [None] * max_batch_size        # request in each cache row
+        self.lengths = [0] * max_batch_size         # tokens cached per row
+        self.queue = deque()
+
+        # Per-row tensors for the sampler: pending logits + last 20 IDs for the repetition penalty
+        device = self.cache.keys[0].device
+        self.next_logits = torch.zeros(max_batch_size, model.fc.out_features, device=device)
+        self.recent = torch.zeros(max_batch_size, 20, dtype=torch.long, device=device)
+
+        self.pad_id = 0
+        self.unk_id = tokenizer.sp.unk_id()
+
+    # === Queue a new request === #
+    def submit(self, prompt, memory=(), **settings):
+        request = GenerationRequest(prompt=prompt, **settings)
+        # format_prompt's IDs, each memory turn encoded once across requests (tokenizer's turn cache)
+        request.ids = self.tokenizer.encode_prompt(list(memory), prompt)[-self.model.max_seq_len:]
+        self.queue.append(request)
+        return request
+
+    @property
+    def active(self):
+        return sum(r is not None for r in self.slots)
+
+    def has_work(self):
+        return bool(self.queue) or self.active > 0
+
+    # === One engine step: admit -> sample -> batched forward === #
+    def step(self):
+        """Advances every active sequence by one sampling step, returns requests that finished"""
+        with torch.no_grad(), precision_context(self.precision):
+            self._admit()
+
+            rows = [row for row, request in enumerate(self.slots) if request is not None]
+            if not rows:
+                return []
+            requests = [self.slots[row] for row in rows]
+
+            # One fused sampling call for every active row, each with its own settings
+            rows_t = torch.tensor(rows, dtype=torch.long, device=self.recent.device)
+            next_ids = sample_next(self.next_logits[rows_t], self.recent[rows_t],
+                                   temperature=torch.tensor([r.temperature for r in requests]),
+                                   top_k=torch.tensor([r.k for r in requests]),
+                                   top_p=torch.tensor([r.top_p for r in requests]),
+                                   banned_ids=(self.pad_id, self.unk_id))
+            self.recent[rows_t] = torch.cat([self.recent[rows_t, 1:], next_ids.unsqueeze(1)], dim=1)
+
+            finished = []
+            to_forward = []
+            for row, request, next_id in zip(rows, requests, next_ids.tolist()):
+                request.ids = (request.ids + [next_id])[-self.model.max_seq_len:]
+                request.output_ids.append(next_id)
+                request.steps += 1
+
+                if self._check_finished(request):
+                    finished.append(request)
+                    self._release(row)
+                else:
+                    to_forward.append(row)
+
+            self._forward(to_forward)
+
+        return finished
+
+    def run(self):
+        """Steps until the queue is drained and every active sequence finished"""
+        finished = []
+        while self.has_work():
+            finished.extend(self.step())
+        return finished
+
+    def generate_many(self, prompts, **settings):
+        """Convenience: replies for a list of prompts, in the same order"""
+        requests = [self.submit(p, **settings) for p in prompts]
+        self.run()
+        return [r.reply for r in requests]
+
+    # === Internals === #
+    def _admit(self):
+        # Prefill queued requests into free rows (batch of 1 each, prompt lengths differ)
+        for row in range(self.max_batch_size):
+            if not self.queue:
+                break
+            if self.slots[row] is not None:
+                continue
+
+            request = self.queue.popleft()
+            self.slots[row] = request
+            self._prefill(row, request.ids)
+
+            # Repetition window starts from the prompt's tail, left-padded with PAD
+            recent = request.ids[-20:]
+            self.recent[row] = torch.tensor([self.pad_id] * (20 - len(recent)) + recent)
+
+    def _prefill(self, row, ids):
+        view = self.cache.row(row)
+        x = torch.tensor([ids], dtype=torch.long, device=self.cache.keys[0].device)
+        self.next_logits[row] = self.model.forward_cached(x, view)[0, -1]
+        self.lengths[row] = view.length
+
+    def _forward(self, rows):
+        if not rows:
+            return
+
+        # Rows whose window is full must be rebuilt (positions shift), same rule as decode_step
+        step_rows = []
+        for row in rows:
+            if self.lengths[row] + 1 > self.cache.max_len:
+                ids = self.slots[row].ids
+                self._prefill(row, ids[-(self.cache.max_len - self.window_stride + 1):])
+            else:
+                step_rows.append(row)
+
+        if not step_rows:
+            return
+
+        device = self.cache.keys[0].device
+        x = torch.tensor([self.slots[r].ids[-1] for r in step_rows], dtype=torch.long, device=device)
+        rows_t = torch.tensor(step_rows, dtype=torch.long, device=device)
+        positions = torch.tensor([self.lengths[r] for r in step_rows], dtype=torch.long, device=device)
+
+        logits = self.model.forward_rows(x, self.cache, rows_t, positions)
+
+        self.next_logits[rows_t] = logits
+        for row in step_rows:
+            self.lengths[row] += 1
+
+    def _check_finished(self, request):
+        if request.stop and self._hit_stop(request):
+            request.finish_reason = "stop"
+        elif request.steps >= request.max_len:
+            request.finish_reason = "length"
+        else:
+            return False
+
+        # The whole output is decoded once, when the request ends
+        text = self.tokenizer.decode(request.output_ids)
+        for stop in request.stop:
+            if stop in text:
+                text = text.split(stop)[0]
+                break
+        request.reply = text.strip()
+        request.done = True
+        return True
+
+    def _hit_stop(self, request):
+        # Only the newest piece is checked, with enough of the previous text to catch a stop string across pieces
+        if request.detok is None:
+            request.detok = StreamDetokenizer(self.tokenizer)
+        request.tail += request.detok.push(request.output_ids[-1])
+        text = request.tail + request.detok.peek()
+        hit = any(stop in text for stop in request.stop)
+
+        overlap = max(len(stop) for stop in request.stop) - 1
+        request.tail = request.tail[-overlap:] if overlap > 0 else ""
+        return hit
+
+    def _release(self, row):
+        self.slots[row] = None
+        self.lengths[row] = 0
@@ -0,0 +1,486 @@
+# ===================================================================================== #
+#    Inference Server - contians:                                                       #
+#       Model Workers -- Sessions -- Metrics -- HTTP Handler -- Server                  #
+#       run from StudyBuddy/:  python src/inference_server.py [--workers N]             #
+# ===================================================================================== #
+
+import os
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+import multiprocessing as mp
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOST = "127.0.0.1"          # local only, nothing leaves the machine
+PORT = 8765
+
+# Sampling settings a request may set, with their allowed range
+SETTINGS = {
+    "max_len": (int, 1, 1024),
+    "k": (int, 1, 100),
+    "temperature": (float, 0.01, 5.0),
+}
+
+# ======================== #
+#       Model Workers      #
+# ======================== #
+def _worker_main(worker_id, model_path, sp_model, precision, draft_path, num_threads, jobs, events, cancelled):
+    """
+    Runs in its own process: loads the model once, then streams one request at a time.
+    The weights are torch.load(mmap=True)'d, so with the exported inference file every worker maps
+    the same page-cache pages - N workers cost about one model of memory.
+    A request id in cancelled (its handler timed out) is skipped, or stopped between pieces.
+    """
+    import torch
+    from ai_engine import LocalChatBot
+
+    torch.set_num_threads(num_threads)
+    bot = LocalChatBot()
+    bot.load_model(model_path, sp_model, precision=precision)
+    if draft_path:
+        bot.load_draft_model(draft_path)
+    events.put((None, "ready", worker_id))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        request_id, memory, prompt, settings = job
+        if cancelled.pop(request_id, None) is not None:
+            continue
+        events.put((request_id, "started", worker_id))
+        try:
+            bot.memory = list(memory)
+            replies = bot.stream(prompt, **settings)
+            for piece in replies:
+                if request_id in cancelled:
+                    replies.close()         # stops before the turn is saved
+                    break
+                events.put((request_id, "piece", piece))
+            else:
+                # stream() saved the turn with the same rule as the desktop app, send the new memory back
+                # (its last line is "Bot: <reply>", the cleaned up reply generate() would return)
+                events.put((request_id, "done", (bot.memory, bot.reply_tokens, bot.memory[-1][len("Bot: "):])))
+        except Exception as e:
+            events.put((request_id, "error", f"{type(e).__name__}: {e}"))
+        cancelled.pop(request_id, None)
+
+# =================== #
+#       Sessions      #
+# =================== #
+class SessionStore:
+    """Conversation memory per session id - least recently used sessions are dropped past max_sessions"""
+    def __init__(self, max_sessions=1000, ttl_seconds=3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sessions = OrderedDict()       # id -> (memory, last used)
+        self.busy = set()                   # sessions with a reply being generated
+        self.lock = threading.Lock()
+
+    def acquire(self, session_id):
+        """Memory of the session (new or expired -> empty), None if it already has a request running"""
+        with self.lock:
+            if session_id in self.busy:
+                return None
+            memory, last_used = self.sessions.get(session_id, ([], 0.0))
+            if time.time() - last_used > self.ttl_seconds:
+                memory = []
+            self.busy.add(session_id)
+            return list(memory)
+
+    def release(self, session_id, memory=None):
+        with self.lock:
+            self.busy.discard(session_id)
+            if memory is not None:
+                self.sessions[session_id] = (list(memory), time.time())
+                self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+
+    def reset(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self.sessions)
+
+# ================== #
+#       Metrics      #
+# ================== #
+class Metrics:
+    """Request counters + recent latencies (seconds), thread safe"""
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "completed": 0, "rejected": 0, "errors": 0, "tokens": 0}
+        self.first_piece = deque(maxlen=window)
+        self.total = deque(maxlen=window)
+        self.started = time.time()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+
+    def record(self, first_piece, total, tokens):
+        with self.lock:
+            self.counts["completed"] += 1
+            self.counts["tokens"] += tokens
+            if first_piece is not None:
+                self.first_piece.append(first_piece)
+            self.total.append(total)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                **self.counts,
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "first_piece_ms": _percentiles(self.first_piece),
+                "total_ms": _percentiles(self.total),
+            }
+
+def _percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1] * 1000, 1)}
+
+# ======================= #
+#       HTTP Handler      #
+# ======================= #
+class Handler(BaseHTTPRequestHandler):
+    """
+    POST   /v1/chat              {"prompt", "session_id"?, "stream"?, "max_len"?, "k"?, "temperature"?}
+                                 stream=true (default): newline-delimited JSON, {"piece": ...} per piece
+                                 then {"done": true, "reply": ..., "session_id": ...}
+    DELETE /v1/sessions/<id>     forget a session's memory
+    GET    /health               200 once every worker has its model loaded, else 503
+    GET    /metrics              counters, queue depth, latency percentiles
+    """
+    protocol_version = "HTTP/1.1"       # keep-alive + chunked streaming
+    server_version = "StudyBuddy/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # === Routes === #
+    def do_GET(self):
+        if self.path == "/health":
+            health = self.server.health()
+            self._send_json(200 if health["status"] == "ok" else 503, health)
+        elif self.path == "/metrics":
+            self._send_json(200, self.server.metrics_snapshot())
+        else:
+            self._send_json(404, {"error": f"No route {self.path}"})
+
+    def do_DELETE(self):
+        prefix = "/v1/sessions/"
+        if self.path.startswith(prefix) and len(self.path) > len(prefix):
+            found = self.server.sessions.reset(self.path[len(prefix):])
+            self._send_json(200, {"reset": found})
+        else:
+            self._send_json(404, {"error": f"No route {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/v1/chat":
+            self._send_json(404, {"error": f"No route {self.path}"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt, settings = _parse_chat(body)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        server = self.server
+        server.metrics.count("requests")
+        session_id = str(body.get("session_id") or uuid.uuid4().hex)
+        memory = server.sessions.acquire(session_id)
+        if memory is None:
+            self._send_json(409, {"error": f"Session {session_id} already has a reply in progress"})
+            return
+
+        # Back-pressure: a full queue is refused right away instead of piling up
+        request_id, events = server.submit(memory, prompt, settings)
+        if request_id is None:
+            server.sessions.release(session_id)
+            server.metrics.count("rejected")
+            self._send_json(503, {"error": "Server busy, try again shortly"}, headers={"Retry-After": "1"})
+            return
+
+        # Whatever happens (timeout, worker error, client gone) the session is released,
+        # memory None keeps what it had before this request
+        memory = None
+        try:
+            memory = self._reply(session_id, request_id, events, stream=body.get("stream", True))
+        finally:
+            server.sessions.release(session_id, memory)
+            server.finish(request_id)
+
+    # === Reply === #
+    def _reply(self, session_id, request_id, events, stream):
+        """Relays the worker's events to the client, returns the session's new memory (None = unchanged)"""
+        server = self.server
+        start = time.perf_counter()
+        first_piece, deadline = None, None
+
+        try:
+            if stream:
+                self._start_stream()
+            while True:
+                kind, data = self._next_event(events, deadline)
+                if kind == "started":
+                    # request_timeout counts from when a worker picks the job up, not the time spent queued
+                    deadline = time.perf_counter() + server.request_timeout
+                elif kind == "piece":
+                    if first_piece is None:
+                        first_piece = time.perf_counter() - start
+                    if stream:
+                        self._send_chunk({"piece": data})
+                elif kind == "done":
+                    memory, tokens, reply_text = data
+                    break
+                else:
+                    raise RuntimeError(data)
+        except (queue.Empty, RuntimeError) as e:
+            server.metrics.count("errors")
+            if isinstance(e, queue.Empty):
+                server.cancel(request_id)
+            error = "Timed out generating the reply" if isinstance(e, queue.Empty) else str(e)
+            try:
+                if stream:
+                    self._send_chunk({"error": error})
+                    self._end_stream()
+                else:
+                    self._send_json(500, {"error": error})
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            return None
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away - the worker still finishes the reply, keep it in the session
+            return self._drain(request_id, events, deadline)
+
+        server.metrics.record(first_piece, time.perf_counter() - start, tokens)
+        reply = {"done": True, "reply": reply_text, "session_id": session_id}
+        try:
+            if stream:
+                self._send_chunk(reply)
+                self._end_stream()
+            else:
+                self._send_json(200, reply)
+        except (BrokenPipeError, ConnectionResetError):
+            pass        # the reply is complete, the session keeps it even if the client missed the end
+        return memory
+
+    def _next_event(self, events, deadline):
+        """
+        Next (kind, data) of the request. Before the job starts there's no deadline, only a check that
+        some worker is still alive to take it; queue.Empty once the deadline has passed.
+        """
+        while deadline is None:
+            try:
+                return events.get(timeout=1.0)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in self.server.workers):
+                    raise RuntimeError("No model worker running")
+        return events.get(timeout=max(0.0, deadline - time.perf_counter()))
+
+    def _drain(self, request_id, events, deadline):
+        try:
+            while True:
+                kind, data = self._next_event(events, deadline)
+                if kind == "started":
+                    deadline = time.perf_counter() + self.server.request_timeout
+                elif kind != "piece":
+                    return data[0] if kind == "done" else None
+        except queue.Empty:
+            self.server.cancel(request_id)
+        except RuntimeError:
+            pass
+        return None
+
+    # === Wire format === #
+    def _send_json(self, status, obj, headers=None):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def _parse_chat(body):
+    if not isinstance(body, dict):
+        raise ValueError("Body must be a JSON object")
+    prompt = body.get("prompt")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise ValueError("'prompt' must be a non-empty string")
+
+    settings = {}
+    for name, (kind, low, high) in SETTINGS.items():
+        if body.get(name) is not None:
+            value = kind(body[name])
+            if not low <= value <= high:
+                raise ValueError(f"'{name}' must be between {low} and {high}")
+            settings[name] = value
+    return prompt.strip(), settings
+
+# ================= #
+#       Server      #
+# ================= #
+class InferenceServer(ThreadingHTTPServer):
+    """
+    HTTP front end + a pool of model worker processes.
+    Requests wait in one bounded queue (max_queue); when it's full new requests get 503 + Retry-After
+    instead of an ever-growing backlog. Session memory lives here, each job carries it to the worker.
+    This process never imports torch - only the workers load the model.
+    """
+    daemon_threads = True
+
+    def __init__(self, address=(HOST, PORT), workers=2, max_queue=8, model_path="models/tinyGPT_inference.pt",
+                 sp_model="models/studybuddy_sp.model", precision="fp32", draft_path=None, num_threads=None,
+                 request_timeout=120, max_sessions=1000, verbose=False):
+        super().__init__(address, Handler)
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+        self.sessions = SessionStore(max_sessions=max_sessions)
+        self.metrics = Metrics()
+
+        # spawn: workers start clean (no inherited torch threads), the weights are shared through the mmap
+        ctx = mp.get_context("spawn")
+        self.jobs = ctx.Queue(maxsize=max_queue)
+        self.events = ctx.Queue()
+        self.manager = ctx.Manager()
+        self.cancelled = self.manager.dict()        # request id -> True, read by the workers
+        self.max_queue = max_queue
+        num_threads = num_threads or max(1, (os.cpu_count() or 1) // workers)
+        self.workers = [ctx.Process(target=_worker_main, daemon=True,
+                                    args=(i, model_path, sp_model, precision, draft_path, num_threads,
+                                          self.jobs, self.events, self.cancelled))
+                        for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+        self.ready = set()
+        self.pending = {}           # request id -> queue.Queue of (kind, data) for its handler thread
+        self.pending_lock = threading.Lock()
+        self.router = threading.Thread(target=self._route_events, daemon=True)
+        self.router.start()
+
+    # === Jobs === #
+    def submit(self, memory, prompt, settings):
+        """(request id, event queue), or (None, None) when the job queue is full"""
+        request_id = uuid.uuid4().hex
+        events = queue.Queue()
+        with self.pending_lock:
+            self.pending[request_id] = events
+        try:
+            self.jobs.put_nowait((request_id, memory, prompt, settings))
+        except queue.Full:
+            self.finish(request_id)
+            return None, None
+        return request_id, events
+
+    def finish(self, request_id):
+        with self.pending_lock:
+            self.pending.pop(request_id, None)
+
+    def cancel(self, request_id):
+        """The worker skips the job, or stops it at its next piece (the session keeps its old memory)"""
+        self.cancelled[request_id] = True
+
+    def _route_events(self):
+        # One thread hands every worker event to the handler thread waiting for that request
+        while True:
+            request_id, kind, data = self.events.get()
+            if kind == "ready":
+                self.ready.add(data)
+                continue
+            with self.pending_lock:
+                events = self.pending.get(request_id)
+            if events is not None:
+                events.put((kind, data))
+
+    # === Health / Metrics === #
+    def health(self):
+        alive = sum(worker.is_alive() for worker in self.workers)
+        status = "ok" if alive == len(self.workers) and len(self.ready) == len(self.workers) else "starting"
+        if alive < len(self.workers):
+            status = "degraded"
+        return {"status": status, "workers": len(self.workers), "alive": alive, "ready": len(self.ready)}
+
+    def metrics_snapshot(self):
+        with self.pending_lock:
+            in_flight = len(self.pending)
+        return {
+            **self.metrics.snapshot(),
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - len(self.workers)),
+            "max_queue": self.max_queue,
+            "workers": len(self.workers),
+            "sessions": len(self.sessions),
+        }
+
+    def server_close(self):
+        for _ in self.workers:
+            try:
+                self.jobs.put_nowait(None)
+            except queue.Full:
+                break
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.manager.shutdown()
+        super().server_close()
+
+def default_model_path():
+    # Prefer the exported inference weights (memory-mapped + shared between workers), like the desktop app
+    model_path = "models/tinyGPT_inference.pt"
+    return model_path if os.path.exists(model_path) else "models/tinyGPT_checkpoint.pt"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the StudyBuddy model over HTTP on this machine (offline)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=2, help="model worker processes")
+    parser.add_argument("--max-queue", type=int, default=8, help="requests waiting for a worker before 503")
+    parser.add_argument("--model", default=None, help="default: models/tinyGPT_inference.pt, else the checkpoint")
+    parser.add_argument("--sp-model", default="models/studybuddy_sp.model")
+    parser.add_argument("--precision", default="fp32", choices=("fp32", "int8", "bf16"))
+    parser.add_argument("--draft", default=None, help="draft model for speculative decoding")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--verbose", action="store_true", help="log every HTTP request")
+    args = parser.parse_args()
+
+    server = InferenceServer((args.host, args.port), workers=args.workers, max_queue=args.max_queue,
+                             model_path=args.model or default_model_path(), sp_model=args.sp_model,
+                             precision=args.precision, draft_path=args.draft, num_threads=args.threads,
+                             verbose=args.verbose)
+    print(f"StudyBuddy inference server on http://{args.host}:{args.port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,283 @@
+# ===================================================================================== #
+#    Pipeline - contians:                                                               #
+#       Stages -- Content Hashing -- Incremental DAG Runner                             #
+#       run from StudyBuddy/:  python src/pipeline.py [targets...]                      #
+# ===================================================================================== #
+
+import os
+import sys
+import glob
+import json
+import time
+import fnmatch
+import hashlib
+import argparse
+import subprocess
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from file_utils import file_hash
+
+STATE_PATH = "data/cache/pipeline_state.json"
+LOG_DIR = "logs/pipeline"
+
+# ================ #
+#       Stages     #
+# ================ #
+@dataclass
+class Stage:
+    """
+    One step of the pipeline: a script run as its own process.
+    inputs are files, directories (everything under them) or glob patterns; the script itself is
+    always an input too, so editing a stage's code re-runs it. A stage depends on every stage
+    whose outputs match one of its inputs.
+    """
+    name: str
+    cmd: list
+    inputs: list
+    outputs: list
+    deps: list = field(default_factory=list)        # filled in by build_graph
+
+    @property
+    def script(self):
+        return self.cmd[0]
+
+def default_stages(train_args=()):
+    return [
+        Stage("pdfs", ["src/data_processing/extract_pdfs.py"],
+              inputs=["data/raw_pdfs/*.pdf"],
+              outputs=["data/processed/notes_from_pdf.txt"]),
+        Stage("images", ["src/data_processing/extract_images.py"],
+              inputs=["data/raw_images/*.png", "data/raw_images/*.jpg", "data/raw_images/*.jpeg"],
+              outputs=["data/processed/notes_from_images.txt"]),
+        Stage("conversations", ["src/data_processing/prepare_conversational_data.py"],
+              inputs=["data/raw_conversational"],
+              outputs=["data/processed/conversation_data.txt"]),
+        Stage("merge", ["src/data_processing/build_final_dataset.py"],
+              inputs=["data/processed/*.txt", "src/data_processing/dedup.py"],
+              outputs=["data/processed/final_dataset.txt", "data/processed/final_dataset.index.json",
+                       "data/processed/final_dataset.docs.bin"]),
+        Stage("tokenizer", ["src/train/train_tokenizer.py"],
+              inputs=["data/processed/final_dataset.txt"],
+              outputs=["models/studybuddy_sp.model", "models/studybuddy_sp.vocab"]),
+        Stage("train", ["src/train/train_model.py", *train_args],
+              inputs=["data/processed/final_dataset.txt", "models/studybuddy_sp.model", "src/train/*.py", "src/ai_engine.py"],
+              outputs=["models/tinyGPT.pt"]),
+    ]
+
+def _matches(path, spec):
+    path, spec = os.path.normpath(path), os.path.normpath(spec)
+    if glob.has_magic(spec):
+        return fnmatch.fnmatch(path, spec)
+    return path == spec or path.startswith(spec + os.sep)
+
+def build_graph(stages):
+    """Fills in every stage's deps from outputs -> inputs and returns the stages in a runnable (topological) order"""
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        stage.deps = [other.name for other in stages if other is not stage
+                      and any(_matches(out, spec) for out in other.outputs for spec in stage.inputs)]
+
+    order, state = [], {}
+    def visit(name):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Pipeline has a dependency cycle through '{name}'")
+        state[name] = "visiting"
+        for dep in by_name[name].deps:
+            visit(dep)
+        state[name] = "done"
+        order.append(by_name[name])
+
+    for stage in stages:
+        visit(stage.name)
+    return order
+
+# ============================ #
+#       Content Hashing        #
+# ============================ #
+class HashCache:
+    """file_hash with a size + mtime memo, so an unchanged 100 MB of PDFs isn't re-read on every run"""
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    def get(self, path):
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        digest = file_hash(path)
+        self.entries[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+def expand_inputs(stage):
+    """Sorted input files of a stage (its own outputs and temp files excluded)"""
+    paths = {stage.script}
+    for spec in stage.inputs:
+        if glob.has_magic(spec):
+            paths.update(glob.glob(spec))
+        elif os.path.isdir(spec):
+            for root, _, files in os.walk(spec):
+                paths.update(os.path.join(root, f) for f in files)
+        elif os.path.exists(spec):
+            paths.add(spec)
+    own = {os.path.normpath(out) for out in stage.outputs}
+    return sorted(os.path.normpath(p) for p in paths
+                  if os.path.isfile(p) and os.path.normpath(p) not in own and not p.endswith(".tmp"))
+
+def stage_key(stage, hashes):
+    """One hash over the command and the content of every input file"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(stage.cmd).encode())
+    for path in expand_inputs(stage):
+        h.update(f"{path}\0{hashes.get(path)}\n".encode())
+    return h.hexdigest()
+
+def outputs_intact(stage, record, hashes):
+    """Every output is still there with the content the last run produced"""
+    recorded = record.get("outputs", {})
+    return all(os.path.exists(out) and recorded.get(out) == hashes.get(out) for out in stage.outputs)
+
+# ================================ #
+#       Incremental DAG Runner     #
+# ================================ #
+def run_stage(stage):
+    """Runs the stage's script in its own process, output to logs/pipeline/<stage>.log: (returncode, seconds)"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    start = time.time()
+    with open(os.path.join(LOG_DIR, f"{stage.name}.log"), "w", encoding="utf-8") as log:
+        result = subprocess.run([sys.executable, *stage.cmd], stdout=log, stderr=subprocess.STDOUT)
+    return result.returncode, time.time() - start
+
+def run_pipeline(stages=None, targets=None, jobs=None, force=(), dry_run=False, state_path=STATE_PATH):
+    """
+    Runs the stages needed for `targets` (default: all) in dependency order, independent ones concurrently
+    on up to `jobs` processes. A stage is skipped when its command and input contents hash the same as on
+    its last successful run and its outputs are untouched - so a one-file change only re-runs what's downstream
+    of it (and a re-run that rewrites an output with the same bytes stops the cascade there).
+    """
+    stages = build_graph(stages or default_stages())
+    by_name = {stage.name: stage for stage in stages}
+
+    # Only the targets and what they depend on
+    wanted = set()
+    def want(name):
+        if name not in by_name:
+            raise ValueError(f"Unknown stage '{name}', expected one of {list(by_name)}")
+        if name not in wanted:
+            wanted.add(name)
+            for dep in by_name[name].deps:
+                want(dep)
+    for name in targets or by_name:
+        want(name)
+    stages = [stage for stage in stages if stage.name in wanted]
+
+    state = {"stages": {}, "hashes": {}}
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    hashes = HashCache(state["hashes"])
+
+    def save_state():
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1)
+        os.replace(state_path + ".tmp", state_path)
+
+    def is_fresh(stage):
+        record = state["stages"].get(stage.name)
+        return (record is not None and stage.name not in force and "all" not in force
+                and record["key"] == stage_key(stage, hashes) and outputs_intact(stage, record, hashes))
+
+    report = {}             # name -> (status, seconds)
+    running = {}            # future -> stage
+    start = time.time()
+    jobs = max(1, jobs or os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(report) < len(stages):
+            for stage in stages:
+                if stage.name in report or stage in running.values():
+                    continue
+                dep_status = [report.get(dep, (None,))[0] for dep in stage.deps if dep in wanted]
+                if any(status in ("failed", "blocked") for status in dep_status):
+                    report[stage.name] = ("blocked", 0.0)
+                    print(f"[{stage.name}] blocked - an upstream stage failed")
+                    continue
+                if any(status is None for status in dep_status):
+                    continue        # upstream still running
+
+                # Inputs are final now (upstream stages are done), so the key can be checked
+                if dry_run and "would run" in dep_status:
+                    report[stage.name] = ("would run", 0.0)
+                    print(f"[{stage.name}] would run if upstream output changes")
+                elif is_fresh(stage):
+                    report[stage.name] = ("up to date", 0.0)
+                    print(f"[{stage.name}] up to date")
+                elif dry_run:
+                    report[stage.name] = ("would run", 0.0)
+                    print(f"[{stage.name}] would run: {' '.join(stage.cmd)}")
+                else:
+                    print(f"[{stage.name}] running: {' '.join(stage.cmd)}")
+                    running[pool.submit(run_stage, stage)] = stage
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                returncode, seconds = future.result()
+                if returncode != 0:
+                    report[stage.name] = ("failed", seconds)
+                    print(f"[{stage.name}] FAILED (exit {returncode}) after {seconds:.1f}s - see {LOG_DIR}/{stage.name}.log")
+                    continue
+
+                missing = [out for out in stage.outputs if not os.path.exists(out)]
+                if missing:
+                    report[stage.name] = ("failed", seconds)
+                    print(f"[{stage.name}] FAILED - finished without writing {missing}")
+                    continue
+
+                state["stages"][stage.name] = {
+                    "key": stage_key(stage, hashes),
+                    "outputs": {out: hashes.get(out) for out in stage.outputs},
+                    "seconds": seconds,
+                    "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+                }
+                save_state()
+                report[stage.name] = ("ran", seconds)
+                print(f"[{stage.name}] done in {seconds:.1f}s")
+
+    if not dry_run:
+        # Forget hashes of files that are gone
+        state["hashes"] = {path: entry for path, entry in hashes.entries.items() if os.path.exists(path)}
+        save_state()
+
+    wall = time.time() - start
+    print(f"\n  {'stage':<15} {'status':<12} {'seconds':>9}")
+    for stage in stages:
+        status, seconds = report[stage.name]
+        print(f"  {stage.name:<15} {status:<12} {seconds:>9.1f}")
+    busy = sum(seconds for _, seconds in report.values())
+    print(f"  {'total':<15} {'':<12} {wall:>9.1f}   ({busy:.1f}s of stage time, {jobs} concurrent)")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the StudyBuddy data -> tokenizer -> model pipeline incrementally")
+    parser.add_argument("targets", nargs="*", help="stages to bring up to date (default: all); their dependencies run too")
+    parser.add_argument("--jobs", type=int, default=None, help="stages run at the same time (default: all cores)")
+    parser.add_argument("--force", nargs="*", default=(), help="re-run these stages even if unchanged ('all' for every stage)")
+    parser.add_argument("--dry-run", action="store_true", help="only show which stages would run")
+    parser.add_argument("--train-args", default="", help="extra arguments for train_model.py, e.g. \"--epochs 1\"")
+    args = parser.parse_args()
+
+    report = run_pipeline(
+        stages=default_stages(args.train_args.split()),
+        targets=args.targets,
+        jobs=args.jobs,
+        force=set(args.force),
+        dry_run=args.dry_run,
+    )
+    sys.exit(1 if any(status == "failed" for status, _ in report.values()) else 0)
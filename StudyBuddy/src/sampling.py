@@ -0,0 +1,121 @@
+# ===================================================================================== #
+#    Sampling - contians:                                                               #
+#       Repetition Penalty -- Fused Temperature/Top-K/Top-P Sampler -- Token Buffer     #
+#                                                                                       #
+# ===================================================================================== #
+
+import torch
+import torch.nn.functional as F
+
+# ================================= #
+#       Repetition Penalty          #
+# ================================= #
+def apply_repetition_penalty(logits, recent_ids, penalty=0.7):
+    """
+    logits:     (batch, vocab) - modified in place and returned
+    recent_ids: (batch, window) token IDs to discourage (pad short rows with a banned ID like 0)
+    penalty:    factor < 1, each recent token is penalized once no matter how often it repeats
+
+    Sign-aware: positive logits are scaled by `penalty`, negative ones divided by it,
+    so a repeated token always becomes LESS likely (a plain multiply raises negative logits).
+    """
+    scores = logits.gather(1, recent_ids)
+    scores = torch.where(scores > 0, scores * penalty, scores / penalty)
+    return logits.scatter_(1, recent_ids, scores)
+
+# ==================================== #
+#       Fused Next-Token Sampler       #
+# ==================================== #
+def sample_next(logits, recent_ids=None, temperature=0.7, top_k=8, top_p=1.0, penalty=0.7, banned_ids=(0, 1)):
+    """
+    Samples one token per row without Python loops over the vocab or the history.
+    logits: (batch, vocab) last-position logits (not modified)
+    temperature / top_k / top_p: a number for every row, or a (batch,) tensor for per-row settings
+    returns: (batch,) sampled token IDs
+    """
+    probs, top_idx = next_token_probs(logits, recent_ids, temperature, top_k, top_p, penalty, banned_ids)
+
+    # Sample inside the top-k, then map back to the vocab index
+    choice = torch.multinomial(probs, 1)
+    return top_idx.gather(1, choice).squeeze(1)
+
+def next_token_probs(logits, recent_ids=None, temperature=0.7, top_k=8, top_p=1.0, penalty=0.7, banned_ids=(0, 1)):
+    """
+    The distribution sample_next draws from, without sampling it (speculative decoding compares two of them).
+    returns: (probs, ids), both (batch, top_k) - every other token has probability 0
+    """
+    logits = logits.detach().float().clone()
+
+    # Stops PAD/UNK (or any other banned) token
+    if banned_ids:
+        logits[:, list(banned_ids)] = float("-inf")
+
+    # repetition penalty
+    if recent_ids is not None and penalty != 1.0:
+        apply_repetition_penalty(logits, recent_ids, penalty)
+
+    # Temperature scaling for softer probability distribution
+    if torch.is_tensor(temperature):
+        logits /= temperature.to(logits.device, torch.float32).unsqueeze(1)
+    else:
+        logits /= temperature
+
+    # Top-k: one topk at the largest k (values come back sorted), then mask each row past its own k
+    if torch.is_tensor(top_k):
+        top_k = top_k.to(logits.device)
+        top_vals, top_idx = torch.topk(logits, int(top_k.max()), dim=1)
+        ranks = torch.arange(top_vals.shape[1], device=logits.device).unsqueeze(0)
+        top_vals = top_vals.masked_fill(ranks >= top_k.unsqueeze(1), float("-inf"))
+    else:
+        top_vals, top_idx = torch.topk(logits, top_k, dim=1)
+
+    # Probabilities over the kept tokens only (same as softmax -> top-k -> renormalize)
+    probs = F.softmax(top_vals, dim=1)
+
+    # Top-p: keep the smallest prefix whose mass reaches top_p (always keeps the best token)
+    if torch.is_tensor(top_p) or top_p < 1.0:
+        top_p = _per_row(top_p, logits.shape[0], logits.device)
+        before = torch.cumsum(probs, dim=1) - probs
+        probs = probs.masked_fill(before >= top_p.unsqueeze(1), 0.0)
+        probs = probs / probs.sum(dim=1, keepdim=True)
+
+    return probs, top_idx
+
+def _per_row(value, batch_size, device):
+    # Broadcast a scalar setting (or pass through a per-row tensor)
+    if torch.is_tensor(value):
+        return value.to(device=device, dtype=torch.float32)
+    return torch.full((batch_size,), value, device=device, dtype=torch.float32)
+
+# ========================== #
+#       Token Buffer         #
+# ========================== #
+class TokenBuffer:
+    """Preallocated (batch, capacity) token IDs - appending a token is a write, not a new tensor"""
+    def __init__(self, prompt_ids, capacity, device=None):
+        prompt_ids = torch.as_tensor(prompt_ids, dtype=torch.long, device=device)
+        if prompt_ids.dim() == 1:
+            prompt_ids = prompt_ids.unsqueeze(0)
+
+        batch_size, prompt_len = prompt_ids.shape
+        self.ids = torch.zeros(batch_size, max(capacity, prompt_len), dtype=torch.long, device=device)
+        self.ids[:, :prompt_len] = prompt_ids
+        self.length = prompt_len
+
+    def append(self, next_ids):
+        """next_ids: (batch,) one new token per row"""
+        if self.length == self.ids.shape[1]:
+            raise ValueError(f"TokenBuffer full ({self.length} tokens)")
+        self.ids[:, self.length] = next_ids
+        self.length += 1
+
+    def window(self, size):
+        """View of the last `size` tokens (batch, <= size) - the model's context"""
+        return self.ids[:, max(0, self.length - size):self.length]
+
+    def recent(self, size):
+        """Last `size` tokens for the repetition penalty, left-padded with 0 (PAD) on short rows"""
+        if self.length >= size:
+            return self.ids[:, self.length - size:self.length]
+        pad = self.ids.new_zeros(self.ids.shape[0], size - self.length)
+        return torch.cat([pad, self.ids[:, :self.length]], dim=1)
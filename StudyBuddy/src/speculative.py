@@ -0,0 +1,129 @@
+# ===================================================================================== #
+#    Speculative Decoding - contians:                                                   #
+#       Draft Proposals -- Batched Verify + Acceptance Sampling -- Stats                #
+#                                                                                       #
+# ===================================================================================== #
+
+import contextlib
+
+import torch
+
+from sampling import TokenBuffer, next_token_probs
+
+# ==================================== #
+#       Speculative Decoder            #
+# ==================================== #
+class SpeculativeDecoder:
+    """
+    A small draft TinyGPT proposes draft_tokens tokens one at a time (cheap), then the target TinyGPT
+    scores all of them in ONE forward pass. Each draft token x is kept with probability min(1, p(x) / q(x))
+    (p = target, q = draft, both after penalty/temperature/top-k); at the first rejection a replacement is
+    sampled from max(0, p - q), and if every draft is kept the target's next distribution gives one extra
+    token. Every round yields 1 .. draft_tokens + 1 tokens and the output has the target's distribution.
+
+    Both models keep a KV cache of everything but the newest token. Rejected drafts are dropped by
+    rolling the cache lengths back. Positions are absolute inside the window, so when the window is full
+    both caches are rebuilt from the last (max_seq_len - draft_tokens - window_stride) tokens.
+    """
+    def __init__(self, target, draft, draft_tokens=4, cache_dtype=None):
+        if draft.fc.out_features != target.fc.out_features:
+            raise ValueError(f"Draft vocab ({draft.fc.out_features}) doesn't match the model's ({target.fc.out_features})")
+        self.target = target
+        self.draft = draft
+        self.draft_tokens = draft_tokens
+        self.cache_dtype = cache_dtype
+        self.max_seq_len = min(target.max_seq_len, draft.max_seq_len)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"rounds": 0, "proposed": 0, "accepted": 0, "tokens": 0}
+
+    @property
+    def acceptance_rate(self):
+        """Fraction of draft tokens the target kept"""
+        return self.stats["accepted"] / max(1, self.stats["proposed"])
+
+    @property
+    def tokens_per_pass(self):
+        """Tokens generated per target forward pass (1.0 = plain decoding)"""
+        return self.stats["tokens"] / max(1, self.stats["rounds"])
+
+    def steps(self, prompt_ids, max_len, temperature=0.7, top_k=8, penalty=0.7, banned_ids=(0, 1),
+              recent=20, window_stride=1, context=contextlib.nullcontext):
+        """
+        Yields (next_id, window) for max_len new tokens, like LocalChatBot._sample_steps.
+        context: called for a context manager every forward pass runs in (e.g. bf16 autocast)
+        """
+        k_max = self.draft_tokens
+        tokens = TokenBuffer(prompt_ids, capacity=len(prompt_ids) + max_len + k_max)
+        target_cache = self.target.new_cache(dtype=self.cache_dtype)
+        draft_cache = self.draft.new_cache(dtype=self.cache_dtype)
+        sampling = dict(temperature=temperature, top_k=top_k, penalty=penalty, banned_ids=banned_ids)
+
+        start = 0           # buffer index of cache position 0
+        produced = 0
+        while produced < max_len:
+            # The verify pass writes k more positions - rebuild from a later start if they don't fit
+            k = min(k_max, max_len - produced - 1)
+            if tokens.length - start + k > self.max_seq_len:
+                start = tokens.length - max(1, self.max_seq_len - k_max - window_stride)
+                target_cache.reset()
+                draft_cache.reset()
+            n = tokens.length
+
+            with torch.no_grad(), context():
+                # 1. Draft: k tokens from the small model (written into the buffer, rolled back below)
+                draft_dists, draft_probs = [], []
+                for _ in range(k):
+                    window = tokens.ids[:, start + draft_cache.length:tokens.length]
+                    logits = self.draft.forward_cached(window, draft_cache)[:, -1]
+                    q, q_ids = next_token_probs(logits, tokens.recent(recent), **sampling)
+                    choice = torch.multinomial(q, 1)
+                    tokens.append(q_ids.gather(1, choice)[:, 0])
+                    draft_dists.append((q[0], q_ids[0]))
+                    draft_probs.append(q.gather(1, choice)[0])
+
+                # 2. Verify: everything the target hasn't seen (last context token + k drafts) in one pass
+                window = tokens.ids[:, start + target_cache.length:tokens.length]
+                logits = self.target.forward_cached(window, target_cache)[0, -(k + 1):]     # (k + 1, vocab)
+                p, p_ids = next_token_probs(logits, self._recent_rows(tokens, n, k + 1, recent), **sampling)
+
+            # 3. Accept each draft with probability min(1, p / q), stop at the first rejection
+            accepted = 0
+            if k:
+                drafts = tokens.ids[0, n:n + k]
+                p_drafts = (p[:k] * (p_ids[:k] == drafts.unsqueeze(1))).sum(1)
+                keep = torch.rand(k) * torch.cat(draft_probs) < p_drafts
+                accepted = int(keep.int().cumprod(0).sum())
+
+            # 4. One more token from the target: the residual after a rejection, else the bonus position
+            dist, dist_ids = p[accepted], p_ids[accepted]
+            if accepted < k:
+                q, q_ids = draft_dists[accepted]
+                q_on_p = ((dist_ids.unsqueeze(1) == q_ids.unsqueeze(0)) * q.unsqueeze(0)).sum(1)
+                residual = (dist - q_on_p).clamp_(min=0)
+                if residual.sum() > 0:
+                    dist = residual
+            next_id = dist_ids[torch.multinomial(dist / dist.sum(), 1)]
+
+            # Drop rejected drafts: the buffer and both caches roll back to the accepted prefix
+            tokens.length = n + accepted
+            tokens.append(next_id)
+            target_cache.length = min(target_cache.length, n + accepted - start)
+            draft_cache.length = min(draft_cache.length, n + accepted - start)
+
+            self.stats["rounds"] += 1
+            self.stats["proposed"] += k
+            self.stats["accepted"] += accepted
+            self.stats["tokens"] += accepted + 1
+
+            for i in range(n, tokens.length):
+                yield int(tokens.ids[0, i]), tokens.ids[:, max(0, i + 1 - self.max_seq_len):i + 1]
+            produced += accepted + 1
+
+    @staticmethod
+    def _recent_rows(tokens, first, n_rows, size):
+        # Repetition-penalty window of every verified position: tokens before first, first + 1, ...
+        ids = tokens.ids[0, :tokens.length]
+        padded = torch.cat([ids.new_zeros(size), ids])      # left-padded with PAD like TokenBuffer.recent
+        return torch.stack([padded[end:end + size] for end in range(first, first + n_rows)])
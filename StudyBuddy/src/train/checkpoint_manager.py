@@ -0,0 +1,160 @@
+# ===================================================================================== #
+#    Checkpoint Manager - contians:                                                     #
+#       CPU Snapshot -- Atomic Write -- Background Writer / Rotation / Intervals        #
+#                                                                                       #
+# ===================================================================================== #
+
+import glob
+import os
+import re
+import shutil
+import threading
+import time
+
+import torch
+
+CHECKPOINT_NAME = "tinyGPT_checkpoint.pt"
+
+# ========================= #
+#       CPU Snapshot        #
+# ========================= #
+def _to_cpu(obj):
+    # Copies every tensor (nested dicts/lists too) so training can keep updating the originals
+    if torch.is_tensor(obj):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: _to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(v) for v in obj)
+    return obj
+
+def snapshot_state(model, optimizer, epoch, global_step):
+    """Checkpoint dict with model + Adam state copied to CPU memory (an in-memory copy, no disk I/O)"""
+    return {
+        "model": _to_cpu(model.state_dict()),
+        "optimizer": _to_cpu(optimizer.state_dict()),
+        "epoch": epoch,
+        "global_step": global_step,
+    }
+
+# ========================== #
+#       Atomic Write         #
+# ========================== #
+def atomic_save(obj, path):
+    """torch.save to a temp file, fsync, then rename over `path` - readers see the old or the new file, never half of one"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        torch.save(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _link_or_copy(src, dst):
+    # Points `dst` at `src` atomically: hard link (no extra bytes written) or a copy if links aren't supported
+    tmp_path = f"{dst}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+# ================================ #
+#       Checkpoint Manager         #
+# ================================ #
+class CheckpointManager:
+    """
+    Saves training checkpoints without stalling the loop:
+      - the state is snapshotted to CPU memory on the training thread (fast copy)
+      - torch.save runs on a background thread, into a temp file that is renamed when complete
+      - each save is tinyGPT_checkpoint_step{N}.pt, tinyGPT_checkpoint.pt always points at the newest
+      - only the newest keep_last step files are kept
+    maybe_save() triggers every `every_steps` steps and/or every `every_seconds` seconds.
+    """
+    def __init__(self, folder="models", keep_last=3, every_steps=2000, every_seconds=None):
+        self.folder = folder
+        self.keep_last = keep_last
+        self.every_steps = every_steps
+        self.every_seconds = every_seconds
+
+        self.last_save_time = time.time()
+        self.last_save_step = None
+        self._thread = None
+        self._error = None
+
+        os.makedirs(folder, exist_ok=True)
+
+    @property
+    def latest_path(self):
+        return os.path.join(self.folder, CHECKPOINT_NAME)
+
+    def step_path(self, global_step):
+        return os.path.join(self.folder, f"tinyGPT_checkpoint_step{global_step:08d}.pt")
+
+    # === Interval check === #
+    def due(self, global_step):
+        if global_step == self.last_save_step:
+            return False
+        if self.every_steps and global_step % self.every_steps == 0:
+            return True
+        return bool(self.every_seconds) and time.time() - self.last_save_time >= self.every_seconds
+
+    def maybe_save(self, model, optimizer, epoch, global_step):
+        """Saves if a step or time interval has passed, returns True when a save was started"""
+        if not self.due(global_step):
+            return False
+        self.save(model, optimizer, epoch, global_step)
+        return True
+
+    # === Save === #
+    def save(self, model, optimizer, epoch, global_step, blocking=False):
+        """
+        Snapshots now, writes in the background. Waits for the previous write first (one in flight at
+        most, so snapshots can't pile up in memory). blocking=True also waits for this one.
+        """
+        self.wait()
+        state = snapshot_state(model, optimizer, epoch, global_step)
+        self.last_save_time = time.time()
+        self.last_save_step = global_step
+
+        self._thread = threading.Thread(target=self._write, args=(state, global_step),
+                                        name="checkpoint-writer", daemon=False)
+        self._thread.start()
+        if blocking:
+            self.wait()
+
+    def wait(self):
+        """Blocks until the pending write is on disk, re-raises its error if it failed"""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Background checkpoint write failed") from error
+
+    def close(self):
+        self.wait()
+
+    # === Background thread === #
+    def _write(self, state, global_step):
+        try:
+            start = time.time()
+            path = self.step_path(global_step)
+            atomic_save(state, path)
+            _link_or_copy(path, self.latest_path)
+            self._rotate()
+            print(f"✔ Checkpoint saved → {path} ({time.time() - start:.2f}s in background)")
+        except Exception as e:      # surfaced on the training thread by wait()
+            self._error = e
+
+    def _rotate(self):
+        # tinyGPT_checkpoint.pt is its own link, so deleting an old step file never touches it
+        for old in list_checkpoints(self.folder)[max(1, self.keep_last):]:
+            os.remove(old)
+
+def list_checkpoints(folder="models"):
+    """Step checkpoints in `folder`, newest first"""
+    paths = glob.glob(os.path.join(folder, "tinyGPT_checkpoint_step*.pt"))
+    step = lambda p: int(re.search(r"step(\d+)\.pt$", p).group(1))
+    return sorted(paths, key=step, reverse=True)
@@ -0,0 +1,78 @@
+# ===================================================================================== #
+#    Evaluate - contians:                                                               #
+#       Held-out Split -- Batched Perplexity                                            #
+#                                                                                       #
+# ===================================================================================== #
+
+import math
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# =========================== #
+#       Held-out Split        #
+# =========================== #
+def split_token_ids(ids, eval_frac=0.01, seq_len=192):
+    """
+    (train_ids, eval_ids): the last eval_frac of the token stream is held out.
+    Both are views (a memmap stays a memmap, nothing is copied) and the training part keeps
+    starting at offset 0, so TextDataset can still re-open it in DataLoader workers.
+    """
+    if not eval_frac:
+        return ids, ids[:0]
+
+    n_eval = max(int(len(ids) * eval_frac), seq_len + 1)
+    if n_eval >= len(ids) - seq_len - 1:
+        raise ValueError(f"Corpus of {len(ids)} tokens is too small to hold out {n_eval} for evaluation")
+    return ids[:-n_eval], ids[-n_eval:]
+
+# ============================== #
+#       Batched Perplexity       #
+# ============================== #
+def eval_windows(n_tokens, seq_len, max_tokens=None):
+    """Start offsets of non-overlapping seq_len+1 windows, spread evenly over the split when a token budget cuts them down"""
+    starts = np.arange(0, n_tokens - seq_len, seq_len)
+    if max_tokens is not None and len(starts) * seq_len > max_tokens:
+        keep = max(1, max_tokens // seq_len)
+        starts = starts[np.linspace(0, len(starts) - 1, keep).round().astype(int)]
+    return starts
+
+def evaluate(model, eval_ids, seq_len, batch_size=64, max_tokens=None, precision="fp32", device=None):
+    """
+    Mean next-token loss and perplexity of `model` on eval_ids.
+    Runs in eval mode + inference_mode (TransformerEncoder takes its fused fast path, no autograd
+    bookkeeping), in big batches. max_tokens caps the work so evaluation stays cheap next to training.
+    """
+    device = device or next(model.parameters()).device
+    starts = eval_windows(len(eval_ids), seq_len, max_tokens)
+    if len(starts) == 0:
+        return None
+
+    was_training = model.training
+    model.eval()
+
+    start_time = time.time()
+    total_loss = torch.zeros((), dtype=torch.float64, device=device)
+    n_tokens = 0
+    with torch.inference_mode(), torch.autocast(device.type, dtype=torch.bfloat16, enabled=precision == "bf16"):
+        for i in range(0, len(starts), batch_size):
+            batch = np.stack([eval_ids[s:s + seq_len + 1] for s in starts[i:i + batch_size]]).astype(np.int64)
+            batch = torch.from_numpy(batch).to(device)
+            x, y = batch[:, :-1], batch[:, 1:]
+
+            logits = model(x)
+            loss = F.cross_entropy(logits.reshape(-1, logits.shape[-1]).float(), y.reshape(-1), reduction="sum")
+            total_loss += loss
+            n_tokens += y.numel()
+
+    model.train(was_training)
+
+    mean_loss = total_loss.item() / n_tokens
+    return {
+        "eval_loss": mean_loss,
+        "eval_ppl": math.exp(min(mean_loss, 50.0)),     # capped so an untrained model doesn't overflow
+        "eval_tokens": n_tokens,
+        "eval_s": time.time() - start_time,
+    }
@@ -0,0 +1,75 @@
+# ===================================================================================== #
+#    Export Model - contians:                                                           #
+#       Inference-only weight file (no optimizer state) for fast, memory-mapped loads   #
+#                                                                                       #
+# ===================================================================================== #
+
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import torch
+
+from ai_engine import MODEL_SIZES
+
+# ==================================== #
+#       Export Inference Weights       #
+# ==================================== #
+def export_inference_weights(ckpt_path="models/tinyGPT_checkpoint.pt",
+                             out_path="models/tinyGPT_inference.pt",
+                             model_size=None):
+    """
+    Writes {"config", "model"} only - half the size of a training checkpoint (no Adam state).
+    LocalChatBot.load_model maps it with torch.load(mmap=True) and assigns the mapped tensors
+    straight to the model, so cold start reads almost nothing and forked workers share the pages.
+    model_size: MODEL_SIZES entry the checkpoint was trained with, None = the one matching its weight shapes.
+    """
+    data = torch.load(ckpt_path, map_location="cpu", mmap=True)
+    state = data["model"] if isinstance(data, dict) and "model" in data else data
+
+    # Everything but the head count can be read off the weight shapes, that comes from MODEL_SIZES
+    config = {
+        "vocab_size": state["fc.weight"].shape[0],
+        "embed_dim": state["token_emb.weight"].shape[1],
+        "hidden_dim": state["transformer.layers.0.linear1.weight"].shape[0],
+        "max_seq_len": state["pos_emb.weight"].shape[0],
+    }
+    config["n_heads"] = MODEL_SIZES[model_size or _match_model_size(config)]["n_heads"]
+    for name in ("embed_dim", "hidden_dim"):
+        if model_size and MODEL_SIZES[model_size][name] != config[name]:
+            raise ValueError(f"{ckpt_path} has {name}={config[name]}, model size '{model_size}' has {MODEL_SIZES[model_size][name]}")
+
+    # Contiguous copies so every tensor is one flat block in the file
+    weights = {name: t.detach().contiguous().clone() for name, t in state.items()}
+
+    # Write to a temp file then rename, so a crash never leaves a half-written model
+    tmp_path = out_path + ".tmp"
+    torch.save({"config": config, "model": weights}, tmp_path)
+    os.replace(tmp_path, out_path)
+
+    size_mb = os.path.getsize(out_path) / 2**20
+    print(f"Exported inference weights -> {out_path} ({size_mb:.1f} MB, config {config})")
+    return out_path
+
+def _match_model_size(config):
+    matches = [name for name, sizes in MODEL_SIZES.items()
+               if sizes["embed_dim"] == config["embed_dim"] and sizes["hidden_dim"] == config["hidden_dim"]]
+    if len(matches) != 1:
+        raise ValueError(f"Can't tell the model size from the weights (embed_dim={config['embed_dim']}, "
+                         f"hidden_dim={config['hidden_dim']}) - pass model_size / --model-size")
+    return matches[0]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a training checkpoint as memory-mappable inference weights")
+    parser.add_argument("--model-size", default=None, choices=list(MODEL_SIZES),
+                        help="default: the size matching the checkpoint's weights")
+    parser.add_argument("--checkpoint", default=None, help="default: models[/draft]/tinyGPT_checkpoint.pt")
+    parser.add_argument("--out", default=None, help="default: next to the checkpoint, tinyGPT_inference.pt")
+    args = parser.parse_args()
+
+    folder = "models" if args.model_size in (None, "base") else f"models/{args.model_size}"
+    ckpt_path = args.checkpoint or f"{folder}/tinyGPT_checkpoint.pt"
+    out_path = args.out or os.path.join(os.path.dirname(ckpt_path), "tinyGPT_inference.pt")
+    export_inference_weights(ckpt_path, out_path, model_size=args.model_size)
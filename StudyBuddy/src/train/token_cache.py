@@ -0,0 +1,236 @@
+# ===================================================================================== #
+#    Token Cache - contians:                                                            #
+#       Streaming Tokenizer -- Document Index -- Token Cache (.bin + .json) -- Loader   #
+#                                                                                       #
+# ===================================================================================== #
+
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import sentencepiece as spm
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from file_utils import file_hash, load_dataset_index
+
+def token_dtype(vocab_size):
+    # 2 bytes per token while the vocab fits (10k today), else 4
+    return np.uint16 if vocab_size <= np.iinfo(np.uint16).max + 1 else np.int32
+
+# ==================================== #
+#       Streaming Tokenization         #
+# ==================================== #
+def iter_corpus_chunks(corpus_path, chunk_chars=4 << 20):
+    """
+    Yields pieces of the corpus of about chunk_chars characters, cut on document boundaries
+    (blank lines, falling back to a newline / space for one giant document).
+    SentencePiece trims and collapses whitespace, so encoding the chunks one by one gives
+    the same IDs as encoding the whole file at once (except a few near-tie segmentations
+    per million tokens, e.g. "▁me t" vs "▁met", which depend on input length either way).
+    """
+    carry = ""
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(chunk_chars)
+            if not block:
+                break
+            buf = carry + block
+
+            cut = -1
+            for sep in ("\n\n", "\n", " "):
+                cut = buf.rfind(sep)
+                if cut > 0:
+                    break
+
+            if cut <= 0:
+                carry = buf     # no boundary at all yet, keep reading
+                continue
+            yield buf[:cut]
+            carry = buf[cut:]
+
+    if carry.strip():
+        yield carry
+
+# Each pool worker loads its own SentencePiece model once
+_worker_sp = None
+
+def _init_worker(sp_model_path):
+    global _worker_sp
+    _worker_sp = spm.SentencePieceProcessor()
+    _worker_sp.load(sp_model_path)
+
+def _encode_chunk(args):
+    text, dtype, doc_sep_id = args
+    if doc_sep_id is None:
+        return np.array(_worker_sp.encode(text, out_type=int), dtype=dtype).tobytes()
+
+    # Packed: every document followed by the separator token
+    # text is a list of documents (cut at the dataset index), or a chunk split on blank lines if there's no index
+    docs = text if isinstance(text, list) else [d for d in text.split("\n\n") if d.strip()]
+    ids = []
+    for doc_ids in _worker_sp.encode(docs, out_type=int):
+        ids.extend(doc_ids)
+        ids.append(doc_sep_id)
+    return np.array(ids, dtype=dtype).tobytes()
+
+def stream_tokenize(corpus_path, sp_model_path, out_path, dtype, jobs=None, chunk_chars=4 << 20, doc_sep_id=None,
+                    doc_offsets=None):
+    """
+    Encodes the corpus chunk by chunk across a process pool and appends the IDs, in order,
+    to a flat binary file. At most 2 chunks per worker are in flight, so peak memory depends
+    on chunk_chars and jobs - not on the corpus size. Returns the number of tokens written.
+    doc_sep_id: if set, documents are encoded separately with this token after each one.
+    doc_offsets: byte offset of every document start (load_document_offsets), else documents are split on blank lines.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    n_tokens = 0
+    itemsize = np.dtype(dtype).itemsize
+
+    if doc_sep_id is not None and doc_offsets is not None:
+        chunks = iter_document_chunks(corpus_path, doc_offsets, chunk_chars)
+    else:
+        chunks = iter_corpus_chunks(corpus_path, chunk_chars)
+
+    with open(out_path, "wb") as out, mp.get_context("spawn").Pool(jobs, _init_worker, (sp_model_path,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_encode_chunk, ((chunk, dtype, doc_sep_id),)))
+
+            # Back-pressure: don't read further ahead than the workers can encode
+            while len(pending) >= 2 * jobs:
+                data = pending.popleft().get()
+                out.write(data)
+                n_tokens += len(data) // itemsize
+
+        while pending:
+            data = pending.popleft().get()
+            out.write(data)
+            n_tokens += len(data) // itemsize
+
+    return n_tokens
+
+# ============================ #
+#       Document Index         #
+# ============================ #
+def load_document_offsets(corpus_path):
+    """
+    Byte offset of every document start from build_final_dataset's index (<name>.docs.bin),
+    None if the corpus has no index or the index is for a different build of it
+    """
+    try:
+        index, offsets = load_dataset_index(corpus_path)
+    except FileNotFoundError:
+        return None
+    if index["size"] != os.path.getsize(corpus_path) or index["n_docs"] == 0:
+        return None
+    return offsets
+
+def iter_document_chunks(corpus_path, doc_offsets, chunk_chars=4 << 20):
+    """
+    Yields lists of whole documents, about chunk_chars bytes per list (one bigger document is yielded alone).
+    Documents are cut at the index's byte offsets - the same boundaries the dataset builder recorded.
+    """
+    bounds = np.append(np.asarray(doc_offsets, dtype=np.int64), os.path.getsize(corpus_path))
+    n_docs = len(bounds) - 1
+    with open(corpus_path, "rb") as f:
+        i = 0
+        while i < n_docs:
+            # Last document that still ends within chunk_chars of this one's start (at least one)
+            j = int(np.searchsorted(bounds, bounds[i] + chunk_chars, side="right")) - 1
+            j = min(max(j, i + 1), n_docs)
+
+            f.seek(int(bounds[i]))
+            block = f.read(int(bounds[j] - bounds[i]))
+            cuts = bounds[i:j + 1] - bounds[i]
+            docs = (block[a:b].decode("utf-8").strip() for a, b in zip(cuts[:-1], cuts[1:]))
+            yield [d for d in docs if d]
+            i = j
+
+# ========================= #
+#       Token Cache         #
+# ========================= #
+def cache_paths(corpus_path, sp_model_path, cache_dir="data/cache", doc_sep_id=None, doc_index=False):
+    """(bin_path, meta_path, key) - the key changes whenever the corpus, the tokenizer or the packing changes"""
+    key = f"{file_hash(corpus_path)}_{file_hash(sp_model_path)[:12]}"
+    if doc_sep_id is not None:
+        key += f"_sep{doc_sep_id}" + ("_docidx" if doc_index else "")
+    name = os.path.splitext(os.path.basename(corpus_path))[0]
+    bin_path = os.path.join(cache_dir, f"{name}_{key}.bin")
+    return bin_path, bin_path[:-4] + ".json", key
+
+def build_token_cache(tokenizer, corpus_path, sp_model_path, bin_path, meta_path, key, jobs=None, doc_sep_id=None,
+                      doc_offsets=None):
+    """Encodes the corpus once (streamed, in parallel) and writes the token IDs as a flat binary array + metadata"""
+    start = time.time()
+    dtype = token_dtype(tokenizer.vocab_size)
+
+    # Write under temp names then rename, so an interrupted run never leaves a half cache
+    os.makedirs(os.path.dirname(bin_path) or ".", exist_ok=True)
+    n_tokens = stream_tokenize(corpus_path, sp_model_path, bin_path + ".tmp", dtype, jobs=jobs, doc_sep_id=doc_sep_id,
+                               doc_offsets=doc_offsets)
+    os.replace(bin_path + ".tmp", bin_path)
+
+    meta = {
+        "key": key,
+        "corpus_path": corpus_path,
+        "dtype": np.dtype(dtype).name,
+        "n_tokens": n_tokens,
+        "vocab_size": tokenizer.vocab_size,
+        "doc_sep_id": doc_sep_id,
+        "doc_boundaries": None if doc_sep_id is None else ("index" if doc_offsets is not None else "blank_lines"),
+    }
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    print(f"Tokenized {n_tokens:,} tokens in {time.time() - start:.1f}s -> {bin_path}")
+    return meta
+
+def load_token_cache(bin_path, meta_path):
+    """Read-only memory map of the cached token IDs (nothing is read until it's indexed)"""
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return np.memmap(bin_path, dtype=meta["dtype"], mode="r", shape=(meta["n_tokens"],))
+
+def load_pretokenized(bin_path, sp_model_path):
+    """
+    Token IDs written ahead of time in the cache format (<name>.bin + <name>.json, e.g.
+    prepare_conversational_data.py --bin), checked against the tokenizer the model trains with
+    """
+    meta_path = os.path.splitext(bin_path)[0] + ".json"
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"No metadata for pre-tokenized corpus: {meta_path}")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    sp_hash = meta.get("sp_model_hash")
+    if sp_hash is not None and sp_hash != file_hash(sp_model_path):
+        raise ValueError(f"{bin_path} was encoded with a different tokenizer than {sp_model_path} - re-run the encoding")
+    print(f"Using pre-tokenized corpus: {bin_path} ({meta['n_tokens']:,} tokens)")
+    return load_token_cache(bin_path, meta_path)
+
+def get_token_ids(tokenizer, corpus_path, sp_model_path, cache_dir="data/cache", jobs=None, doc_sep_id=None):
+    """
+    Memory-mapped token IDs for the corpus, encoding it only if no valid cache exists.
+    Packed (doc_sep_id set): documents are the ones in the corpus' dataset index when it has one.
+    A .bin corpus is already tokenized (load_pretokenized) and used as it is.
+    """
+    if corpus_path.endswith(".bin"):
+        return load_pretokenized(corpus_path, sp_model_path)
+
+    doc_offsets = load_document_offsets(corpus_path) if doc_sep_id is not None else None
+    bin_path, meta_path, key = cache_paths(corpus_path, sp_model_path, cache_dir, doc_sep_id, doc_offsets is not None)
+
+    if os.path.exists(bin_path) and os.path.exists(meta_path):
+        print(f"Using token cache: {bin_path}")
+    else:
+        print(f"No token cache for this corpus/tokenizer - encoding {corpus_path}")
+        build_token_cache(tokenizer, corpus_path, sp_model_path, bin_path, meta_path, key, jobs=jobs,
+                          doc_sep_id=doc_sep_id, doc_offsets=doc_offsets)
+
+    return load_token_cache(bin_path, meta_path)
@@ -0,0 +1,120 @@
+# ===================================================================================== #
+#    Train Metrics - contians:                                                          #
+#       Step Timer -- Metrics Log (.jsonl / .csv) -- Profiler Window                    #
+#                                                                                       #
+# ===================================================================================== #
+
+import contextlib
+import csv
+import json
+import os
+import time
+
+import torch
+
+# ====================== #
+#       Step Timer       #
+# ====================== #
+class StepTimer:
+    """
+    Collects the wall time of named phases (forward / backward / optimizer) and extra values
+    (grad norm) for one training step. Phases that repeat (gradient accumulation) add up.
+    On CUDA it synchronizes at every phase edge, otherwise the times would only measure kernel launches.
+    """
+    def __init__(self, device=None):
+        self.cuda = device is not None and torch.device(device).type == "cuda"
+        self.values = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.cuda:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.cuda:
+                torch.cuda.synchronize()
+            key = f"{name}_s"
+            self.values[key] = self.values.get(key, 0.0) + time.perf_counter() - start
+
+    def record(self, name, value):
+        self.values[name] = value.item() if torch.is_tensor(value) else value
+
+    def pop(self):
+        """Values of the step that just finished, and start fresh for the next one"""
+        values, self.values = self.values, {}
+        return values
+
+# ========================= #
+#       Metrics Log         #
+# ========================= #
+class MetricsLog:
+    """
+    Appends one record (dict) per training step to a .jsonl or .csv file.
+    CSV columns are fixed by the first record - later keys missing from it are dropped.
+    """
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.is_csv = path.endswith(".csv")
+        self.file = open(path, "a", encoding="utf-8", newline="")
+        self.writer = None
+
+    def write(self, record):
+        if not self.is_csv:
+            self.file.write(json.dumps(record) + "\n")
+            return
+
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(record), extrasaction="ignore")
+            if self.file.tell() == 0:
+                self.writer.writeheader()
+        self.writer.writerow(record)
+
+    def close(self):
+        self.file.close()
+
+# =========================== #
+#       Profiler Window       #
+# =========================== #
+class ProfilerWindow:
+    """
+    Runs torch.profiler for the global steps [start, end) only and writes a Chrome trace
+    (open in chrome://tracing or https://ui.perfetto.dev) - profiling every step would slow the whole run.
+    Call step(global_step) once before each training step.
+    """
+    def __init__(self, start, end, out_dir="logs/profile", rank=0):
+        self.start = start
+        self.end = end
+        self.out_dir = out_dir
+        self.rank = rank
+        self.profiler = None
+        self.trace_path = None
+
+    def step(self, global_step):
+        """Returns the profiler's summary table on the step the window closes, else None"""
+        if self.profiler is None and self.start <= global_step < self.end:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self.profiler = torch.profiler.profile(activities=activities, record_shapes=True)
+            self.profiler.__enter__()
+
+        elif self.profiler is not None and global_step >= self.end:
+            return self.stop()
+        return None
+
+    def stop(self):
+        """Ends the capture early (e.g. training finished inside the window) and writes the trace"""
+        if self.profiler is None:
+            return None
+        self.profiler.__exit__(None, None, None)
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.trace_path = os.path.join(self.out_dir, f"trace_rank{self.rank}_steps{self.start}-{self.end}.json")
+        self.profiler.export_chrome_trace(self.trace_path)
+
+        summary = self.profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=15)
+        self.profiler = None
+        return summary
@@ -4,6 +4,8 @@
 #                                                                                       #
 # ===================================================================================== #
 
+import argparse
+import contextlib
 import os
 import re
 import sys
@@ -15,10 +17,17 @@ import numpy as np
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
 from torch import nn
-from torch.utils.data import Dataset, DataLoader
+from torch.nn.parallel import DistributedDataParallel as DDP
+from torch.utils.data import Dataset, DataLoader, DistributedSampler
 
-from ai_engine import SentencePieceTokenizer, TinyGPT
+from ai_engine import MODEL_SIZES, SentencePieceTokenizer, TinyGPT
+from checkpoint_manager import CheckpointManager, atomic_save, list_checkpoints
+from evaluate import evaluate, split_token_ids
+from token_cache import get_token_ids
+from train_metrics import MetricsLog, ProfilerWindow, StepTimer
 
 # =========================== #
 #       Load the dataset      #
@@ -36,8 +45,8 @@ def save_checkpoint(model, optimizer, epoch, global_step, folder="models"):
     os.makedirs(folder, exist_ok=True)
     ckpt_path = f"{folder}/tinyGPT_checkpoint.pt"
 
-    # saves model
-    torch.save({
+    # saves model (temp file + rename, a crash mid-write leaves the previous checkpoint intact)
+    atomic_save({
         "model": model.state_dict(),
         "optimizer": optimizer.state_dict(),
         "epoch": epoch,
@@ -54,17 +63,26 @@ def save_checkpoint(model, optimizer, epoch, global_step, folder="models"):
 #       Training Load Point       #
 # =============================== #
 def load_checkpoint(model, optimizer, folder="models"):
-    # Build checkpoint path
-    ckpt_path = f"{folder}/tinyGPT_checkpoint.pt"
+    # Newest first: the latest checkpoint, then the kept step checkpoints (CheckpointManager)
+    candidates = [f"{folder}/tinyGPT_checkpoint.pt"] + list_checkpoints(folder)
+    candidates = [path for path in candidates if os.path.exists(path)]
 
     # Check if file exists
-    if not os.path.exists(ckpt_path):
+    if not candidates:
         print("No checkpoint found - starting from scratch.")
         return model, optimizer, 0, 0   # epoch, global_step
-    else: print(f"Loading checkpoint from {ckpt_path}")
 
-    # Load model from checkpoint path
-    data = torch.load(ckpt_path, map_location="cpu")
+    # Load model from checkpoint path (falls back to an older one if a file is unreadable)
+    data = None
+    for ckpt_path in candidates:
+        print(f"Loading checkpoint from {ckpt_path}")
+        try:
+            data = torch.load(ckpt_path, map_location="cpu")
+            break
+        except Exception as e:
+            print(f"Could not read {ckpt_path} ({e}) - trying an older checkpoint")
+    if data is None:
+        raise RuntimeError(f"No readable checkpoint in {folder}")
 
     # Restore model and optimizer state
     model.load_state_dict(data["model"])
@@ -83,38 +101,154 @@ def load_checkpoint(model, optimizer, folder="models"):
 # ======================================================= #
 #       Builds Vocab and Trains to Predict Next Char      #
 # ======================================================= #
+SAMPLING_MODES = ("sliding", "stride", "random", "packed")
+
 class TextDataset(Dataset):
-    def __init__(self, tokenizer, text, seq_len=200, max_samples = 500_000):
+    """
+    Windows of seq_len tokens (+1 shifted target) over the token array.
+    sampling:
+        sliding - start at every token (stride 1), first max_samples windows only
+        stride  - start every `stride` tokens (default seq_len = no overlap) across the whole array
+        random  - max_samples windows at random offsets anywhere in the array, new ones every epoch
+        packed  - like stride=seq_len, meant for IDs from the packed cache (separator token between documents)
+    """
+    def __init__(self, tokenizer, text=None, seq_len=200, max_samples = 500_000, ids=None, sampling="sliding", stride=None):
+        """Pass raw `text` to encode here, or already encoded `ids` (e.g. the memory-mapped token cache)"""
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling '{sampling}', expected one of {SAMPLING_MODES}")
 
         self.seq_len = seq_len
         self.tokenizer = tokenizer
+        self.max_samples = max_samples
+        self.sampling = sampling
+        self.stride = 1 if sampling == "sliding" else (stride or seq_len)
 
         # Encode entire text once into subwords
-        ids = tokenizer.sp.encode(text, out_type=int)
+        if ids is None:
+            ids = np.array(tokenizer.sp.encode(text, out_type=int), dtype=np.int32)
 
-        max_i = min(len(ids) - seq_len - 1, max_samples)
+        self.ids = ids
 
-        # Converr to a numpy array
-        ids_np = np.array(ids, dtype=np.int32)
+        # Last valid start so the +1 target still fits
+        self.max_start = len(ids) - seq_len - 1
+        if self.max_start < 0:
+            raise ValueError(f"Corpus has {len(ids)} tokens, need more than seq_len + 1 = {seq_len + 1}")
 
-        # Preallocate arrays for input + targets
-        self.inputs = np.lib.stride_tricks.sliding_window_view(
-            ids_np, window_shape=seq_len
-        )[:max_i]
+    # DataLoader workers re-open the memmap instead of receiving a pickled copy of every token
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if isinstance(self.ids, np.memmap):
+            state["ids"] = (self.ids.filename, self.ids.dtype.str, self.ids.shape)
+        return state
 
-        self.targets = np.lib.stride_tricks.sliding_window_view(
-            ids_np[1:], window_shape=seq_len
-        )[:max_i]
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if isinstance(self.ids, tuple):
+            filename, dtype, shape = self.ids
+            self.ids = np.memmap(filename, dtype=dtype, mode="r", shape=shape)
 
     def __len__(self):
-        return len(self.inputs)
-
+        if self.sampling == "random":
+            return self.max_samples
+        return min(self.max_start // self.stride + 1, self.max_samples)
 
     def __getitem__(self, idx):
-        x = torch.from_numpy(self.inputs[idx]).long()
-        y = torch.from_numpy(self.targets[idx]).long()
+        if self.sampling == "random":
+            # torch RNG: seeded by torch.manual_seed, different per DataLoader worker and per epoch
+            start = int(torch.randint(0, self.max_start + 1, ()))
+        else:
+            start = idx * self.stride
+
+        chunk = self.ids[start:start + self.seq_len + 1].astype(np.int64)
+        x = torch.from_numpy(chunk[:-1])
+        y = torch.from_numpy(chunk[1:])
         return x, y
 
+    def tokens_covered(self):
+        """Expected number of distinct corpus tokens one epoch reads (as inputs or targets)"""
+        n = len(self.ids)
+        window = self.seq_len + 1
+        if self.sampling == "random":
+            # each token is missed by a window with probability 1 - window/n
+            return int(n * (1 - (1 - window / n) ** len(self)))
+        if self.stride < window:
+            # consecutive windows touch or overlap -> one contiguous span
+            return min(n, (len(self) - 1) * self.stride + window)
+        return len(self) * window
+
+
+# ============================== #
+#       Distributed Training     #
+# ============================== #
+def init_distributed(rank, world_size):
+    """Joins the gloo process group (CPU) and gives each process its share of the cores"""
+    os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+    os.environ.setdefault("MASTER_PORT", "29500")
+    dist.init_process_group("gloo", rank=rank, world_size=world_size)
+
+    # Without this every process starts one thread per core and they fight over them
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // world_size))
+
+def _ddp_worker(rank, world_size, settings):
+    # Entry point of each process started by mp.spawn
+    init_distributed(rank, world_size)
+    try:
+        _train(rank=rank, world_size=world_size, **settings)
+    finally:
+        dist.destroy_process_group()
+
+# ======================== #
+#       Training Step      #
+# ======================== #
+TRAIN_PRECISIONS = ("fp32", "bf16")
+
+def train_step(model, optimizer, loss_fn, micro_batches, precision="fp32", timer=None):
+    """
+    One optimizer step over a list of (x, y) micro-batches - gradient accumulation: the effective
+    batch is all of them, but only one micro-batch of activations is alive at a time.
+    precision="bf16" runs the forward pass under bf16 autocast (weights + optimizer stay fp32).
+    timer: optional StepTimer, gets forward / backward / optimizer time and the grad norm.
+    Returns the mean loss as a tensor - no .item(), so nothing waits on it here.
+    """
+    phase = timer.phase if timer is not None else (lambda name: contextlib.nullcontext())
+
+    # Zero previous gradients
+    with phase("optimizer"):
+        optimizer.zero_grad(set_to_none=True)
+
+    total_loss = 0.0
+    for i, (x, y) in enumerate(micro_batches):
+        # DDP: skip the gradient all-reduce on all but the last micro-batch
+        no_sync = getattr(model, "no_sync", None)
+        sync_context = no_sync() if no_sync is not None and i < len(micro_batches) - 1 else contextlib.nullcontext()
+
+        with sync_context:
+            # Forward pass
+            with phase("forward"), torch.autocast(x.device.type, dtype=torch.bfloat16, enabled=precision == "bf16"):
+                logits = model(x)      # (batch, seq, vocab)
+
+                # Flatten logits + target for loss calculation
+                batch_size_now, seq_len_now, vocab_now = logits.shape
+                logits_flat = logits.reshape(-1, vocab_now)    # (batch*seq, vocab)
+                y_flat = y.reshape(-1)
+
+                # Compute the loss (scaled so the accumulated gradient is the mean over all micro-batches)
+                loss = loss_fn(logits_flat.float(), y_flat) / len(micro_batches)
+
+            # Backpropagation (under DDP the gradients are all-reduced + averaged across processes here)
+            with phase("backward"):
+                loss.backward()
+        total_loss += loss.detach()
+
+    with phase("optimizer"):
+        # Clips gradients (returns the norm before clipping)
+        grad_norm = torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+
+        optimizer.step()
+
+    if timer is not None:
+        timer.record("grad_norm", grad_norm)
+    return total_loss
 
 # ======================= #
 #       Train Model       #
@@ -125,52 +259,129 @@ def train_model(corpus_path= "data/processed/final_dataset.txt",
                 epochs=2,
                 lr=5e-4,
                 max_samples=500_000,
-                checkpoint_folder="models"):
-    """Main training loop for TinyTransformer"""
-    # 1. Load text
-    print(f"Loading corpus from: {corpus_path}")
-    text = load_corpus(corpus_path)
-    tokenizer = SentencePieceTokenizer("models/studybuddy_sp.model")
+                checkpoint_folder="models",
+                token_cache_dir="data/cache",
+                tokenize_jobs=None,
+                sampling="sliding",
+                stride=None,
+                num_workers=4,
+                precision="fp32",
+                accum_steps=1,
+                compile_model=False,
+                log_every=100,
+                metrics_path=None,
+                profile_steps=None,
+                profile_dir="logs/profile",
+                save_every=2000,
+                save_every_seconds=None,
+                keep_checkpoints=3,
+                eval_frac=0.01,
+                eval_every=1000,
+                eval_batch_size=64,
+                eval_max_tokens=200_000,
+                model_size="base",
+                world_size=1):
+    """
+    Main training loop for TinyTransformer
+    world_size > 1: data-parallel training on CPU, one process per replica (gloo backend).
+    batch_size is per process and per micro-batch, so one optimizer step sees
+    batch_size * accum_steps * world_size samples.
+    precision: "fp32" or "bf16" (autocast), compile_model: torch.compile the model,
+    log_every: optimizer steps between loss read-backs / progress prints.
+    metrics_path: .jsonl or .csv file for per-step metrics (data wait, forward/backward/optimizer
+    time, tokens/sec, lr, grad norm, loss). Reads the loss back every step, free on CPU.
+    profile_steps: (start, end) global steps to capture with torch.profiler, trace goes to profile_dir.
+    save_every / save_every_seconds: checkpoint interval in steps and/or seconds (written in the
+    background, the last keep_checkpoints are kept).
+    eval_frac: tail of the token stream held out for evaluation (0 = no eval). Loss/perplexity on it
+    every eval_every steps and at the end, on at most eval_max_tokens tokens.
+    model_size: layer sizes from ai_engine.MODEL_SIZES ("draft" = the small speculative decoding draft,
+    give it its own checkpoint_folder, e.g. models/draft).
+    """
+    if precision not in TRAIN_PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {TRAIN_PRECISIONS}")
+
+    settings = dict(locals())
+    del settings["world_size"]
+
+    if world_size > 1:
+        mp.spawn(_ddp_worker, args=(world_size, settings), nprocs=world_size, join=True)
+    else:
+        _train(rank=0, world_size=1, **settings)
+
+def _train(rank, world_size, corpus_path, seq_len, batch_size, epochs, lr, max_samples,
+           checkpoint_folder, token_cache_dir, tokenize_jobs, sampling, stride, num_workers,
+           precision, accum_steps, compile_model, log_every, metrics_path, profile_steps, profile_dir,
+           save_every, save_every_seconds, keep_checkpoints,
+           eval_frac, eval_every, eval_batch_size, eval_max_tokens, model_size):
+    distributed = world_size > 1
+    is_main = rank == 0
+    log = print if is_main else (lambda *args, **kwargs: None)
+
+    # 1. Load tokenizer + token IDs (encoded once, then memory-mapped from the cache on every later run)
+    log(f"Loading corpus from: {corpus_path}")
+    sp_model_path = "models/studybuddy_sp.model"
+    tokenizer = SentencePieceTokenizer(sp_model_path)
+    # "packed" reads a cache with </s> after every document
+    doc_sep_id = tokenizer.sp.eos_id() if sampling == "packed" else None
+
+    # Rank 0 builds the token cache if it's missing, the others wait and map the finished file
+    if distributed and not is_main:
+        dist.barrier()
+    ids = get_token_ids(tokenizer, corpus_path, sp_model_path, cache_dir=token_cache_dir,
+                        jobs=tokenize_jobs, doc_sep_id=doc_sep_id)
+    if distributed and is_main:
+        dist.barrier()
 
     # Sanity-check tokenizer
-    sample = text[:200]
-    encoded = tokenizer.encode(sample)[:50]  # show first 50 tokens
-    decoded = tokenizer.decode(encoded)
-
-
-    print("\n--- Tokenizer Sanity Check ---")
-    print("Sample text:", sample[:100].replace("\n"," "))
-    print("Encoded IDs:", encoded)
-    print("Decoded text:", decoded)
-    print("-------------------------------\n")
-
-    # 2. Build dataset from string to tensors
-
-    dataset = TextDataset(tokenizer, text, seq_len=seq_len, max_samples=max_samples)
+    if is_main:
+        if corpus_path.endswith(".bin"):
+            # Pre-tokenized corpus: no text to sample, show its first IDs
+            sample = tokenizer.decode([int(i) for i in ids[:50]])
+        else:
+            with open(corpus_path, "r", encoding="utf-8") as f:
+                sample = f.read(200)
+        encoded = tokenizer.encode(sample)[:50]  # show first 50 tokens
+        decoded = tokenizer.decode(encoded)
+
+
+        print("\n--- Tokenizer Sanity Check ---")
+        print("Sample text:", sample[:100].replace("\n"," "))
+        print("Encoded IDs:", encoded)
+        print("Decoded text:", decoded)
+        print("-------------------------------\n")
+
+    # 2. Build dataset from token IDs to tensors (minus the held-out tail used for evaluation)
+    train_ids, eval_ids = split_token_ids(ids, eval_frac, seq_len)
+
+    dataset = TextDataset(tokenizer, ids=train_ids, seq_len=seq_len, max_samples=max_samples,
+                          sampling=sampling, stride=stride)
     vocab_size = tokenizer.vocab_size
 
-    print(f"Vocab Size: {vocab_size}")
-    print(f"Training samples: {len(dataset)}")
+    log(f"Vocab Size: {vocab_size}")
+    log(f"Training samples: {len(dataset)} ({sampling})")
+    log(f"Corpus tokens covered per epoch: {dataset.tokens_covered():,} / {len(train_ids):,}")
+    log(f"Held-out eval tokens: {len(eval_ids):,}")
 
-    # 3. initialize Dataloader
+    # 3. initialize Dataloader (each process gets its own 1/world_size shard of every epoch)
+    sampler = DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=True) if distributed else None
     loader = DataLoader(dataset,
                         batch_size=batch_size,
-                        shuffle=True,
-                        num_workers=4,      # uses multiple CPU threads
+                        shuffle=sampler is None,
+                        sampler=sampler,
+                        num_workers=num_workers,      # uses multiple CPU threads
                         pin_memory=True,    # speeds host-to-device transfer
-                        persistent_workers=True
+                        persistent_workers=num_workers > 0
                     )
 
-    # Device (CPU or GPU)
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using device → {device}")
+    # Device (CPU or GPU) - distributed mode is CPU only (gloo)
+    device = torch.device("cuda" if torch.cuda.is_available() and not distributed else "cpu")
+    log(f"Using device → {device}" + (f" x {world_size} processes" if distributed else ""))
 
     # 4. Create a model and putting it on the target device
     model = TinyGPT(vocab_size=vocab_size,
-                    embed_dim=128,
-                    n_heads=4,
-                    hidden_dim=256,
-                    max_seq_len=seq_len)
+                    max_seq_len=seq_len,
+                    **MODEL_SIZES[model_size])
     model.to(device)
 
 
@@ -178,81 +389,206 @@ def train_model(corpus_path= "data/processed/final_dataset.txt",
     # 5. create optimizer
     optimizer = torch.optim.Adam(model.parameters(), lr=lr)
 
-    # Resume checkpoint training if checkpoint available
+    # Resume checkpoint training if checkpoint available (every rank loads the same file)
     model, optimizer, start_epoch, global_step = load_checkpoint(model, optimizer, folder=checkpoint_folder)
 
+    # Wrap after loading: DDP broadcasts rank 0's weights so all replicas start identical.
+    # Checkpoints are saved from the unwrapped model, so their keys stay the same as single-process ones
+    raw_model = model
+    if distributed:
+        model = DDP(model)
+    if compile_model:
+        # Compiled on first step (slow once), later steps reuse the generated kernels
+        model = torch.compile(model)
+
     # Create loss function
     loss_fn = nn.CrossEntropyLoss()
 
-    save_every = 2000
+    # Per-step metrics + profiler window (rank 0 only)
+    metrics = MetricsLog(metrics_path) if metrics_path and is_main else None
+    timer = StepTimer(device) if metrics is not None else None
+    profiler = ProfilerWindow(*profile_steps, out_dir=profile_dir, rank=rank) if profile_steps and is_main else None
+
+    # Background checkpoint writer (rank 0 only, all ranks hold the same weights)
+    checkpoints = CheckpointManager(folder=checkpoint_folder, keep_last=keep_checkpoints,
+                                    every_steps=save_every, every_seconds=save_every_seconds) if is_main else None
+
+    # Held-out evaluation (rank 0, on the unwrapped model - no DDP hooks, no compile)
+    last_eval = {"step": None, "result": {}}
+
+    def run_eval(step):
+        if not is_main or len(eval_ids) == 0:
+            return {}
+        if last_eval["step"] == step:      # final eval right after an interval eval
+            return last_eval["result"]
+        result = evaluate(raw_model, eval_ids, seq_len, batch_size=eval_batch_size,
+                          max_tokens=eval_max_tokens, precision=precision, device=device)
+        if result is None:
+            return {}
+        result = {k: round(v, 5) if isinstance(v, float) else v for k, v in result.items()}
+        last_eval.update(step=step, result=result)
+        log(f"Eval | Step {step} | Loss: {result['eval_loss']:.4f} | Perplexity: {result['eval_ppl']:.2f} | "
+            f"{result['eval_tokens']:,} tokens in {result['eval_s']:.1f}s")
+        return result
+
+    # Every step record carries the eval columns (empty between evals) so CSV headers include them
+    no_eval = {"eval_loss": None, "eval_ppl": None} if len(eval_ids) else {}
+
     # 6. Training loop
     model.train()
     total_start_time = time.time()
     for epoch in range(start_epoch, epochs):
+        if sampler is not None:
+            sampler.set_epoch(epoch)    # new shuffle every epoch, same on all ranks
         epoch_start_time = time.time()
-        total_loss = 0.0
+        running_loss = torch.zeros((), device=device)     # summed on the device, read back every log_every steps
+        epoch_steps = 0
+        micro_batches = []
+        data_wait_total = step_time_total = 0.0
 
-        pbar = tqdm(loader, desc=f"Epoch {epoch+1}")
+        pbar = tqdm(loader, desc=f"Epoch {epoch+1}", disable=not is_main)
 
+        data_start = time.perf_counter()
         for batch_idx, (x, y) in enumerate(pbar):
             # put data to target device
-            x = x.to(device)
-            y = y.to(device)
-
-            # Zero previous gradients
-            optimizer.zero_grad()
-
-            # Forward pass
-            logits = model(x)      # (batch, seq, vocab)
-
-            # Flatten logits + target for loss calculation
-            batch_size_now, seq_len_now, vocab_now = logits.shape
-            logits_flat = logits.reshape(-1, vocab_now)    # (batch*seq, vocab)
-            y_flat = y.reshape(-1)
-
-            # Compute the loss
-            loss = loss_fn(logits_flat, y_flat)
-            # Backpropagation
-            loss.backward()
-
-            # Clips gradients
-            torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
-
-            optimizer.step()
-
-            total_loss += loss.item()
-            avg = total_loss / (batch_idx + 1)
+            micro_batches.append((x.to(device), y.to(device)))
+
+            # Step once accum_steps micro-batches are in (or with whatever is left at the end of the epoch)
+            if len(micro_batches) < accum_steps and batch_idx + 1 < len(loader):
+                continue
+
+            if profiler is not None:
+                summary = profiler.step(global_step)
+                if summary:
+                    log(summary + f"\nProfiler trace -> {profiler.trace_path}")
+
+            compute_start = time.perf_counter()
+            loss = train_step(model, optimizer, loss_fn, micro_batches, precision, timer)
+            step_tokens = sum(x.numel() for x, _ in micro_batches) * world_size
+            micro_batches = []
+            running_loss += loss
+            epoch_steps += 1
+            global_step += 1
 
-            pbar.set_postfix({"Loss": f"{avg:.4f}"})
+            step_end = time.perf_counter()
+
+            eval_result = run_eval(global_step) if eval_every and global_step % eval_every == 0 else {}
+
+            if metrics is not None:
+                data_wait = compute_start - data_start
+                data_wait_total += data_wait
+                step_time_total += step_end - data_start
+                metrics.write({
+                    "step": global_step,
+                    "epoch": epoch + 1,
+                    "loss": round(loss.item(), 5),
+                    "data_wait_s": round(data_wait, 6),
+                    **{k: round(v, 6) for k, v in timer.pop().items()},
+                    "step_s": round(step_end - data_start, 6),
+                    "tokens_per_sec": round(step_tokens / (step_end - data_start), 1),
+                    "lr": optimizer.param_groups[0]["lr"],
+                    **no_eval,
+                    **{k: eval_result[k] for k in no_eval if k in eval_result},
+                })
+
+            # .item() waits for every queued op, so the loss is only read back every log_every steps
+            if epoch_steps % log_every == 0:
+                avg = running_loss.item() / epoch_steps
+                pbar.set_postfix({"Loss": f"{avg:.4f}"})
 
-            # Show progress every 100 batches
-            if (batch_idx + 1) % 100 == 0:
                 elapsed = time.time() - epoch_start_time
                 elapsed_min = int(elapsed / 60)
                 elapsed_sec = int(elapsed % 60)
-                print(f"Epoch {epoch+1} | Step {batch_idx+1} | Avg Loss: {avg:.4f} | Elapsed Time: {elapsed_min:.0f} min, {elapsed_sec} sec")
+                log(f"Epoch {epoch+1} | Step {epoch_steps} | Avg Loss: {avg:.4f} | Elapsed Time: {elapsed_min:.0f} min, {elapsed_sec} sec")
 
-            global_step += 1
-            if global_step % save_every == 0:
-                save_checkpoint(model, optimizer, epoch, global_step, folder=checkpoint_folder)
+            if checkpoints is not None:
+                checkpoints.maybe_save(raw_model, optimizer, epoch, global_step)
+
+            data_start = time.perf_counter()
 
-        epoch_loss = total_loss / max(1, (batch_idx+1))
+        if metrics is not None and step_time_total > 0:
+            # High share = the DataLoader can't keep up (more num_workers), low = compute bound
+            log(f"Epoch {epoch+1} | waiting on data {data_wait_total / step_time_total:.1%} of step time")
+
+        epoch_loss = running_loss.item() / max(1, epoch_steps)
+        if distributed:
+            # average of every rank's epoch loss
+            loss_t = torch.tensor([epoch_loss])
+            dist.all_reduce(loss_t)
+            epoch_loss = loss_t.item() / world_size
         total_time = time.time() - total_start_time
         total_time_min = int(total_time / 60)
         total_time_sec = int(total_time % 60)
-        print(f"Epoch {epoch+1} finished | Avg Loss: {epoch_loss:.4f} | Total Time: {total_time_min:.0f} min, {total_time_sec} sec")
+        log(f"Epoch {epoch+1} finished | Avg Loss: {epoch_loss:.4f} | Total Time: {total_time_min:.0f} min, {total_time_sec} sec")
+
+    if checkpoints is not None:
+        checkpoints.close()     # let the last background write finish
+
+    # Final evaluation
+    already_logged = last_eval["step"] == global_step
+    final_eval = run_eval(global_step)
+    if metrics is not None and final_eval and not already_logged:
+        metrics.write({"step": global_step, "epoch": epochs, **{k: final_eval[k] for k in no_eval}})
+
+    if profiler is not None:
+        summary = profiler.stop()   # training ended inside the window
+        if summary:
+            log(summary + f"\nProfiler trace -> {profiler.trace_path}")
+    if metrics is not None:
+        metrics.close()
+        log(f"Step metrics -> {metrics_path}")
+
+    if not is_main:
+        return
 
     # 7. Final Save of Model + tokenizer
-    os.makedirs("models", exist_ok=True)
+    os.makedirs(checkpoint_folder, exist_ok=True)
 
     # saves model
-    model_path = "models/tinyGPT.pt"
-    torch.save(model.state_dict(), model_path)
-
-    # saves vocabulary
-    shutil.copy("models/studybuddy_sp.model", "models/studybuddy_sp.model")
+    model_path = f"{checkpoint_folder}/tinyGPT.pt"
+    torch.save(raw_model.state_dict(), model_path)
 
     print(f"Saved model -> {model_path}")
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train TinyGPT on the StudyBuddy corpus")
+    parser.add_argument("--corpus", default="data/processed/final_dataset.txt",
+                        help="text corpus, or a pre-tokenized .bin (+ .json), e.g. from prepare_conversational_data.py --bin")
+    parser.add_argument("--world-size", type=int, default=1, help="data-parallel CPU processes")
+    parser.add_argument("--sampling", default="sliding", choices=SAMPLING_MODES)
+    parser.add_argument("--stride", type=int, default=None, help="tokens between window starts for --sampling stride (default: seq len)")
+    parser.add_argument("--max-samples", type=int, default=500_000, help="windows per epoch (sliding / random)")
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=32, help="per micro-batch")
+    parser.add_argument("--accum-steps", type=int, default=1, help="micro-batches per optimizer step")
+    parser.add_argument("--lr", type=float, default=5e-4)
+    parser.add_argument("--num-workers", type=int, default=4, help="DataLoader workers")
+    parser.add_argument("--tokenize-jobs", type=int, default=None, help="processes encoding the corpus (default: all cores)")
+    parser.add_argument("--precision", default="fp32", choices=TRAIN_PRECISIONS)
+    parser.add_argument("--compile", action="store_true", help="torch.compile the model")
+    parser.add_argument("--metrics", default=None, help="per-step metrics file (.jsonl or .csv)")
+    parser.add_argument("--profile-steps", type=int, nargs=2, default=None, metavar=("START", "END"),
+                        help="global steps to capture with torch.profiler, e.g. 100 120")
+    parser.add_argument("--log-every", type=int, default=100, help="optimizer steps between loss prints")
+    parser.add_argument("--save-every", type=int, default=2000, help="optimizer steps between checkpoints")
+    parser.add_argument("--save-every-seconds", type=float, default=None, help="also checkpoint every N seconds")
+    parser.add_argument("--keep-checkpoints", type=int, default=3, help="newest checkpoints kept on disk")
+    parser.add_argument("--eval-frac", type=float, default=0.01, help="tail of the tokens held out for evaluation (0 = off)")
+    parser.add_argument("--eval-every", type=int, default=1000, help="optimizer steps between evaluations")
+    parser.add_argument("--eval-max-tokens", type=int, default=200_000, help="held-out tokens scored per evaluation")
+    parser.add_argument("--model-size", default="base", choices=list(MODEL_SIZES),
+                        help="draft = small model for speculative decoding")
+    parser.add_argument("--checkpoint-folder", default=None,
+                        help="checkpoints + final tinyGPT.pt (default: models, models/draft for --model-size draft)")
+    args = parser.parse_args()
+    checkpoint_folder = args.checkpoint_folder or ("models" if args.model_size == "base" else f"models/{args.model_size}")
+
+    train_model(corpus_path=args.corpus, epochs=args.epochs, batch_size=args.batch_size, lr=args.lr,
+                max_samples=args.max_samples, sampling=args.sampling, stride=args.stride,
+                num_workers=args.num_workers, tokenize_jobs=args.tokenize_jobs,
+                precision=args.precision, accum_steps=args.accum_steps, compile_model=args.compile,
+                log_every=args.log_every, metrics_path=args.metrics, profile_steps=args.profile_steps,
+                save_every=args.save_every, save_every_seconds=args.save_every_seconds,
+                keep_checkpoints=args.keep_checkpoints, eval_frac=args.eval_frac, eval_every=args.eval_every,
+                eval_max_tokens=args.eval_max_tokens, model_size=args.model_size,
+                checkpoint_folder=checkpoint_folder, world_size=args.world_size)
@@ -1,36 +1,114 @@
 import os
+import sys
+import json
+import time
+import argparse
 import sentencepiece as spm
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from file_utils import file_hash
+
 # 1. Path to training corpus
 CORPUS_PATH = "data/processed/final_dataset.txt"
 
 # 2. where to save the tokenizer files
-MODEL_PREFIX = "studybuddy_sp"          # will create studybuddy_sp.model / .vocab
+MODEL_PREFIX = "models/studybuddy_sp"   # will create studybuddy_sp.model / .vocab / .json
 VOCAB_SIZE = 10000
 
-def main():
-    if not os.path.exists(CORPUS_PATH):
-        raise FileNotFoundError(f"Corpus not found at: {CORPUS_PATH}")
+# 3. Sampling: SentencePiece trains on at most this many (randomly picked) lines, 0 = all of them
+INPUT_SENTENCE_SIZE = 1_000_000
+SEED = 0
+
+def tokenizer_settings(vocab_size=VOCAB_SIZE, input_sentence_size=INPUT_SENTENCE_SIZE, seed=SEED):
+    # Everything that changes the trained model (the thread count doesn't)
+    return {
+        "vocab_size": vocab_size,
+        "character_coverage": 1.0,      # includes all unicode for math symbols
+        "model_type": "unigram",        # works best for math/STEM fields
+        "input_sentence_size": input_sentence_size,
+        "seed": seed,
+    }
+
+def train_tokenizer(corpus_path=CORPUS_PATH, model_prefix=MODEL_PREFIX, vocab_size=VOCAB_SIZE,
+                    input_sentence_size=INPUT_SENTENCE_SIZE, num_threads=None, seed=SEED, force=False):
+    """
+    Build mode: trains <model_prefix>.model / .vocab, unless the existing model was trained on a corpus
+    with the same content hash and the same settings (recorded in <model_prefix>.json) - then it's reused.
+    Large corpora are sampled down to input_sentence_size lines, training runs on num_threads threads.
+    Returns the metadata dict.
+    """
+    if not os.path.exists(corpus_path):
+        raise FileNotFoundError(f"Corpus not found at: {corpus_path}")
+
+    model_file, vocab_file, meta_file = (model_prefix + ext for ext in (".model", ".vocab", ".json"))
+    settings = tokenizer_settings(vocab_size, input_sentence_size, seed)
+    corpus_hash = file_hash(corpus_path)
 
-    print("Corpus found. Training SentencePiece tokenizer...")
+    if not force and os.path.exists(model_file) and os.path.exists(meta_file):
+        with open(meta_file, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("corpus_hash") == corpus_hash and meta.get("settings") == settings:
+            print(f"Corpus unchanged - reusing {model_file}")
+            return meta
 
-    # 3. Train SentencePiece tokenizer
+    num_threads = num_threads or os.cpu_count() or 1
+    print(f"Corpus found. Training SentencePiece tokenizer ({num_threads} threads"
+          + (f", sampling {input_sentence_size:,} lines)" if input_sentence_size else ", all lines)"))
+
+    os.makedirs(os.path.dirname(model_prefix) or ".", exist_ok=True)
+    spm.set_random_generator_seed(seed)
+    start = time.time()
+
+    # 4. Train SentencePiece tokenizer
     spm.SentencePieceTrainer.train(
-        input=CORPUS_PATH,
-        model_prefix=MODEL_PREFIX,
-        vocab_size=VOCAB_SIZE,
-        character_coverage=1.0,     # includes all unicode for math symbols
-        model_type="unigram"        # works best for math/STEM fields
+        input=corpus_path,
+        model_prefix=model_prefix,
+        vocab_size=settings["vocab_size"],
+        character_coverage=settings["character_coverage"],
+        model_type=settings["model_type"],
+        input_sentence_size=input_sentence_size,
+        shuffle_input_sentence=True,
+        num_threads=num_threads,
+        minloglevel=1,                  # warnings only, not the per-iteration log
     )
 
-    # 4. Show whats done
-    model_file = MODEL_PREFIX + ".model"
-    vocab_file = MODEL_PREFIX + ".vocab"
+    # 5. Show whats done
+    if not (os.path.exists(model_file) and os.path.exists(vocab_file)):
+        raise RuntimeError("Training finished but error occured, tokenizer files not found")
+
+    meta = {
+        "corpus_path": corpus_path,
+        "corpus_hash": corpus_hash,
+        "settings": settings,
+        "num_threads": num_threads,
+        "train_seconds": round(time.time() - start, 2),
+    }
+    with open(meta_file + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_file + ".tmp", meta_file)
 
-    if os.path.exists(model_file) and os.path.exists(vocab_file):
-        print(f"Done Training -- {model_file} -- {vocab_file}")
-    else:
-        print("Training finished but error occured, tokenizer files not found")
+    print(f"Done Training in {meta['train_seconds']:.1f}s -- {model_file} -- {vocab_file}")
+    return meta
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the SentencePiece tokenizer (reused while the corpus is unchanged)")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--model-prefix", default=MODEL_PREFIX, help="writes <prefix>.model / <prefix>.vocab / <prefix>.json")
+    parser.add_argument("--vocab-size", type=int, default=VOCAB_SIZE)
+    parser.add_argument("--sample-sentences", type=int, default=INPUT_SENTENCE_SIZE,
+                        help="train on at most this many randomly sampled lines (0 = all)")
+    parser.add_argument("--threads", type=int, default=None, help="training threads (default: all cores)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--force", action="store_true", help="retrain even if the corpus is unchanged")
+    args = parser.parse_args()
+
+    train_tokenizer(
+        corpus_path=args.corpus,
+        model_prefix=args.model_prefix,
+        vocab_size=args.vocab_size,
+        input_sentence_size=args.sample_sentences,
+        num_threads=args.threads,
+        seed=args.seed,
+        force=args.force,
+    )
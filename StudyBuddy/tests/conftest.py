@@ -0,0 +1,44 @@
+# ===================================================================================== #
+#    Test Fixtures - contians:                                                          #
+#       Import Paths -- Tiny CPU Models                                                 #
+#       run from StudyBuddy/:  python -m pytest -q                                      #
+# ===================================================================================== #
+
+import os
+import sys
+
+import pytest
+import torch
+
+# Same layout the scripts use: src/ modules import each other by name
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+for folder in (SRC, os.path.join(SRC, "train"), os.path.join(SRC, "data_processing")):
+    sys.path.append(folder)
+
+from ai_engine import TinyGPT
+
+VOCAB = 64
+MAX_SEQ_LEN = 32
+
+# ======================== #
+#       Tiny Models        #
+# ======================== #
+def tiny_gpt(seed, embed_dim=32, n_heads=2, hidden_dim=64):
+    """Randomly initialized TinyGPT small enough to run every test on the CPU in milliseconds"""
+    torch.manual_seed(seed)
+    return TinyGPT(VOCAB, embed_dim=embed_dim, n_heads=n_heads, hidden_dim=hidden_dim, max_seq_len=MAX_SEQ_LEN).eval()
+
+@pytest.fixture
+def tiny_model():
+    return tiny_gpt(seed=0)
+
+@pytest.fixture
+def tiny_draft():
+    # Different seed and sizes -> proposals the target often rejects
+    return tiny_gpt(seed=1, embed_dim=16, hidden_dim=32)
+
+@pytest.fixture
+def ids():
+    """(1, 50) random token IDs - longer than MAX_SEQ_LEN, never PAD (0) or UNK (1)"""
+    torch.manual_seed(2)
+    return torch.randint(2, VOCAB, (1, 50))
@@ -0,0 +1,76 @@
+import glob
+import os
+
+import pytest
+import torch
+
+import checkpoint_manager
+from checkpoint_manager import CheckpointManager, atomic_save, list_checkpoints
+
+@pytest.fixture
+def model_and_optimizer():
+    torch.manual_seed(0)
+    model = torch.nn.Linear(4, 2)
+    return model, torch.optim.Adam(model.parameters())
+
+def test_rotation_keeps_the_newest(tmp_path, model_and_optimizer):
+    model, optimizer = model_and_optimizer
+    manager = CheckpointManager(str(tmp_path), keep_last=2)
+    for step in (10, 20, 30, 40):
+        manager.save(model, optimizer, epoch=0, global_step=step)
+    manager.close()
+
+    assert list_checkpoints(str(tmp_path)) == [manager.step_path(40), manager.step_path(30)]
+    assert torch.load(manager.latest_path)["global_step"] == 40
+    assert not glob.glob(os.path.join(str(tmp_path), "*.tmp"))
+
+def test_latest_survives_rotating_its_step_file_away(tmp_path, model_and_optimizer):
+    model, optimizer = model_and_optimizer
+    manager = CheckpointManager(str(tmp_path), keep_last=1)
+    manager.save(model, optimizer, epoch=0, global_step=1, blocking=True)
+    with torch.no_grad():
+        model.weight.add_(1.0)
+    manager.save(model, optimizer, epoch=1, global_step=2, blocking=True)
+
+    state = torch.load(manager.latest_path)
+    assert state["global_step"] == 2
+    assert torch.equal(state["model"]["weight"], model.weight.detach())
+    assert list_checkpoints(str(tmp_path)) == [manager.step_path(2)]
+
+def test_snapshot_is_taken_at_save_time(tmp_path, model_and_optimizer):
+    model, optimizer = model_and_optimizer
+    manager = CheckpointManager(str(tmp_path))
+    expected = model.weight.detach().clone()
+    manager.save(model, optimizer, epoch=0, global_step=1)
+    with torch.no_grad():
+        model.weight.add_(1.0)          # training keeps going while the write runs
+    manager.close()
+    assert torch.equal(torch.load(manager.latest_path)["model"]["weight"], expected)
+
+def test_maybe_save_intervals(tmp_path, model_and_optimizer):
+    model, optimizer = model_and_optimizer
+    manager = CheckpointManager(str(tmp_path), keep_last=10, every_steps=5)
+    saved = [step for step in range(1, 13) if manager.maybe_save(model, optimizer, 0, step)]
+    assert not manager.maybe_save(model, optimizer, 0, 10)      # same step again
+    manager.close()
+    assert saved == [5, 10]
+
+def test_atomic_save_keeps_the_old_file_on_failure(tmp_path):
+    path = str(tmp_path / "state.pt")
+    atomic_save({"step": 1}, path)
+    with pytest.raises(Exception):
+        atomic_save({"step": 2, "bad": lambda: None}, path)     # can't be pickled, fails mid-write
+    assert torch.load(path)["step"] == 1
+
+def test_background_error_surfaces_on_wait(tmp_path, model_and_optimizer, monkeypatch):
+    model, optimizer = model_and_optimizer
+    manager = CheckpointManager(str(tmp_path))
+
+    def failing_save(obj, path):
+        raise OSError("disk full")
+    monkeypatch.setattr(checkpoint_manager, "atomic_save", failing_save)
+
+    manager.save(model, optimizer, epoch=0, global_step=1)
+    with pytest.raises(RuntimeError):
+        manager.wait()
+    assert not os.path.exists(manager.latest_path)
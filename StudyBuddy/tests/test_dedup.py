@@ -0,0 +1,91 @@
+import random
+import zlib
+
+import numpy as np
+import pytest
+
+from dedup import Deduplicator, _HashTable, _MAX_HASH, _PRIME, normalize
+
+WORDS = ("stack frame register return address caller callee saves restores pointer memory "
+         "interrupt vector handler pipeline stage cache line branch predictor instruction").split()
+
+def paragraph(rng, n_words=60):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+def test_exact_duplicates_after_normalizing():
+    dedup = Deduplicator(near=False)
+    text = "The stack frame holds the return address\nand the saved registers of the caller."
+    assert dedup.check(text) is None
+    assert dedup.check("  THE stack frame holds   the return address and the saved registers of the caller. ") == "exact"
+    assert dedup.check(text + " Plus one more sentence.") is None
+    assert dedup.stats == {"checked": 3, "exact": 1, "near": 0}
+
+def test_short_paragraphs_are_always_kept():
+    dedup = Deduplicator()
+    assert [dedup.check("Page 3") for _ in range(3)] == [None, None, None]
+
+def test_near_duplicates():
+    rng = random.Random(0)
+    dedup = Deduplicator(exact=False, threshold=0.8)
+    text = paragraph(rng, 120)
+    words = text.split()
+    words[60] = "edited"
+    assert dedup.check(text) is None
+    assert dedup.check(" ".join(words)) == "near"
+    assert dedup.check(paragraph(rng, 120)) is None
+
+def test_check_many_matches_checking_one_by_one():
+    rng = random.Random(1)
+    texts = []
+    for _ in range(300):
+        roll = rng.random()
+        if texts and roll < 0.2:
+            texts.append(rng.choice(texts).upper())                 # exact copy
+        elif texts and roll < 0.4:
+            words = rng.choice(texts).split()
+            words[rng.randrange(len(words))] = "edited"
+            texts.append(" ".join(words))                           # near copy
+        else:
+            texts.append(paragraph(rng))
+
+    one_by_one = Deduplicator()
+    expected = [one_by_one.check(text) for text in texts]
+    batched = Deduplicator()
+    got = []
+    for i in range(0, len(texts), 64):
+        got += batched.check_many(texts[i:i + 64])
+
+    assert got == expected
+    assert batched.stats == one_by_one.stats
+    assert expected.count("exact") and expected.count("near")
+
+def test_minhash_is_exact_mod_p():
+    dedup = Deduplicator(num_perm=16)
+    norm = normalize(paragraph(random.Random(2), 40))
+    words = norm.split(" ")
+    shingles = [zlib.crc32(" ".join(words[i:i + 5]).encode("utf-8")) for i in range(len(words) - 4)]
+
+    # Python ints never overflow - the reference for the uint64 numpy version
+    expected = [min(min((a * h + b) % _PRIME, _MAX_HASH) for h in shingles)
+                for a, b in zip(dedup.perm_a.tolist(), dedup.perm_b.tolist())]
+    assert dedup.minhash(norm).tolist() == expected
+
+def test_hash_table_grows_and_finds_every_key():
+    rng = np.random.default_rng(0)
+    keys = rng.integers(1, 2**63, size=20000, dtype=np.uint64)
+    table = _HashTable(capacity=16)
+    table.put(keys[:10000], np.arange(10000, dtype=np.uint32))
+    table.put(keys[:10000], 7)          # already there: the first value stays
+    table.put(keys[10000:])
+
+    vals, found = table.get(keys)
+    assert found.all()
+    assert vals[:10000].tolist() == list(range(10000))
+    assert table.size == 20000
+
+    _, found = table.get(rng.integers(1, 2**63, size=1000, dtype=np.uint64))
+    assert not found.any()
+
+def test_threshold_is_validated():
+    with pytest.raises(ValueError):
+        Deduplicator(threshold=0)
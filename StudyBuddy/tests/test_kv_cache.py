@@ -0,0 +1,63 @@
+import torch
+
+from ai_engine import ConversationCache
+from conftest import MAX_SEQ_LEN
+
+def close(a, b):
+    torch.testing.assert_close(a, b, atol=1e-5, rtol=1e-4)
+
+@torch.no_grad()
+def test_forward_cached_matches_forward(tiny_model, ids):
+    x = ids[:, :20].repeat(2, 1)
+    cache = tiny_model.new_cache(batch_size=2)
+
+    # A prefix in one call, then one token at a time
+    logits = [tiny_model.forward_cached(x[:, :12], cache)]
+    logits += [tiny_model.forward_cached(x[:, i:i + 1], cache) for i in range(12, 20)]
+
+    close(torch.cat(logits, dim=1), tiny_model(x))
+    assert cache.length == 20
+
+@torch.no_grad()
+def test_decode_step_matches_forward_past_the_window(tiny_model, ids):
+    # window_stride=1 rebuilds the cache every step once the window slides -> same logits as forward()
+    cache = tiny_model.new_cache()
+    for end in range(8, ids.shape[1] + 1):
+        window = ids[:, max(0, end - MAX_SEQ_LEN):end]
+        close(tiny_model.decode_step(window, cache), tiny_model(window)[:, -1])
+
+@torch.no_grad()
+def test_decode_step_with_stride_matches_its_shorter_context(tiny_model, ids):
+    # A larger stride rebuilds from a later start - the logits are those of the tokens still cached
+    stride = 8
+    cache = tiny_model.new_cache()
+    for end in range(8, ids.shape[1] + 1):
+        window = ids[:, max(0, end - MAX_SEQ_LEN):end]
+        logits = tiny_model.decode_step(window, cache, window_stride=stride)
+        close(logits, tiny_model(window[:, -cache.length:])[:, -1])
+
+@torch.no_grad()
+def test_conversation_prefill_reuses_the_common_prefix(tiny_model, ids):
+    conversation = ConversationCache(tiny_model)
+    first, second = ids[:, :20], torch.cat([ids[:, :14], ids[:, 30:36]], dim=1)
+
+    close(conversation.prefill(first), tiny_model(first)[:, -1])
+    conversation.sync(first)
+    close(conversation.prefill(second), tiny_model(second)[:, -1])
+    assert conversation.reused == 14
+
+@torch.no_grad()
+def test_rebase_lines_the_prompt_up_with_the_cache(tiny_model, ids):
+    conversation = ConversationCache(tiny_model)
+    turn = ids[:, :24]
+    conversation.prefill(turn)
+    conversation.sync(turn)
+
+    # The memory dropped the first 6 tokens and a new message follows
+    prompt = ids[0, 6:28].tolist()
+    context = conversation.rebase(prompt)
+    assert context == ids[0, :28].tolist()
+
+    window = torch.tensor([context])
+    close(conversation.prefill(window), tiny_model(window)[:, -1])
+    assert conversation.reused == 24
@@ -0,0 +1,58 @@
+import torch
+
+from sampling import apply_repetition_penalty, next_token_probs, sample_next
+
+def test_repetition_penalty_always_lowers_recent_tokens():
+    logits = torch.tensor([[2.0, -2.0, 1.0, 0.5]])
+    out = apply_repetition_penalty(logits.clone(), torch.tensor([[0, 1, 1]]), penalty=0.5)
+
+    # Positive scaled down, negative pushed further down - once, however often it repeats
+    assert out.tolist() == [[1.0, -4.0, 1.0, 0.5]]
+
+def test_banned_ids_are_never_sampled():
+    torch.manual_seed(0)
+    logits = torch.zeros(4, 10)
+    logits[:, :2] = 100.0
+    for _ in range(50):
+        assert (sample_next(logits, temperature=1.0, top_k=5, banned_ids=(0, 1)) >= 2).all()
+
+def test_top_k_only_samples_the_k_best():
+    torch.manual_seed(0)
+    logits = torch.randn(8, 50)
+    best = logits.topk(3).indices
+    for _ in range(50):
+        next_ids = sample_next(logits, temperature=1.0, top_k=3, banned_ids=())
+        assert (next_ids.unsqueeze(1) == best).any(dim=1).all()
+
+def test_penalty_applies_before_top_k():
+    logits = torch.tensor([[5.0, 4.0, 1.0]])
+    recent = torch.tensor([[0]])
+    for _ in range(20):
+        assert sample_next(logits, recent, temperature=1.0, top_k=1, penalty=0.1, banned_ids=()).item() == 1
+
+def test_top_p_keeps_the_smallest_nucleus():
+    logits = torch.log(torch.tensor([[0.5, 0.3, 0.15, 0.05]]))
+    probs, top_ids = next_token_probs(logits, temperature=1.0, top_k=4, top_p=0.7, banned_ids=())
+    assert top_ids[probs > 0].tolist() == [0, 1]
+    torch.testing.assert_close(probs.sum(dim=1), torch.ones(1))
+
+    # Even a tiny top_p keeps the best token
+    probs, top_ids = next_token_probs(logits, temperature=1.0, top_k=4, top_p=1e-6, banned_ids=())
+    assert top_ids[probs > 0].tolist() == [0]
+
+def test_per_row_settings():
+    torch.manual_seed(0)
+    logits = torch.randn(1, 20).repeat(3, 1)
+    probs, _ = next_token_probs(logits, temperature=torch.tensor([1.0, 1.0, 0.5]),
+                                top_k=torch.tensor([1, 5, 5]), top_p=torch.tensor([1.0, 1.0, 1.0]), banned_ids=())
+    assert (probs > 0).sum(dim=1).tolist() == [1, 5, 5]
+    torch.testing.assert_close(probs.sum(dim=1), torch.ones(3))
+
+    # Lower temperature -> sharper distribution over the same tokens
+    assert probs[2].max() > probs[1].max()
+
+def test_logits_are_not_modified():
+    logits = torch.randn(2, 10)
+    before = logits.clone()
+    sample_next(logits, torch.tensor([[2, 3], [4, 5]]), temperature=0.7, top_k=4)
+    assert torch.equal(logits, before)
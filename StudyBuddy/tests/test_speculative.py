@@ -0,0 +1,48 @@
+import pytest
+import torch
+
+from sampling import TokenBuffer, sample_next
+from speculative import SpeculativeDecoder
+
+@torch.no_grad()
+def plain_decode(model, prompt_ids, max_len, top_k, recent=20):
+    """Reference: a full forward pass per token, sampled like LocalChatBot._sample_steps"""
+    tokens = TokenBuffer(prompt_ids, capacity=len(prompt_ids) + max_len)
+    out = []
+    for _ in range(max_len):
+        logits = model(tokens.window(model.max_seq_len))[:, -1]
+        next_ids = sample_next(logits, tokens.recent(recent), temperature=1.0, top_k=top_k, banned_ids=(0, 1))
+        tokens.append(next_ids)
+        out.append(next_ids.item())
+    return out
+
+@pytest.mark.parametrize("draft_tokens", [1, 3, 5])
+def test_greedy_speculative_matches_plain_decoding(tiny_model, tiny_draft, ids, draft_tokens):
+    # top_k=1 is greedy (the temperature -> 0 limit): every accepted or resampled token must be the
+    # target's argmax, so the output can't depend on what the draft proposed
+    prompt_ids = ids[0, :10].tolist()
+    decoder = SpeculativeDecoder(tiny_model, tiny_draft, draft_tokens=draft_tokens)
+    spec = [next_id for next_id, _ in decoder.steps(prompt_ids, 16, temperature=1.0, top_k=1)]
+
+    assert spec == plain_decode(tiny_model, prompt_ids, 16, top_k=1)
+    assert decoder.stats["tokens"] == 16
+
+def test_draft_of_the_target_accepts_everything(tiny_model, ids):
+    decoder = SpeculativeDecoder(tiny_model, tiny_model, draft_tokens=4)
+    list(decoder.steps(ids[0, :10].tolist(), 15, temperature=1.0, top_k=1))
+    assert decoder.acceptance_rate == 1.0
+    assert decoder.tokens_per_pass == 5.0
+
+def test_windows_are_the_last_max_seq_len_tokens(tiny_model, tiny_draft, ids):
+    prompt_ids = ids[0, :20].tolist()
+    decoder = SpeculativeDecoder(tiny_model, tiny_draft, draft_tokens=3)
+    sequence = list(prompt_ids)
+    for next_id, window in decoder.steps(prompt_ids, 30, temperature=0.7, top_k=8):
+        sequence.append(next_id)
+        assert window[0].tolist() == sequence[-decoder.max_seq_len:]
+
+def test_vocab_mismatch_is_refused(tiny_model):
+    from conftest import MAX_SEQ_LEN
+    from ai_engine import TinyGPT
+    with pytest.raises(ValueError):
+        SpeculativeDecoder(tiny_model, TinyGPT(10, embed_dim=16, n_heads=2, hidden_dim=32, max_seq_len=MAX_SEQ_LEN))
@@ -0,0 +1,32 @@
+import os
+import random
+
+import pytest
+
+from ai_engine import SentencePieceTokenizer, format_prompt
+
+SP_MODEL = os.path.join(os.path.dirname(__file__), "..", "models", "studybuddy_sp.model")
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    if not os.path.exists(SP_MODEL):
+        pytest.skip("no SentencePiece model in models/")
+    return SentencePieceTokenizer(SP_MODEL)
+
+def test_encode_prompt_matches_encoding_the_whole_prompt(tokenizer):
+    # The per-turn cache is only a shortcut: the IDs have to be the ones of format_prompt's text
+    assert tokenizer.split_turns
+    rng = random.Random(0)
+    words = ["hello", "the", "stack", "frame,", "x=3", "  ", "é", "Bot:", "User:", "a.b", "(", ")", "\t", "...", "don't", ""]
+    for _ in range(500):
+        memory = [("User: " if i % 2 == 0 else "Bot: ") + " ".join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+                  for i in range(rng.randint(0, 8))]
+        prompt = " ".join(rng.choice(words) for _ in range(rng.randint(1, 6))).strip() or "x"
+        assert tokenizer.encode_prompt(memory, prompt) == tokenizer.encode(format_prompt(memory, prompt))
+
+def test_turn_cache_is_reused(tokenizer):
+    memory = ["User: What is a stack frame?", "Bot: The memory a call uses."]
+    tokenizer.encode_prompt(memory, "And the link register?")
+    hits = tokenizer._encode_turn.cache_info().hits
+    tokenizer.encode_prompt(memory, "Something else")
+    assert tokenizer._encode_turn.cache_info().hits >= hits + len(memory) + 1